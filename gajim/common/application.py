@@ -245,6 +245,7 @@ def _on_disconnect(event: AccountDisconnected) -> None:
     def _shutdown_core(self) -> None:
         # Commit any outstanding SQL transactions
         app.storage.archive.cleanup_chat_history()
+        app.preview_manager.shutdown()
         app.storage.cache.shutdown()
         app.storage.archive.shutdown()
         app.settings.shutdown()
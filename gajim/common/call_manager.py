@@ -438,4 +438,5 @@ def _store_outgoing_call(account: str, jid: JID, sid: str) -> None:
             call=call_data,
         )
 
-        app.storage.archive.insert_object(message)
+        app.storage.archive.submit(app.storage.archive.insert_object,
+                                   message)
@@ -0,0 +1,332 @@
+# This file is part of Gajim.
+#
+# SPDX-License-Identifier: GPL-3.0-only
+
+from __future__ import annotations
+
+from typing import Any
+
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from pathlib import Path
+
+from gi.repository import GLib
+
+from gajim.common import app
+from gajim.common.setting_values import IntSettings
+
+log = logging.getLogger('gajim.c.file_cache')
+
+INDEX_VERSION = 1
+
+SAVE_DELAY = 5  # seconds
+BATCH_SIZE = 100  # files per main loop iteration
+
+# Once the budget is exceeded, files are removed until the cache
+# is below this fraction of the budget
+EVICTION_TARGET = 0.9
+
+
+class FileCache:
+    '''
+    Keeps the size of a directory below a byte budget by removing the
+    least recently used files. Sizes and access times are kept in an
+    index file outside of the directory. The directory is scanned if
+    the index is missing, or if the directory was changed after the
+    index was saved, e.g. because Gajim did not exit cleanly.
+    '''
+
+    def __init__(self,
+                 path: Path,
+                 index_path: Path,
+                 budget_setting: IntSettings) -> None:
+        self._path = path
+        self._index_path = index_path
+        self._budget_setting = budget_setting
+
+        # File name -> (size, last access), least recently used first
+        self._entries: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        self._size = 0
+        self._dirty = False
+
+        self._scan: Iterator[os.DirEntry[str]] | None = None
+        self._scan_entries: list[tuple[str, int, float]] = []
+        self._scan_start = 0.0
+
+        self._scan_source_id: int | None = None
+        self._evict_source_id: int | None = None
+        self._save_source_id: int | None = None
+
+        if self._load_index() and not self._is_index_outdated():
+            self._schedule_eviction()
+        else:
+            self._start_scan()
+
+        app.settings.connect_signal(budget_setting, self._on_budget_changed)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def contains(self, path: Path) -> bool:
+        if path.name in self._entries:
+            return True
+
+        if self._scan is None:
+            return False
+
+        # The index is still being built
+        return path.exists()
+
+    def add(self, path: Path) -> None:
+        try:
+            size = path.stat().st_size
+        except OSError as error:
+            log.warning('Unable to add %s: %s', path, error)
+            return
+
+        self._forget(path.name)
+        self._entries[path.name] = (size, time.time())
+        self._size += size
+
+        self._schedule_save()
+        self._schedule_eviction()
+
+    def touch(self, path: Path) -> None:
+        entry = self._entries.get(path.name)
+        if entry is None:
+            return
+
+        size, _last_access = entry
+        self._entries[path.name] = (size, time.time())
+        self._entries.move_to_end(path.name)
+        self._schedule_save()
+
+    def remove(self, path: Path) -> None:
+        '''
+        Forget a file which does not exist anymore
+        '''
+        if self._forget(path.name):
+            self._schedule_save()
+
+    def evict(self) -> None:
+        '''
+        Remove least recently used files until the cache is within budget
+        '''
+        while self._evict_batch():
+            pass
+
+    def save(self) -> None:
+        if not self._dirty or self._scan is not None:
+            return
+
+        index = {
+            'version': INDEX_VERSION,
+            'entries': [[name, size, last_access] for
+                        name, (size, last_access) in self._entries.items()]
+        }
+
+        temp_path = self._index_path.with_suffix('.tmp')
+        try:
+            with temp_path.open('w', encoding='utf8') as file:
+                json.dump(index, file)
+            temp_path.replace(self._index_path)
+        except OSError as error:
+            log.warning('Unable to save index %s: %s',
+                        self._index_path, error)
+            return
+
+        self._dirty = False
+
+    def shutdown(self) -> None:
+        for source_id in (self._scan_source_id,
+                          self._evict_source_id,
+                          self._save_source_id):
+            if source_id is not None:
+                GLib.source_remove(source_id)
+
+        self._scan_source_id = None
+        self._evict_source_id = None
+        self._save_source_id = None
+        if self._is_index_outdated():
+            # E.g. partial downloads were removed, they are not indexed
+            self._dirty = True
+        self.save()
+
+    def _forget(self, name: str) -> bool:
+        entry = self._entries.pop(name, None)
+        if entry is None:
+            return False
+
+        size, _last_access = entry
+        self._size -= size
+        return True
+
+    def _load_index(self) -> bool:
+        try:
+            with self._index_path.open('r', encoding='utf8') as file:
+                index = json.load(file)
+        except FileNotFoundError:
+            return False
+        except Exception as error:
+            log.warning('Unable to load index %s: %s', self._index_path, error)
+            return False
+
+        if index.get('version') != INDEX_VERSION:
+            return False
+
+        entries = sorted(index['entries'], key=lambda entry: entry[2])
+        for name, size, last_access in entries:
+            self._entries[name] = (size, last_access)
+            self._size += size
+
+        log.info('%s: %s files, %s bytes',
+                 self._path, len(self._entries), self._size)
+        return True
+
+    def _is_index_outdated(self) -> bool:
+        try:
+            index_mtime = self._index_path.stat().st_mtime_ns
+            directory_mtime = self._path.stat().st_mtime_ns
+        except OSError:
+            return True
+
+        # Adding or removing files changes the mtime of the directory,
+        # the index is saved after each change
+        return directory_mtime > index_mtime
+
+    def _start_scan(self) -> None:
+        log.info('Build index for %s', self._path)
+        try:
+            self._scan = os.scandir(self._path)
+        except OSError as error:
+            log.warning('Unable to scan %s: %s', self._path, error)
+            return
+
+        self._scan_start = time.time()
+
+        self._scan_source_id = GLib.idle_add(self._scan_batch,
+                                             priority=GLib.PRIORITY_LOW)
+
+    def _scan_batch(self) -> bool:
+        assert self._scan is not None
+        for _ in range(BATCH_SIZE):
+            entry = next(self._scan, None)
+            if entry is None:
+                self._finish_scan()
+                return False
+
+            if entry.name.endswith('.part'):
+                continue
+
+            try:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+            except OSError:
+                continue
+
+            self._scan_entries.append(
+                (entry.name, stat.st_size, stat.st_atime))
+
+        return True
+
+    def _finish_scan(self) -> None:
+        # The scandir iterator closes itself once it is exhausted
+        self._scan = None
+        self._scan_source_id = None
+
+        # Files from an outdated index keep their last access if they
+        # still exist, files which were added or used while scanning
+        # are the most recent ones
+        scanned: dict[str, tuple[int, float]] = {}
+        for name, size, last_access in self._scan_entries:
+            entry = self._entries.get(name)
+            if entry is not None:
+                last_access = entry[1]
+            scanned[name] = (size, last_access)
+
+        entries: OrderedDict[str, tuple[int, float]] = OrderedDict(
+            sorted(scanned.items(), key=lambda item: item[1][1]))
+        for name, entry in self._entries.items():
+            if entry[1] >= self._scan_start:
+                entries[name] = entry
+                entries.move_to_end(name)
+
+        self._scan_entries.clear()
+        self._entries = entries
+        self._size = sum(size for size, _last_access in entries.values())
+
+        log.info('%s: %s files, %s bytes',
+                 self._path, len(self._entries), self._size)
+
+        self._dirty = True
+        self.save()
+        self._schedule_eviction()
+
+    def _get_budget(self) -> int:
+        return app.settings.get(self._budget_setting)
+
+    def _schedule_eviction(self) -> None:
+        if self._evict_source_id is not None or self._scan is not None:
+            return
+
+        budget = self._get_budget()
+        if budget <= 0 or self._size <= budget:
+            return
+
+        self._evict_source_id = GLib.idle_add(self._on_evict,
+                                              priority=GLib.PRIORITY_LOW)
+
+    def _on_evict(self) -> bool:
+        if self._evict_batch():
+            return True
+
+        self._evict_source_id = None
+        return False
+
+    def _evict_batch(self) -> bool:
+        # Returns True if more files have to be removed
+        budget = self._get_budget()
+        if budget <= 0:
+            return False
+
+        target = budget * EVICTION_TARGET
+        evicted = False
+        for _ in range(BATCH_SIZE):
+            if self._size <= target or not self._entries:
+                break
+
+            name, (size, _last_access) = self._entries.popitem(last=False)
+            self._size -= size
+            evicted = True
+            try:
+                (self._path / name).unlink(missing_ok=True)
+            except OSError as error:
+                log.warning('Unable to remove %s: %s', name, error)
+            else:
+                log.debug('Evicted %s (%s bytes)', name, size)
+
+        if evicted:
+            self._schedule_save()
+        return self._size > target and bool(self._entries)
+
+    def _schedule_save(self) -> None:
+        self._dirty = True
+        if self._save_source_id is not None:
+            return
+
+        self._save_source_id = GLib.timeout_add_seconds(SAVE_DELAY,
+                                                        self._on_save)
+
+    def _on_save(self) -> bool:
+        self._save_source_id = None
+        self.save()
+        return False
+
+    def _on_budget_changed(self, *args: Any) -> None:
+        self._schedule_eviction()
@@ -19,10 +19,24 @@
 
 from __future__ import annotations
 
+from typing import Any
 from typing import ClassVar
 from typing import Literal
 
+import base64
+import hashlib
 from collections.abc import Callable
+from functools import partial
+
+# XEP-0300 algorithm names, see nbxmpp.Hashes2.supported
+HASH_ALGORITHMS: dict[str, Callable[[], Any]] = {
+    'sha-256': hashlib.sha256,
+    'sha-512': hashlib.sha512,
+    'sha3-256': hashlib.sha3_256,
+    'sha3-512': hashlib.sha3_512,
+    'blake2b-256': partial(hashlib.blake2b, digest_size=32),
+    'blake2b-512': partial(hashlib.blake2b, digest_size=64),
+}
 
 
 class FilesProp:
@@ -151,7 +165,14 @@ def __init__(self, account: str, sid: str) -> None:
         self.direction: Literal['<', '>'] | None = None
         self.syn_id: str | None = None
         self.seq: int | None = None
+        # IBB sequence numbers of data stanzas awaiting a result
+        self.ibb_pending_seqs: set[int] = set()
         self.hash_: str | None = None
+        # Hash of the received data, updated with every received chunk
+        self.hashed_len: int = 0
+        self._hash_algo: str | None = None
+        self._hash_state: Any = None
+        self._hash_failed: bool = False
         self.fd: int | None = None
         # Type of the session, if it is 'jingle' or 'si'
         self.session_type: str | None = None
@@ -172,6 +193,48 @@ def setsid(self, value: str) -> None:
 
     sid = property(getsid, setsid)
 
+    def update_hash(self, data: bytes) -> None:
+        '''
+        Adds received data to the hash of the file, must be called after
+        received_len has been updated with the data
+        '''
+        if self._hash_failed:
+            return
+
+        if self.hashed_len + len(data) != self.received_len:
+            # Data was not hashed from the start of the file, e.g. after
+            # the transfer was resumed
+            self._reset_hash()
+            return
+
+        if self._hash_state is None:
+            algo = HASH_ALGORITHMS.get(self.algo or '')
+            if algo is None:
+                self._reset_hash()
+                return
+            self._hash_algo = self.algo
+            self._hash_state = algo()
+
+        self._hash_state.update(data)
+        self.hashed_len += len(data)
+
+    def get_hash(self) -> str | None:
+        '''
+        Returns the XEP-0300 hash of the received file, if all of it
+        was hashed while receiving with the current algorithm
+        '''
+        if self._hash_state is None or self._hash_algo != self.algo:
+            return None
+
+        if self.hashed_len != self.size:
+            return None
+
+        return base64.b64encode(self._hash_state.digest()).decode()
+
+    def _reset_hash(self) -> None:
+        self._hash_failed = True
+        self._hash_state = None
+
 
 if __name__ == '__main__':
     import doctest
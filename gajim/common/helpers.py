@@ -27,6 +27,7 @@
 import importlib.metadata
 import inspect
 import json
+import locale
 import logging
 import os
 import platform
@@ -63,6 +64,7 @@
 from nbxmpp.const import Chatstate
 from nbxmpp.const import ConnectionProtocol
 from nbxmpp.const import ConnectionType
+from nbxmpp.const import PresenceShow
 from nbxmpp.const import Role
 from nbxmpp.errors import StanzaError
 from nbxmpp.namespaces import Namespace
@@ -175,6 +177,25 @@ def get_uf_show(show: str, use_mnemonic: bool = False) -> str:
     return SHOW_STRING[show]
 
 
+# Lower rank sorts first, the most available show has rank 0
+SHOW_SORT_RANK = {
+    show: rank for rank, show in enumerate(sorted(PresenceShow, reverse=True))
+}
+
+
+def get_participant_sort_key(nick: str,
+                             show: PresenceShow,
+                             is_self: bool,
+                             sort_by_show: bool
+                             ) -> types.ParticipantSortKeyT:
+    '''
+    Returns a key which sorts our own nickname first, then optionally by
+    show and then by nickname according to the collation of the locale
+    '''
+    rank = SHOW_SORT_RANK.get(show, len(SHOW_SORT_RANK)) if sort_by_show else 0
+    return not is_self, rank, locale.strxfrm(nick.lower())
+
+
 def get_uf_sub(sub: str) -> str:
     if sub == 'none':
         return p_('Contact subscription', 'None')
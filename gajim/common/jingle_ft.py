@@ -171,7 +171,8 @@ def __on_session_initiate(self,
             filetransfer=[ft_data],
         )
 
-        app.storage.archive.insert_object(message_data)
+        app.storage.archive.submit(app.storage.archive.insert_object,
+                                   message_data)
 
         if self.session.request:
             # accept the request
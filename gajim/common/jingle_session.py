@@ -710,7 +710,8 @@ def __on_session_initiate(self,
             call=call_data,
         )
 
-        app.storage.archive.insert_object(message)
+        app.storage.archive.submit(app.storage.archive.insert_object,
+                                   message)
 
     def __broadcast(self,
                     stanza: nbxmpp.Node,
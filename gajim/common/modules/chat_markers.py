@@ -99,30 +99,43 @@ def _raise_event(self, name: str, properties: Any) -> None:
                        properties.jid,
                        properties.marker.id)
 
-        if not properties.is_muc_pm and not properties.type.is_groupchat:
-            if properties.is_mam_message:
-                timestamp = properties.mam.timestamp
-            else:
-                timestamp = properties.timestamp
-
-            timestamp = dt.datetime.fromtimestamp(
-                timestamp, dt.timezone.utc)
-
-            marker_data = mod.DisplayedMarker(
-                account_=self._account,
-                remote_jid_=properties.remote_jid,
-                occupant_=None,
-                id=properties.marker.id,
-                timestamp=timestamp)
-            app.storage.archive.insert_object(marker_data)
+        event = DisplayedReceived(account=self._account,
+                                  jid=properties.remote_jid,
+                                  properties=properties,
+                                  type=properties.type,
+                                  is_muc_pm=properties.is_muc_pm,
+                                  marker_id=properties.marker.id)
+
+        if properties.is_muc_pm or properties.type.is_groupchat:
+            app.ged.raise_event(event)
+            return
 
-        app.ged.raise_event(
-            DisplayedReceived(account=self._account,
-                              jid=properties.remote_jid,
-                              properties=properties,
-                              type=properties.type,
-                              is_muc_pm=properties.is_muc_pm,
-                              marker_id=properties.marker.id))
+        if properties.is_mam_message:
+            timestamp = properties.mam.timestamp
+        else:
+            timestamp = properties.timestamp
+
+        timestamp = dt.datetime.fromtimestamp(
+            timestamp, dt.timezone.utc)
+
+        marker_data = mod.DisplayedMarker(
+            account_=self._account,
+            remote_jid_=properties.remote_jid,
+            occupant_=None,
+            id=properties.marker.id,
+            timestamp=timestamp)
+
+        # Handlers load the message together with its markers, so the
+        # event is raised once the marker is written
+        ingest = self._client.get_module('MAM').get_ingest(properties)
+        if ingest is not None:
+            app.storage.archive.insert_object(marker_data, ingest=ingest)
+            app.ged.raise_event(event)
+        else:
+            app.storage.archive.submit(
+                app.storage.archive.insert_object,
+                marker_data,
+                callback=lambda _pk: app.ged.raise_event(event))
 
     def _send_marker(self,
                      contact: types.ChatContactT,
@@ -533,7 +533,8 @@ def get_avatar(self,
                    scale: int,
                    add_show: bool = True,
                    default: bool = False,
-                   style: str = 'circle'):
+                   style: str = 'circle',
+                   load_async: bool = False):
 
         show = self.show.value if add_show else None
 
@@ -546,7 +547,8 @@ def get_avatar(self,
             show,
             default=default,
             transport_icon=transport_icon,
-            style=style)
+            style=style,
+            load_async=load_async)
 
     def update_presence(self, presence_data: PresenceData) -> None:
         self._presence = presence_data
@@ -810,7 +812,12 @@ def avatar_sha(self) -> str | None:
     def set_avatar_sha(self, sha: str) -> None:
         app.storage.cache.set_muc(self._account, self._jid, 'avatar', sha)
 
-    def get_avatar(self, size: int, scale: int) -> cairo.ImageSurface:
+    def get_avatar(self,
+                   size: int,
+                   scale: int,
+                   load_async: bool = False
+                   ) -> cairo.ImageSurface:
+
         transport_icon = None
         disco_info = self.get_disco()
         if disco_info is not None:
@@ -823,7 +830,8 @@ def get_avatar(self, size: int, scale: int) -> cairo.ImageSurface:
             self._jid,
             size,
             scale,
-            transport_icon=transport_icon)
+            transport_icon=transport_icon,
+            load_async=load_async)
 
     def _on_user_signal(self,
                         contact: GroupchatParticipant,
@@ -1022,12 +1030,13 @@ def get_avatar(self,
                    size: int,
                    scale: int,
                    add_show: bool = True,
-                   style: str = 'circle'
+                   style: str = 'circle',
+                   load_async: bool = False
                    ) -> cairo.ImageSurface:
 
         show = self.show.value if add_show else None
         return app.app.avatar_storage.get_surface(
-            self, size, scale, show, style=style)
+            self, size, scale, show, style=style, load_async=load_async)
 
     def update_presence(self, presence: MUCPresenceData) -> None:
         self._presence = presence
@@ -24,6 +24,9 @@
 from gajim.common.helpers import to_user_string
 from gajim.common.modules.base import BaseModule
 
+# Sequence numbers are 16 bit and wrap to 0 after 65535
+SEQ_MODULO = 65536
+
 
 class IBB(BaseModule):
 
@@ -121,13 +124,14 @@ def _on_data_received(self,
         self._log.debug('Data received: sid: %s, %s+%s bytes',
                         ibb.sid, file_props.fp.tell(), len(ibb.data))
 
-        file_props.seq += 1
+        file_props.seq = (file_props.seq + 1) % SEQ_MODULO
         file_props.started = True
         file_props.fp.write(ibb.data)
         current_time = time.time()
         file_props.elapsed_time += current_time - file_props.last_time
         file_props.last_time = current_time
         file_props.received_len += len(ibb.data)
+        file_props.update_hash(ibb.data)
         app.socks5queue.progress_transfer_cb(self._account, file_props)
         if file_props.received_len >= file_props.size:
             file_props.completed = True
@@ -139,6 +143,7 @@ def send_open(self, to: str, sid: str, fp: FileProp) -> FileProp:
         file_props.block_size = 4096
         file_props.fp = fp
         file_props.seq = -1
+        file_props.ibb_pending_seqs = set()
         file_props.error = 0
         file_props.paused = False
         file_props.received_len = 0
@@ -201,40 +206,62 @@ def _on_close_result(self, task: Task) -> None:
             return
 
     def send_data(self, file_props: FileProp) -> None:
-        if file_props.completed:
+        # Keep up to ibb_send_window data stanzas in flight instead of
+        # waiting for the result of each one before sending the next
+        window = max(1, app.settings.get('ibb_send_window'))
+        while (not file_props.completed and
+               len(file_props.ibb_pending_seqs) < window):
+            if not self._send_chunk(file_props):
+                break
+
+        if file_props.completed and not file_props.ibb_pending_seqs:
             self.send_close(file_props)
-            return
 
+    def _send_chunk(self, file_props: FileProp) -> bool:
         chunk = file_props.fp.read(file_props.block_size)
-        if chunk:
-            file_props.seq += 1
-            file_props.started = True
-            if file_props.seq == 65536:
-                file_props.seq = 0
-
-            self._log.info('Send data to %s, sid: %s',
-                           file_props.receiver, file_props.transport_sid)
-            self._nbxmpp('IBB').send_data(file_props.receiver,
-                                          file_props.transport_sid,
-                                          file_props.seq,
-                                          chunk,
-                                          callback=self._on_data_result,
-                                          user_data=file_props)
-            current_time = time.time()
-            file_props.elapsed_time += current_time - file_props.last_time
-            file_props.last_time = current_time
-            file_props.received_len += len(chunk)
-            if file_props.size == file_props.received_len:
-                file_props.completed = True
-            app.socks5queue.progress_transfer_cb(self._account, file_props)
+        if not chunk:
+            return False
+
+        file_props.seq = (file_props.seq + 1) % SEQ_MODULO
+        file_props.started = True
+        file_props.ibb_pending_seqs.add(file_props.seq)
+
+        self._log.info('Send data to %s, sid: %s, seq: %s',
+                       file_props.receiver,
+                       file_props.transport_sid,
+                       file_props.seq)
+        self._nbxmpp('IBB').send_data(file_props.receiver,
+                                      file_props.transport_sid,
+                                      file_props.seq,
+                                      chunk,
+                                      callback=self._on_data_result,
+                                      user_data=(file_props, file_props.seq))
+        current_time = time.time()
+        file_props.elapsed_time += current_time - file_props.last_time
+        file_props.last_time = current_time
+        file_props.received_len += len(chunk)
+        if file_props.size == file_props.received_len:
+            file_props.completed = True
+        app.socks5queue.progress_transfer_cb(self._account, file_props)
+        return True
 
     def _on_data_result(self, task: Task) -> None:
+        file_props, seq = task.get_user_data()
+        file_props.ibb_pending_seqs.discard(seq)
+        if file_props.stopped or not file_props.connected:
+            return
+
         try:
             task.finish()
         except StanzaError as error:
+            # The receiver closes the stream on a missing sequence number,
+            # so a failed chunk cannot be sent again, abort instead
+            self._log.warning('Data with seq %s failed: %s', seq, error)
             app.socks5queue.error_cb('Error', to_user_string(error))
-            self._log.warning(error)
+            file_props.ibb_pending_seqs.clear()
+            file_props.completed = False
+            file_props.error = -1
+            self.send_close(file_props)
             return
 
-        file_props = task.get_user_data()
         self.send_data(file_props)
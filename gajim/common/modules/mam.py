@@ -36,6 +36,7 @@
 from gajim.common.modules.base import BaseModule
 from gajim.common.modules.util import as_task
 from gajim.common.storage.archive import models as mod
+from gajim.common.storage.base import Ingest
 from gajim.common.util.datetime import FIRST_UTC_DATETIME
 
 
@@ -66,6 +67,10 @@ def __init__(self, con: types.Client) -> None:
         # Holds archive jids where catch up was successful
         self._catch_up_finished: list[str] = []
 
+        # Holds the ingest of each running query, the messages of a
+        # query are written to the archive in batches
+        self._ingests: dict[str, Ingest] = {}
+
         self._con.connect_signal('state-changed', self._on_client_state_changed)
         self._con.connect_signal('resume-failed', self._on_client_resume_failed)
 
@@ -97,6 +102,32 @@ def _on_client_state_changed(self,
     def _reset_state(self) -> None:
         self._mam_query_ids.clear()
         self._catch_up_finished.clear()
+        for queryid in list(self._ingests):
+            self._end_ingest(queryid)
+
+    def _begin_ingest(self, queryid: str) -> None:
+        if queryid not in self._ingests:
+            self._ingests[queryid] = app.storage.archive.begin_ingest()
+
+    def _end_ingest(self, queryid: str) -> None:
+        ingest = self._ingests.pop(queryid, None)
+        if ingest is None:
+            return
+
+        try:
+            ingest.close()
+        except Exception:
+            self._log.exception('Failed to write messages of query %s',
+                                queryid)
+
+    def get_ingest(self, properties: MessageProperties) -> Ingest | None:
+        '''
+        Returns the ingest which the writes for a message of a running
+        query should be passed
+        '''
+        if not properties.is_mam_message:
+            return None
+        return self._ingests.get(properties.mam.query_id)
 
     def _remove_query_id(self, jid: JID) -> None:
         self._mam_query_ids.pop(jid, None)
@@ -168,7 +199,8 @@ def _set_message_archive_info(self,
         if timestamp is not None:
             timestamp = datetime.fromtimestamp(timestamp, timezone.utc)
 
-        app.storage.archive.upsert_row(
+        app.storage.archive.submit(
+            app.storage.archive.upsert_row,
             mod.MAMArchiveState(
                 account_=self._account,
                 remote_jid_=JID.from_string(archive_jid),
@@ -211,7 +243,10 @@ def _mam_message_received(self,
             raise nbxmpp.NodeProcessed
 
         if app.storage.archive.check_if_stanza_id_exists(
-            self._account, properties.remote_jid, stanza_id):
+                self._account,
+                properties.remote_jid,
+                stanza_id,
+                ingest=self.get_ingest(properties)):
             self._log.info('Received duplicated message from MAM: %s', stanza_id)
             raise nbxmpp.NodeProcessed
 
@@ -407,10 +442,14 @@ def _execute_query(self,
 
         queryid = self._get_query_id(jid)
 
-        result = yield self.make_query(jid,
-                                       queryid,
-                                       after=mam_id,
-                                       start=start_date)
+        self._begin_ingest(queryid)
+        try:
+            result = yield self.make_query(jid,
+                                           queryid,
+                                           after=mam_id,
+                                           start=start_date)
+        finally:
+            self._end_ingest(queryid)
 
         self._remove_query_id(result.jid)
 
@@ -427,10 +466,14 @@ def _execute_query(self,
 
             queryid = self._get_query_id(result.jid)
 
-            result = yield self.make_query(result.jid,
-                                           queryid,
-                                           after=result.rsm.last,
-                                           start=start_date)
+            self._begin_ingest(queryid)
+            try:
+                result = yield self.make_query(result.jid,
+                                               queryid,
+                                               after=result.rsm.last,
+                                               start=start_date)
+            finally:
+                self._end_ingest(queryid)
 
             self._remove_query_id(result.jid)
 
@@ -460,6 +503,7 @@ def request_archive_interval(self,
             queryid = self._get_query_id(jid)
         self._mam_query_ids[jid] = queryid
 
+        self._begin_ingest(queryid)
         self.make_query(jid,
                         queryid,
                         after=after,
@@ -472,6 +516,8 @@ def request_archive_interval(self,
     def _on_interval_result(self, task: Task) -> None:
         queryid, start_date, end_date = task.get_user_data()
 
+        self._end_ingest(queryid)
+
         try:
             result = task.finish()
         except (StanzaError, MalformedStanzaError) as error:
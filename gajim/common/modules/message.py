@@ -4,7 +4,10 @@
 
 from __future__ import annotations
 
+from typing import Any
+
 import datetime as dt
+import functools
 import time
 
 import nbxmpp
@@ -17,6 +20,7 @@
 
 from gajim.common import app
 from gajim.common import types
+from gajim.common.events import ApplicationEvent
 from gajim.common.events import MessageAcknowledged
 from gajim.common.events import MessageCorrected
 from gajim.common.events import MessageError
@@ -33,6 +37,7 @@
 from gajim.common.storage.archive.const import ChatDirection
 from gajim.common.storage.archive.const import MessageState
 from gajim.common.storage.archive.const import MessageType
+from gajim.common.storage.base import Ingest
 from gajim.common.storage.base import VALUE_MISSING
 from gajim.common.structs import OutgoingMessage
 
@@ -141,31 +146,7 @@ def _message_received(self,
         stanza_id = self._get_stanza_id(properties)
         origin_id = properties.origin_id
 
-        if (m_type == MessageType.CHAT and
-                direction == ChatDirection.OUTGOING and
-                origin_id is not None):
-            if app.storage.archive.check_if_message_id_exists(
-                    self._account, remote_jid, origin_id):
-                self._log.info('Duplicated message received: %s', origin_id)
-                return
-
-        if (m_type == MessageType.GROUPCHAT and
-                direction == ChatDirection.OUTGOING and
-                origin_id is not None):
-
-            # Use origin-id because some group chats change the message id
-            # on the reflection.
-
-            pk = app.storage.archive.update_pending_message(
-                self._account, remote_jid, origin_id, stanza_id)
-
-            if pk is not None:
-                app.ged.raise_event(
-                    MessageAcknowledged(account=self._account,
-                                        jid=remote_jid,
-                                        pk=pk,
-                                        stanza_id=stanza_id))
-                return
+        ingest = self._client.get_module('MAM').get_ingest(properties)
 
         occupant = self._get_occupant_info(
             remote_jid, direction, timestamp, properties)
@@ -187,7 +168,15 @@ def _message_received(self,
             message_text = get_eme_message(properties.eme)
 
         if not message_text:
-            self._log.debug('Received message without text')
+            # The reflection of a pending message is still acknowledged
+            self._write_received_message(remote_jid=remote_jid,
+                                         m_type=m_type,
+                                         direction=direction,
+                                         origin_id=origin_id,
+                                         stanza_id=stanza_id,
+                                         message_data=None,
+                                         from_mam=properties.is_mam_message,
+                                         ingest=ingest)
             return
 
         securitylabel_data = None
@@ -237,25 +226,95 @@ def _message_received(self,
             thread_id_=properties.thread,
         )
 
+        self._write_received_message(remote_jid=remote_jid,
+                                     m_type=m_type,
+                                     direction=direction,
+                                     origin_id=origin_id,
+                                     stanza_id=stanza_id,
+                                     message_data=message_data,
+                                     from_mam=properties.is_mam_message,
+                                     ingest=ingest)
+
+    def _write_received_message(self,
+                                *,
+                                ingest: Ingest | None,
+                                **kwargs: Any
+                                ) -> None:
+
+        store = functools.partial(self._store_received_message, **kwargs)
+        if ingest is not None:
+            self._raise_stored_event(store(ingest=ingest))
+            return
+
+        app.storage.archive.submit(store, callback=self._raise_stored_event)
+
+    def _store_received_message(self,
+                                *,
+                                remote_jid: JID,
+                                m_type: MessageType,
+                                direction: ChatDirection,
+                                origin_id: str | None,
+                                stanza_id: str | None,
+                                message_data: mod.Message | None,
+                                from_mam: bool,
+                                ingest: Ingest | None = None
+                                ) -> ApplicationEvent | None:
+        '''
+        Write a received message and return the event to raise. Without
+        an ingest this is called in the writer thread, so the checks see
+        the messages which were sent or received before.
+        '''
+
+        if (m_type == MessageType.CHAT and
+                direction == ChatDirection.OUTGOING and
+                origin_id is not None):
+            if app.storage.archive.check_if_message_id_exists(
+                    self._account, remote_jid, origin_id, ingest=ingest):
+                self._log.info('Duplicated message received: %s', origin_id)
+                return None
+
+        if (m_type == MessageType.GROUPCHAT and
+                direction == ChatDirection.OUTGOING and
+                origin_id is not None):
+
+            # Use origin-id because some group chats change the message id
+            # on the reflection.
+
+            pk = app.storage.archive.update_pending_message(
+                self._account, remote_jid, origin_id, stanza_id, ingest=ingest)
+
+            if pk is not None:
+                return MessageAcknowledged(account=self._account,
+                                           jid=remote_jid,
+                                           pk=pk,
+                                           stanza_id=stanza_id)
+
+        if message_data is None:
+            self._log.debug('Received message without text')
+            return None
+
         try:
             pk = app.storage.archive.insert_object(
-                message_data, ignore_on_conflict=False)
+                message_data, ignore_on_conflict=False, ingest=ingest)
         except sqlalchemy.exc.IntegrityError:
             self._log.exception('Insertion Error')
-            return
+            return None
 
-        if correction_id is not None:
-            event = MessageCorrected(account=self._account,
-                                     jid=remote_jid,
-                                     corrected_message=message_data)
-            app.ged.raise_event(event)
-            return
+        if message_data.correction_id is not None:
+            return MessageCorrected(account=self._account,
+                                    jid=remote_jid,
+                                    corrected_message=message_data)
 
-        app.ged.raise_event(MessageReceived(account=self._account,
-                                            jid=remote_jid,
-                                            m_type=m_type,
-                                            from_mam=properties.is_mam_message,
-                                            pk=pk))
+        return MessageReceived(account=self._account,
+                               jid=remote_jid,
+                               m_type=m_type,
+                               from_mam=from_mam,
+                               pk=pk)
+
+    @staticmethod
+    def _raise_stored_event(event: ApplicationEvent | None) -> None:
+        if event is not None:
+            app.ged.raise_event(event)
 
     def _get_message_timestamp(
         self,
@@ -575,8 +634,19 @@ def send_message(self, message: OutgoingMessage) -> None:
             occupant_=occupant,
         )
 
+        # The message is shown once it is written
+        app.storage.archive.submit(
+            app.storage.archive.insert_object,
+            message_data,
+            callback=lambda pk: self._on_sent_message_stored(
+                pk, message, message_data))
+
+    def _on_sent_message_stored(self,
+                                pk: int,
+                                message: OutgoingMessage,
+                                message_data: mod.Message
+                                ) -> None:
 
-        pk = app.storage.archive.insert_object(message_data)
         if pk == -1:
             return
 
@@ -20,6 +20,7 @@
 
 from nbxmpp import NodeProcessed
 from nbxmpp.namespaces import Namespace
+from nbxmpp.protocol import JID
 from nbxmpp.protocol import Message
 from nbxmpp.structs import MessageProperties
 from nbxmpp.structs import StanzaHandler
@@ -147,8 +148,23 @@ def _insert_moderation_message(
             timestamp=timestamp,
         )
 
-        pk = app.storage.archive.insert_row(
-            moderation_data, ignore_on_conflict=True)
+        ingest = self._client.get_module('MAM').get_ingest(properties)
+        if ingest is not None:
+            pk = app.storage.archive.insert_row(
+                moderation_data, ignore_on_conflict=True, ingest=ingest)
+            self._on_moderation_stored(pk, remote_jid, moderation_data)
+        else:
+            app.storage.archive.submit(
+                lambda: app.storage.archive.insert_row(
+                    moderation_data, ignore_on_conflict=True),
+                callback=lambda pk: self._on_moderation_stored(
+                    pk, remote_jid, moderation_data))
+
+    def _on_moderation_stored(self,
+                              pk: int,
+                              remote_jid: JID,
+                              moderation_data: mod.Moderation
+                              ) -> None:
         if pk == -1:
             return
 
@@ -207,8 +223,17 @@ def _insert_tombstone(
             occupant_=occupant_data,
         )
 
-        pk = app.storage.archive.insert_object(message_data)
-
+        ingest = self._client.get_module('MAM').get_ingest(properties)
+        if ingest is not None:
+            pk = app.storage.archive.insert_object(message_data, ingest=ingest)
+            self._on_tombstone_stored(pk, remote_jid)
+        else:
+            app.storage.archive.submit(
+                app.storage.archive.insert_object,
+                message_data,
+                callback=lambda pk: self._on_tombstone_stored(pk, remote_jid))
+
+    def _on_tombstone_stored(self, pk: int, remote_jid: JID) -> None:
         app.ged.raise_event(
             MessageReceived(
                 account=self._account,
@@ -93,13 +93,22 @@ def _process_message_receipt(self,
                 remote_jid_=properties.remote_jid,
                 id=properties.receipt.id,
                 timestamp=timestamp)
-            app.storage.archive.insert_object(receipt_data)
-
-            app.ged.raise_event(
-                ReceiptReceived(
-                    account=self._account,
-                    jid=properties.remote_jid,
-                    receipt_id=properties.receipt.id))
+            event = ReceiptReceived(
+                account=self._account,
+                jid=properties.remote_jid,
+                receipt_id=properties.receipt.id)
+
+            # Handlers load the message together with its receipt, so the
+            # event is raised once the receipt is written
+            ingest = self._client.get_module('MAM').get_ingest(properties)
+            if ingest is not None:
+                app.storage.archive.insert_object(receipt_data, ingest=ingest)
+                app.ged.raise_event(event)
+            else:
+                app.storage.archive.submit(
+                    app.storage.archive.insert_object,
+                    receipt_data,
+                    callback=lambda _pk: app.ged.raise_event(event))
 
             raise nbxmpp.NodeProcessed
 
@@ -47,27 +47,32 @@ def __init__(self, client: types.Client) -> None:
                           ns=Namespace.ROSTER),
         ]
 
-        self._roster: dict[JID, RosterItem] = {}
+        # Items are loaded from the database on first use
+        self._items: dict[JID, RosterItem] | None = None
 
         # Groups cache for performance
         self._groups = None
 
     def load_roster(self) -> None:
         self._log.info('Load from database')
-        roster = app.storage.cache.load_roster(self._account)
-        if not roster:
+        jids = app.storage.cache.load_roster_jids(self._account)
+        if not jids:
             self._log.info('Database empty, reset roster version')
             app.settings.set_account_setting(
                 self._account, 'roster_version', '')
+            self._items = {}
             return
 
-        for jid in roster:
+        for jid in jids:
             self._con.get_module('Contacts').add_contact(jid)
 
-        self._roster = roster
+        self._log.info('%s contacts loaded', len(jids))
 
-    def _store_roster(self) -> None:
-        app.storage.cache.store_roster(self._account, self._roster)
+    @property
+    def _roster(self) -> dict[JID, RosterItem]:
+        if self._items is None:
+            self._items = app.storage.cache.load_roster(self._account)
+        return self._items
 
     def get_size(self) -> int:
         return len(self._roster)
@@ -111,15 +116,25 @@ def _on_request_roster(self, task: Task) -> None:
         self._con.connect_machine()
 
     def _set_roster_from_data(self, items: list[RosterItem]) -> None:
-        self._roster.clear()
-        self._groups = None
+        old_roster = self._roster
+        roster: dict[JID, RosterItem] = {}
+        changed: list[RosterItem] = []
 
         for item in items:
             self._log.info(item)
             self._con.get_module('Contacts').add_contact(item.jid)
-            self._roster[item.jid] = item
+            roster[item.jid] = item
+            if old_roster.get(item.jid) != item:
+                changed.append(item)
+
+        removed = old_roster.keys() - roster.keys()
+
+        self._items = roster
+        self._groups = None
 
-        self._store_roster()
+        # Only write what differs from the stored roster
+        app.storage.cache.remove_roster_items(self._account, removed)
+        app.storage.cache.store_roster_items(self._account, changed)
 
     def _process_roster_push(self,
                              _con: types.xmppClient,
@@ -132,11 +147,12 @@ def _process_roster_push(self,
         item = properties.roster.item
         if item.subscription == 'remove':
             self._roster.pop(item.jid)
+            app.storage.cache.remove_roster_items(self._account, [item.jid])
         else:
             self._roster[item.jid] = item
+            app.storage.cache.store_roster_items(self._account, [item])
 
         self._groups = None
-        self._store_roster()
 
         self._log.info('New version: %s', properties.roster.version)
         app.settings.set_account_setting(self._account,
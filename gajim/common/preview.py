@@ -11,7 +11,10 @@
 import os
 import re
 import uuid
+from collections import deque
 from collections.abc import Callable
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from dataclasses import field
 from pathlib import Path
@@ -28,11 +31,12 @@
 from gajim.common import configpaths
 from gajim.common import regex
 from gajim.common.const import MIME_TYPES
+from gajim.common.file_cache import FileCache
 from gajim.common.helpers import get_tls_error_phrases
 from gajim.common.helpers import load_file_async
 from gajim.common.helpers import write_file_async
 from gajim.common.i18n import _
-from gajim.common.preview_helpers import aes_decrypt
+from gajim.common.preview_helpers import aes_decrypt_file
 from gajim.common.preview_helpers import create_thumbnail
 from gajim.common.preview_helpers import filename_from_uri
 from gajim.common.preview_helpers import get_image_paths
@@ -40,6 +44,7 @@
 from gajim.common.preview_helpers import guess_mime_type
 from gajim.common.preview_helpers import parse_fragment
 from gajim.common.preview_helpers import pixbuf_from_data
+from gajim.common.preview_helpers import read_file_head
 from gajim.common.preview_helpers import split_geo_uri
 from gajim.common.storage.archive import models as mod
 from gajim.common.types import GdkPixbufType
@@ -56,6 +61,10 @@
 
 AudioSampleT = list[tuple[float, float]]
 
+THUMBNAIL_WORKERS = min(4, os.cpu_count() or 1)
+
+ThumbnailCallbackT = Callable[['Preview', bytes | None], Any]
+
 
 @dataclass
 class AudioPreviewState:
@@ -168,16 +177,20 @@ def is_aes_encrypted(self) -> bool:
     def thumb_exists(self) -> bool:
         if self.thumb_path is None:
             return False
-        return self.thumb_path.exists()
+        return app.preview_manager.thumb_cache.contains(self.thumb_path)
 
     @property
     def orig_exists(self) -> bool:
         if self.orig_path is None:
             return False
-        return self.orig_path.exists()
+        return app.preview_manager.orig_cache.contains(self.orig_path)
+
+    @property
+    def is_on_screen(self) -> bool:
+        return self._widget.is_on_screen()
 
-    def create_thumbnail(self, data: bytes) -> bool:
-        self.thumbnail = create_thumbnail(data, self.size, self.mime_type)
+    def set_thumbnail(self, thumbnail: bytes | None) -> bool:
+        self.thumbnail = thumbnail
         if self.thumbnail is None:
             self.info_message = _('Creating thumbnail failed')
             log.warning('Creating thumbnail failed for: %s', self.orig_path)
@@ -192,6 +205,201 @@ def update_progress(self, progress: float, request: HTTPRequest) -> None:
         self._widget.update_progress(self, progress)
 
 
+@dataclass
+class ThumbnailJob:
+    preview: Preview
+    data: bytes
+    callback: ThumbnailCallbackT
+
+
+class ThumbnailWorkerPool:
+    '''
+    Creates thumbnails in worker threads. Jobs are handed to the workers
+    from the main loop, jobs for previews which are on screen go first.
+    '''
+
+    def __init__(self, max_workers: int = THUMBNAIL_WORKERS) -> None:
+        self._max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='Thumbnailer')
+        self._pending: deque[ThumbnailJob] = deque()
+        self._running = 0
+
+    def submit(self,
+               preview: Preview,
+               data: bytes,
+               callback: ThumbnailCallbackT
+               ) -> None:
+
+        self._pending.append(ThumbnailJob(preview, data, callback))
+        self._dispatch()
+
+    def remove(self, preview: Preview) -> None:
+        '''
+        Drop the pending jobs of a preview, e.g. when its widget is destroyed
+        '''
+        self._pending = deque(
+            job for job in self._pending if job.preview is not preview)
+
+    def _dispatch(self) -> None:
+        while self._pending and self._running < self._max_workers:
+            job = self._pop_next_job()
+            self._running += 1
+            future = self._executor.submit(create_thumbnail,
+                                           job.data,
+                                           job.preview.size,
+                                           job.preview.mime_type)
+            future.add_done_callback(
+                lambda f, job=job: GLib.idle_add(self._on_finished, f, job))
+
+    def _pop_next_job(self) -> ThumbnailJob:
+        # Visibility can only be checked on the main loop, and it changes
+        # while scrolling, so it is checked when a worker becomes free
+        for job in self._pending:
+            if job.preview.is_on_screen:
+                self._pending.remove(job)
+                return job
+        return self._pending.popleft()
+
+    def _on_finished(self,
+                     future: Future[bytes | None],
+                     job: ThumbnailJob
+                     ) -> bool:
+
+        self._running -= 1
+
+        thumbnail = None
+        try:
+            thumbnail = future.result()
+        except Exception:
+            log.exception('Creating thumbnail failed')
+
+        job.callback(job.preview, thumbnail)
+        self._dispatch()
+        return False
+
+
+class Download:
+    '''
+    A download which is shared by all previews of the same URI
+    '''
+
+    def __init__(self, preview: Preview, force: bool) -> None:
+        # The first preview determines the paths and the decryption key,
+        # it is kept even if its widget is destroyed
+        self.preview = preview
+        self.force = force
+        self.previews: list[Preview] = []
+        self.request: HTTPRequest | None = None
+        self.cancelled = False
+        self.mime_type = ''
+
+        # The response body is streamed into this file and only moved
+        # to orig_path once the download is complete (and decrypted).
+        # A cancelled request may still be writing to its file, so every
+        # download gets its own.
+        assert preview.orig_path is not None
+        self.orig_path = preview.orig_path
+        self.path = self.orig_path.with_name(
+            f'{self.orig_path.name}.{uuid.uuid4().hex[:8]}.part')
+
+    @property
+    def uri(self) -> str:
+        return self.preview.uri
+
+    @property
+    def is_on_screen(self) -> bool:
+        return any(preview.is_on_screen for preview in self.previews)
+
+
+class DownloadScheduler:
+    '''
+    Limits the number of parallel downloads and shares one download
+    between all previews of the same URI. Downloads of previews which
+    are on screen are started first.
+    '''
+
+    def __init__(self, start_func: Callable[[Download], HTTPRequest]) -> None:
+        self._start_func = start_func
+        self._downloads: dict[str, Download] = {}
+        self._queue: deque[Download] = deque()
+        self._running = 0
+
+    def add(self, preview: Preview, force: bool) -> None:
+        download = self._downloads.get(preview.uri)
+        if download is None:
+            download = Download(preview, force)
+            self._downloads[preview.uri] = download
+            self._queue.append(download)
+        else:
+            log.info('Join download in progress: %s', preview.request_uri)
+            download.force = download.force or force
+
+        download.previews.append(preview)
+        preview.download_in_progress = True
+        self._dispatch()
+
+    def remove(self, preview: Preview) -> None:
+        '''
+        Stop waiting for the download of a preview, the download is
+        cancelled if no other preview waits for it
+        '''
+        download = self._downloads.get(preview.uri)
+        if download is None or preview not in download.previews:
+            return
+
+        download.previews.remove(preview)
+        preview.download_in_progress = False
+        if not download.previews:
+            self.cancel(download)
+
+    def cancel(self, download: Download) -> None:
+        if download.cancelled:
+            return
+
+        download.cancelled = True
+        self._forget(download)
+
+        if download.request is None:
+            self._queue.remove(download)
+            return
+
+        # The request keeps running until its callback is called, it is
+        # counted until then
+        download.request.cancel()
+
+    def finish(self, download: Download) -> None:
+        '''
+        Called when the request of a download stopped, also if it was
+        cancelled
+        '''
+        self._running -= 1
+        if not download.cancelled:
+            self._forget(download)
+        self._dispatch()
+
+    def _forget(self, download: Download) -> None:
+        if self._downloads.get(download.uri) is download:
+            del self._downloads[download.uri]
+
+        for preview in download.previews:
+            preview.download_in_progress = False
+
+    def _dispatch(self) -> None:
+        limit = app.settings.get('preview_max_parallel_downloads')
+        while self._queue and self._running < limit:
+            download = self._pop_next_download()
+            self._running += 1
+            download.request = self._start_func(download)
+
+    def _pop_next_download(self) -> Download:
+        for download in self._queue:
+            if download.is_on_screen:
+                self._queue.remove(download)
+                return download
+        return self._queue.popleft()
+
+
 class PreviewManager:
     def __init__(self) -> None:
         self._orig_dir = Path(configpaths.get('MY_DATA')) / 'downloads'
@@ -203,8 +411,24 @@ def __init__(self) -> None:
         if GLib.mkdir_with_parents(str(self._thumb_dir), 0o700) != 0:
             log.error('Failed to create: %s', self._thumb_dir)
 
+        # The downloads are visible to the user, the indexes are kept
+        # in the cache directory
+        cache_dir = Path(configpaths.get('MY_CACHE'))
+        self.orig_cache = FileCache(self._orig_dir,
+                                    cache_dir / 'downloads.index.json',
+                                    'preview_downloads_cache_size')
+        self.thumb_cache = FileCache(self._thumb_dir,
+                                     cache_dir / 'downloads.thumb.index.json',
+                                     'preview_thumbnails_cache_size')
+
         self._previews: dict[str, Preview] = {}
 
+        self._thumbnailer = ThumbnailWorkerPool()
+        # Decrypting a download can take a while, it is done in a worker
+        self._store_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='PreviewStore')
+        self._scheduler = DownloadScheduler(self._start_download)
+
         # Holds active audio preview sessions
         # for resuming after switching chats
         self._audio_sessions: dict[int, AudioPreviewState] = {}
@@ -216,6 +440,10 @@ def __init__(self) -> None:
         log.info('Supported mime types for preview')
         log.info(sorted(PREVIEWABLE_MIME_TYPES))
 
+    def shutdown(self) -> None:
+        self.orig_cache.shutdown()
+        self.thumb_cache.shutdown()
+
     def get_preview(self, preview_id: str) -> Preview | None:
         return self._previews.get(preview_id)
 
@@ -338,6 +566,7 @@ def create_preview(self,
 
         preview = self._process_web_uri(uri, widget, from_us, context)
         self._previews[preview.id] = preview
+        widget.connect('destroy', self._on_widget_destroyed, preview)
 
         if not app.settings.get('enable_file_preview'):
             preview.update_widget()
@@ -395,21 +624,37 @@ def _on_orig_load_finished(self,
 
         if data is None:
             log.error('%s: %s', preview.orig_path.name, error)
+            self.orig_cache.remove(preview.orig_path)
+            preview.update_widget()
             return
 
+        self.orig_cache.touch(preview.orig_path)
         preview.mime_type = guess_mime_type(preview.orig_path, data)
         preview.file_size = os.path.getsize(preview.orig_path)
         if preview.is_previewable:
-            if preview.create_thumbnail(data):
-                assert preview.thumbnail is not None
-                write_file_async(preview.thumb_path,
-                                 preview.thumbnail,
-                                 self._on_thumb_write_finished,
-                                 preview)
+            self._thumbnailer.submit(preview,
+                                     data,
+                                     self._on_thumbnail_created)
         preview.update_widget()
 
-    @staticmethod
-    def _on_thumb_load_finished(data: bytes | None,
+    def _on_thumbnail_created(self,
+                              preview: Preview,
+                              thumbnail: bytes | None
+                              ) -> None:
+
+        if not preview.set_thumbnail(thumbnail):
+            preview.update_widget()
+            return
+
+        assert preview.thumb_path is not None
+        assert preview.thumbnail is not None
+        write_file_async(preview.thumb_path,
+                         preview.thumbnail,
+                         self._on_thumb_write_finished,
+                         preview)
+
+    def _on_thumb_load_finished(self,
+                                data: bytes | None,
                                 error: Gio.AsyncResult,
                                 preview: Preview) -> None:
 
@@ -418,11 +663,24 @@ def _on_thumb_load_finished(data: bytes | None,
 
         if data is None:
             log.error('%s: %s', preview.thumb_path.name, error)
+            self.thumb_cache.remove(preview.thumb_path)
+            # Create the thumbnail again
+            load_file_async(preview.orig_path,
+                            self._on_orig_load_finished,
+                            preview)
             return
 
+        self.thumb_cache.touch(preview.thumb_path)
+        self.orig_cache.touch(preview.orig_path)
+
         preview.thumbnail = data
         preview.mime_type = guess_mime_type(preview.orig_path, data)
-        preview.file_size = os.path.getsize(preview.orig_path)
+        try:
+            preview.file_size = os.path.getsize(preview.orig_path)
+        except OSError:
+            # The original file has been evicted, the thumbnail is
+            # still displayed and the file can be downloaded again
+            self.orig_cache.remove(preview.orig_path)
 
         try:
             pixbuf = pixbuf_from_data(preview.thumbnail)
@@ -438,6 +696,11 @@ def _on_thumb_load_finished(data: bytes | None,
 
         preview.update_widget(data=pixbuf)
 
+    def _on_widget_destroyed(self, _widget: Any, preview: Preview) -> None:
+        self._previews.pop(preview.id, None)
+        self._scheduler.remove(preview)
+        self._thumbnailer.remove(preview)
+
     def download_content(self,
                          preview: Preview,
                          force: bool = False
@@ -452,16 +715,22 @@ def download_content(self,
             # This means we can not apply proxy settings
             return
 
+        self._scheduler.add(preview, force)
+
+    def _start_download(self, download: Download) -> HTTPRequest:
+        preview = download.preview
         log.info('Start downloading: %s', preview.request_uri)
-        preview.download_in_progress = True
 
         request = create_http_request(preview.account)
-        request.set_user_data(preview)
+        request.set_user_data(download)
         request.connect('accept-certificate', self._accept_certificate)
-        request.connect('content-sniffed', self._on_content_sniffed, force)
+        request.connect('content-sniffed', self._on_content_sniffed)
         request.connect('response-progress', self._on_response_progress)
 
+        request.set_response_body_from_path(download.path)
+
         request.send('GET', preview.request_uri, callback=self._on_finished)
+        return request
 
     def _accept_certificate(self,
                             request: HTTPRequest,
@@ -477,124 +746,140 @@ def _accept_certificate(self,
         log.warning(
             'TLS verification failed: %s (0x%02x)', phrases, certificate_errors)
 
-        preview = cast(Preview, request.get_user_data())
-        preview.info_message = _('TLS verification failed: %s') % phrases[0]
-        preview.download_in_progress = False
-        preview.update_widget()
+        download = cast(Download, request.get_user_data())
+        for preview in download.previews:
+            preview.info_message = _('TLS verification failed: %s') % phrases[0]
+            preview.download_in_progress = False
+            preview.update_widget()
         return False
 
     def _on_content_sniffed(self,
                             request: HTTPRequest,
                             content_length: int,
-                            content_type: str,
-                            force: bool
+                            content_type: str
                             ) -> None:
 
         uri = request.get_uri().to_string()
-        preview = cast(Preview, request.get_user_data())
-        preview.mime_type = content_type
-        preview.file_size = content_length
+        download = cast(Download, request.get_user_data())
+        download.mime_type = content_type
+        for preview in download.previews:
+            preview.mime_type = content_type
+            preview.file_size = content_length
 
-        if content_type not in ALLOWED_MIME_TYPES and not force:
+        if content_type not in ALLOWED_MIME_TYPES and not download.force:
             log.info('Not an allowed content type: %s, %s', content_type, uri)
-            request.cancel()
-            preview.download_in_progress = False
+            self._scheduler.cancel(download)
             return
 
+        info_message = None
         if content_length > int(app.settings.get('preview_max_file_size')):
             log.info(
                 'File size (%s) too big for URL: "%s"',
                 content_length, uri)
-            if force:
-                preview.info_message = None
-            else:
-                request.cancel()
-                preview.download_in_progress = False
-                preview.info_message = _('Automatic preview disabled '
-                                         '(file too big)')
+            if not download.force:
+                self._scheduler.cancel(download)
+                info_message = _('Automatic preview disabled (file too big)')
 
-        preview.update_widget()
+        for preview in download.previews:
+            preview.info_message = info_message
+            preview.update_widget()
 
     def _on_response_progress(self,
                               request: HTTPRequest,
                               progress: float,
                               ) -> None:
 
-        preview = cast(Preview, request.get_user_data())
-        preview.update_progress(progress, request)
+        download = cast(Download, request.get_user_data())
+        for preview in download.previews:
+            preview.update_progress(progress, request)
 
     def _on_finished(self, request: HTTPRequest) -> None:
 
-        preview = cast(Preview, request.get_user_data())
-        preview.download_in_progress = False
+        download = cast(Download, request.get_user_data())
+        self._scheduler.finish(download)
 
         if not request.is_complete():
             error = request.get_error_string()
-            log.warning('Download failed: %s - %s', preview.request_uri, error)
-            if request.get_error() != HTTPRequestError.CANCELLED:
-                preview.info_message = _('Download failed (%s)') % error
-            preview.update_widget()
+            log.warning('Download failed: %s - %s',
+                        download.preview.request_uri, error)
+            download.path.unlink(missing_ok=True)
+            for preview in download.previews:
+                if request.get_error() != HTTPRequestError.CANCELLED:
+                    preview.info_message = _('Download failed (%s)') % error
+                preview.update_widget()
             return
 
-        preview.info_message = None
+        future = self._store_executor.submit(self._store_download, download)
+        future.add_done_callback(
+            lambda f: GLib.idle_add(self._on_download_stored, f, download))
 
-        data = request.get_data()
-        if not data:
-            return
+    def _on_download_stored(self,
+                            future: Future[None],
+                            download: Download
+                            ) -> bool:
 
-        if preview.is_aes_encrypted:
-            if preview.key is not None and preview.iv is not None:
-                try:
-                    data = aes_decrypt(preview.key, preview.iv, data)
-                except Exception as error:
-                    log.exception('Decryption failed')
-                    preview.info_message = _('Decryption failed')
-                    preview.update_widget()
-                    return
+        download.path.unlink(missing_ok=True)
 
-        if preview.mime_type == 'application/octet-stream':
-            if preview.orig_path is not None:
-                preview.mime_type = guess_mime_type(preview.orig_path, data)
+        try:
+            future.result()
+        except Exception as error:
+            log.exception('Storing download failed: %s', download.orig_path)
+            if download.preview.is_aes_encrypted:
+                info_message = _('Decryption failed')
+            else:
+                info_message = _('Download failed (%s)') % error
+            for preview in download.previews:
+                preview.info_message = info_message
+                preview.update_widget()
+            return False
 
-        write_file_async(preview.orig_path,
-                         data,
-                         self._on_orig_write_finished,
-                         preview)
+        if not download.orig_path.exists():
+            return False
 
-        if not app.settings.get('enable_file_preview'):
-            preview.update_widget()
-            return
+        log.info('File stored: %s', download.orig_path.name)
+        self.orig_cache.add(download.orig_path)
+        file_size = os.path.getsize(download.orig_path)
 
-        if preview.is_previewable:
-            if preview.create_thumbnail(data):
-                assert preview.thumb_path is not None
-                write_file_async(preview.thumb_path,
-                                 preview.thumbnail,
-                                 self._on_thumb_write_finished,
-                                 preview)
-            else:
-                preview.update_widget()
+        mime_type = download.mime_type
+        if mime_type == 'application/octet-stream':
+            mime_type = guess_mime_type(
+                download.orig_path, read_file_head(download.orig_path))
+
+        for preview in download.previews:
+            preview.info_message = None
+            preview.file_size = file_size
+            preview.mime_type = mime_type
+
+            if (app.settings.get('enable_file_preview') and
+                    preview.is_previewable):
+                # Only images are read back into memory for the thumbnailer
+                load_file_async(download.orig_path,
+                                self._on_orig_load_finished,
+                                preview)
+                continue
+
+            preview.update_widget()
+        return False
 
     @staticmethod
-    def _on_orig_write_finished(_result: bool,
-                                error: GLib.Error | None,
-                                preview: Preview) -> None:
-        if preview.orig_path is None:
+    def _store_download(download: Download) -> None:
+        if not download.path.exists() or download.path.stat().st_size == 0:
             return
 
-        if error is not None:
-            log.error('%s: %s', preview.orig_path.name, error)
+        preview = download.preview
+        if (preview.is_aes_encrypted and
+                preview.key is not None and
+                preview.iv is not None):
+            aes_decrypt_file(preview.key,
+                             preview.iv,
+                             download.path,
+                             download.orig_path)
             return
 
-        log.info('File stored: %s', preview.orig_path.name)
-        preview.file_size = os.path.getsize(preview.orig_path)
-        if not preview.is_previewable:
-            # Don’t update preview if thumb is already displayed,
-            # but update preview for audio files
-            preview.update_widget()
+        download.path.replace(download.orig_path)
 
-    @staticmethod
-    def _on_thumb_write_finished(_result: bool,
+    def _on_thumb_write_finished(self,
+                                 _result: bool,
                                  error: GLib.Error | None,
                                  preview: Preview) -> None:
         if preview.thumb_path is None:
@@ -602,12 +887,13 @@ def _on_thumb_write_finished(_result: bool,
 
         if error is not None:
             log.error('%s: %s', preview.thumb_path.name, error)
-            if not preview.thumb_exists:
+            if not preview.thumb_path.exists():
                 # Generating a preview can fail if the file already exists
                 # Only abort if thumbnail has not been stored in preview
                 return
 
         log.info('Thumbnail stored: %s ', preview.thumb_path.name)
+        self.thumb_cache.add(preview.thumb_path)
 
         if preview.thumbnail is None:
             return
@@ -627,5 +913,5 @@ def _on_thumb_write_finished(_result: bool,
         preview.update_widget(data=pixbuf)
 
     def cancel_download(self, preview: Preview) -> None:
-        preview.request.cancel()
-        preview.download_in_progress = False
+        self._scheduler.remove(preview)
+        preview.update_widget()
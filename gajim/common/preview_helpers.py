@@ -10,6 +10,7 @@
 import logging
 import math
 import mimetypes
+import uuid
 from io import BytesIO
 from pathlib import Path
 from urllib.parse import ParseResult
@@ -34,6 +35,11 @@
 
 ImageFile.LOAD_TRUNCATED_IMAGES = True
 
+# Enough data for content based MIME type detection
+SNIFF_SIZE = 4096
+DECRYPTION_CHUNK_SIZE = 64 * 1024
+GCM_TAG_SIZE = 16
+
 
 class Coords(NamedTuple):
     location: str
@@ -400,6 +406,46 @@ def aes_decrypt(key: bytes, iv: bytes, payload: bytes) -> bytes:
     return decryptor.update(data) + decryptor.finalize()
 
 
+def aes_decrypt_file(key: bytes, iv: bytes, source: Path, target: Path) -> None:
+    # Decrypts source chunk by chunk into target, the authentication
+    # tag is stored in the last bytes of the payload. The plaintext is
+    # only moved to target once the tag is verified.
+    size = source.stat().st_size
+    if size < GCM_TAG_SIZE:
+        raise ValueError(f'Payload too short: {size}')
+
+    temp_path = target.with_name(f'{target.name}.{uuid.uuid4().hex[:8]}.dec')
+    try:
+        with source.open('rb') as input_file, temp_path.open('wb') as output_file:
+            input_file.seek(size - GCM_TAG_SIZE)
+            tag = input_file.read(GCM_TAG_SIZE)
+            input_file.seek(0)
+
+            decryptor = Cipher(algorithms.AES(key),
+                               GCM(iv, tag=tag),
+                               backend=default_backend()).decryptor()
+
+            remaining = size - GCM_TAG_SIZE
+            while remaining:
+                chunk = input_file.read(min(DECRYPTION_CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise ValueError('Payload truncated')
+                remaining -= len(chunk)
+                output_file.write(decryptor.update(chunk))
+            output_file.write(decryptor.finalize())
+
+        temp_path.replace(target)
+
+    finally:
+        # Don't leave unauthenticated plaintext behind
+        temp_path.unlink(missing_ok=True)
+
+
+def read_file_head(file_path: Path, size: int = SNIFF_SIZE) -> bytes:
+    with file_path.open('rb') as file:
+        return file.read(size)
+
+
 def contains_audio_streams(file_path: Path) -> bool:
     # Check if it is really an audio file
 
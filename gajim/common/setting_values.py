@@ -101,11 +101,14 @@ class _ACCOUNTDEFAULT:
     'autoawaytime',
     'autoxatime',
     'chat_handle_position',
+    'conversation_view_cache_rows',
+    'conversation_view_cache_size',
     'dark_theme',
     'file_transfers_port',
     'gc_sync_threshold_private_default',
     'gc_sync_threshold_public_default',
     'groupchat_roster_width',
+    'ibb_send_window',
     'mainwin_height',
     'mainwin_width',
     'mainwin_x_position',
@@ -113,8 +116,11 @@ class _ACCOUNTDEFAULT:
     'notification_position_x',
     'notification_position_y',
     'notification_timeout',
+    'preview_downloads_cache_size',
     'preview_max_file_size',
+    'preview_max_parallel_downloads',
     'preview_size',
+    'preview_thumbnails_cache_size',
 ]
 
 FloatSettings = Literal[
@@ -181,6 +187,8 @@ class _ACCOUNTDEFAULT:
     'confirm_block': '',
     'confirm_close_muc': True,
     'confirm_on_window_delete': True,
+    'conversation_view_cache_rows': 2000,
+    'conversation_view_cache_size': 5,
     'dark_theme': 2,
     'date_format': '%x',
     'date_time_format': '%c',
@@ -205,6 +213,7 @@ class _ACCOUNTDEFAULT:
     'global_proxy': '',
     'groupchat_roster_width': 250,
     'hide_groupchat_occupants_list': False,
+    'ibb_send_window': 8,
     'ignore_incoming_attention': False,
     'is_window_visible': True,
     'last_save_dir': '',
@@ -235,9 +244,12 @@ class _ACCOUNTDEFAULT:
     'positive_184_ack': False,
     'preview_allow_all_images': False,
     'preview_anonymous_muc': False,
+    'preview_downloads_cache_size': 0,
     'preview_leftclick_action': 'open',
     'preview_max_file_size': 10485760,
+    'preview_max_parallel_downloads': 4,
     'preview_size': 300,
+    'preview_thumbnails_cache_size': 268435456,
     'preview_verify_https': True,
     'print_status_in_chats': False,
     'remote_control': False,
@@ -656,6 +668,13 @@ class WorkspaceSettings(TypedDict):
         'confirm_close_muc': _('Ask before closing a group chat tab/window.'),
         'confirm_on_window_delete': _(
             'Ask before quitting when Gajim’s window is closed'),
+        'conversation_view_cache_rows': _(
+            'Maximum number of rows kept by all conversations in the '
+            'conversation view cache together.'),
+        'conversation_view_cache_size': _(
+            'Number of recently shown conversations which are kept, so '
+            'switching back to them does not load them again. '
+            '0 disables the cache.'),
         'date_format': 'https://docs.python.org/3/library/time.html#time.strftime',  # noqa: E501
         'date_time_format': 'https://docs.python.org/3/library/time.html#time.strftime',  # noqa: E501
         'dev_force_bookmark_2': _('Force Bookmark 2 usage'),
@@ -680,6 +699,9 @@ class WorkspaceSettings(TypedDict):
             'Character to add after nickname when using nickname completion '
             '(tab) in group chat.'),
         'groupchat_roster_width': _('Width of group chat roster in pixel'),
+        'ibb_send_window': _(
+            'Number of data packets which are sent without waiting for an '
+            'answer during In-Band Bytestream file transfers.'),
         'ignore_incoming_attention': _(
             'If enabled, Gajim will ignore incoming attention '
             'requests ("wizz").'),
@@ -696,6 +718,17 @@ class WorkspaceSettings(TypedDict):
         'notify_on_all_muc_messages': '',
         'plugins_repository_enabled': _(
             'If enabled, Gajim offers to download plugins hosted on gajim.org'),
+        'preview_downloads_cache_size': _(
+            'Maximum size in bytes of files downloaded for previews. The '
+            'least recently used files are removed when it is exceeded. '
+            '0 means no limit.'),
+        'preview_max_parallel_downloads': _(
+            'Maximum number of files which are downloaded at the same time '
+            'for previews.'),
+        'preview_thumbnails_cache_size': _(
+            'Maximum size in bytes of cached preview thumbnails. The least '
+            'recently used thumbnails are removed when it is exceeded. '
+            '0 means no limit.'),
         'save_main_window_position': _(
             'If enabled, Gajim will save the main window position when hiding '
             'it, and restore it when showing the window again.'),
@@ -5,7 +5,6 @@
 from typing import Any
 from typing import cast
 from typing import Literal
-from typing import NamedTuple
 from typing import overload
 from typing import TypedDict
 
@@ -17,7 +16,6 @@
 import uuid
 import weakref
 from collections import defaultdict
-from collections import namedtuple
 from collections.abc import Callable
 from pathlib import Path
 
@@ -64,24 +62,36 @@
 from gajim.common.setting_values import WorkspaceSettings
 from gajim.common.storage.base import Encoder
 from gajim.common.storage.base import json_decoder
+from gajim.common.storage.base import namedtuple_factory
 
 SETTING_TYPE = bool | int | str | object
 
 
 log = logging.getLogger('gajim.c.settings')
 
-CURRENT_USER_VERSION = 5
+CURRENT_USER_VERSION = 6
 
-CREATE_SQL = '''
-    CREATE TABLE settings (
-            name TEXT UNIQUE,
-            settings TEXT
+ACCOUNT_SETTINGS_SQL = '''
+    CREATE TABLE accounts (
+            account TEXT UNIQUE
     );
 
     CREATE TABLE account_settings (
-            account TEXT UNIQUE,
+            account TEXT,
+            scope TEXT,
+            jid TEXT,
+            setting TEXT,
+            value TEXT,
+            PRIMARY KEY (account, scope, jid, setting)
+    );
+    '''
+
+CREATE_SQL = '''
+    CREATE TABLE settings (
+            name TEXT UNIQUE,
             settings TEXT
     );
+    {account_settings}
 
     INSERT INTO settings(name, settings) VALUES ('app', '{{}}');
     INSERT INTO settings(name, settings) VALUES ('soundevents', '{{}}');
@@ -91,12 +101,16 @@
     INSERT INTO settings(name, settings) VALUES ('workspaces', '{workspaces}');
 
     PRAGMA user_version={version};
-    '''.format(status=json.dumps(STATUS_PRESET_EXAMPLES),  # noqa: UP032
+    '''.format(account_settings=ACCOUNT_SETTINGS_SQL,  # noqa: UP032
+               status=json.dumps(STATUS_PRESET_EXAMPLES),
                proxies=json.dumps(PROXY_EXAMPLES),
                workspaces=json.dumps(INITAL_WORKSPACE),
                version=CURRENT_USER_VERSION)
 
 
+# Account, scope, JID and setting of a row in the account_settings table
+_AccountSettingKeyT = tuple[str, str, str, str]
+
 _SignalCallable = Callable[[Any, str, str | None, JID | None], Any]
 _CallbackDict = dict[tuple[str, str | None, JID | None],
                      list[weakref.WeakMethod[_SignalCallable]]]
@@ -128,6 +142,11 @@ def __init__(self, in_memory: bool = False):
         self._account_settings: dict[
             str, Any | dict[str, dict[JID | str, Any]]] = {}
 
+        # Changed account settings which are not written to the
+        # database yet, None marks a removed setting
+        self._pending_account_settings: dict[
+            _AccountSettingKeyT, AllSettingsT | None] = {}
+
         self._callbacks: _CallbackDict = defaultdict(list)
 
     def connect_signal(self,
@@ -246,12 +265,6 @@ def _load_app_overrides(self) -> None:
 
         self._settings['app'].update(self._app_overrides)
 
-    @staticmethod
-    def _namedtuple_factory(cursor: sqlite3.Cursor,
-                            row: tuple[Any, ...]) -> NamedTuple:
-        fields = [col[0] for col in cursor.description]
-        return namedtuple('Row', fields)(*row)  # pyright: ignore
-
     def _connect_database(self) -> None:
         path = configpaths.get('SETTINGS')
         if path.is_dir():
@@ -262,12 +275,12 @@ def _connect_database(self) -> None:
             self._create_database(CREATE_SQL, path)
 
         self._con = sqlite3.connect(path)
-        self._con.row_factory = self._namedtuple_factory
+        self._con.row_factory = namedtuple_factory
 
     def _connect_in_memory_database(self) -> None:
         log.info('Creating in memory')
         self._con = sqlite3.connect(':memory:')
-        self._con.row_factory = self._namedtuple_factory
+        self._con.row_factory = namedtuple_factory
 
         try:
             self._con.executescript(CREATE_SQL)
@@ -308,6 +321,7 @@ def _commit(self, schedule: bool = False) -> None:
                 GLib.source_remove(self._commit_scheduled)
                 self._commit_scheduled = None
             log.info('Commit')
+            self._write_pending_account_settings()
             self._con.commit()
 
         elif self._commit_scheduled is None:
@@ -320,6 +334,7 @@ def save(self) -> None:
     def _scheduled_commit(self) -> None:
         self._commit_scheduled = None
         log.info('Commit')
+        self._write_pending_account_settings()
         self._con.commit()
 
     def _migrate_database(self) -> None:
@@ -382,6 +397,21 @@ def _migrate(self) -> None:
             self._settings['app'].pop('muclumbus_api_http_uri', None)
             self._set_user_version(5)
 
+        if version < 6:
+            # Store account settings as one row per setting instead
+            # of one JSON object per account
+            self._con.execute('BEGIN')
+            self._con.execute('DROP TABLE account_settings')
+            for statement in ACCOUNT_SETTINGS_SQL.split(';')[:-1]:
+                self._con.execute(statement)
+
+            for account in self._account_settings:
+                self._con.execute(
+                    'INSERT INTO accounts(account) VALUES(?)', (account,))
+                self._commit_account_settings(account, schedule=True)
+
+            self._set_user_version(6)
+
     def _migrate_old_config(self) -> None:
         if self._in_memory:
             return
@@ -569,6 +599,7 @@ def _cleanup_account_default_values(category: str, settings: Any) -> None:
 
     def close(self) -> None:
         log.info('Close settings')
+        self._write_pending_account_settings()
         self._con.commit()
         self._con.close()
         self._con = cast(sqlite3.Connection, None)
@@ -581,6 +612,27 @@ def _load_settings(self) -> None:
                                                   object_hook=json_decoder)
 
     def _load_account_settings(self) -> None:
+        if self._get_user_version() < 6:
+            self._load_legacy_account_settings()
+            return
+
+        accounts = self._con.execute('SELECT account FROM accounts').fetchall()
+        for row in accounts:
+            log.info('Load account settings: %s', row.account)
+            self._account_settings[row.account] = {'account': {},
+                                                   'contact': {},
+                                                   'group_chat': {}}
+
+        rows = self._con.execute('SELECT * FROM account_settings').fetchall()
+        for row in rows:
+            settings = self._account_settings[row.account][row.scope]
+            value = json.loads(row.value, object_hook=json_decoder)
+            if row.scope == 'account':
+                settings[row.setting] = value
+            else:
+                settings.setdefault(row.jid, {})[row.setting] = value
+
+    def _load_legacy_account_settings(self) -> None:
         account_settings = self._con.execute(
             'SELECT * FROM account_settings').fetchall()
         for row in account_settings:
@@ -592,13 +644,74 @@ def _load_account_settings(self) -> None:
     def _commit_account_settings(self,
                                  account: str,
                                  schedule: bool = True) -> None:
+        '''
+        Write all settings of the account, use _set_account_value()
+        for single settings
+        '''
         log.info('Set account settings: %s', account)
+        self._discard_pending_account_settings(account)
         self._con.execute(
-            'UPDATE account_settings SET settings = ? WHERE account = ?',
-            (json.dumps(self._account_settings[account], cls=Encoder), account))
+            'DELETE FROM account_settings WHERE account = ?', (account,))
+
+        settings = self._account_settings[account]
+        rows: list[tuple[str, str, str, str, str]] = []
+        for setting, value in settings['account'].items():
+            rows.append((account, 'account', '', setting,
+                         json.dumps(value, cls=Encoder)))
+
+        for scope in ('contact', 'group_chat'):
+            for jid, jid_settings in settings[scope].items():
+                for setting, value in jid_settings.items():
+                    rows.append((account, scope, str(jid), setting,
+                                 json.dumps(value, cls=Encoder)))
+
+        self._con.executemany(
+            'INSERT INTO account_settings VALUES(?, ?, ?, ?, ?)', rows)
 
         self._commit(schedule=schedule)
 
+    def _set_account_value(self,
+                           account: str,
+                           scope: str,
+                           jid: JID | str | None,
+                           setting: str,
+                           value: AllSettingsT | None) -> None:
+
+        # Changes are buffered, so a burst of changes results in one
+        # write per changed setting
+        key = (account, scope, '' if jid is None else str(jid), setting)
+        self._pending_account_settings[key] = value
+        self._commit(schedule=True)
+
+    def _discard_pending_account_settings(self, account: str) -> None:
+        for key in list(self._pending_account_settings):
+            if key[0] == account:
+                del self._pending_account_settings[key]
+
+    def _write_pending_account_settings(self) -> None:
+        if not self._pending_account_settings:
+            return
+
+        changed: list[tuple[str, str, str, str, str]] = []
+        removed: list[_AccountSettingKeyT] = []
+        for key, value in self._pending_account_settings.items():
+            if value is None:
+                removed.append(key)
+            else:
+                changed.append((*key, json.dumps(value, cls=Encoder)))
+
+        log.info('Write %s account settings',
+                 len(self._pending_account_settings))
+        self._pending_account_settings.clear()
+
+        self._con.executemany(
+            'INSERT OR REPLACE INTO account_settings VALUES(?, ?, ?, ?, ?)',
+            changed)
+        self._con.executemany(
+            '''DELETE FROM account_settings
+               WHERE account = ? AND scope = ? AND jid = ? AND setting = ?''',
+            removed)
+
     def _commit_settings(self, name: str, schedule: bool = True) -> None:
         log.info('Set settings: %s', name)
         self._con.execute(
@@ -751,8 +864,7 @@ def add_account(self, account: str) -> None:
                                            'contact': {},
                                            'group_chat': {}}
         self._con.execute(
-            'INSERT INTO account_settings(account, settings) VALUES(?, ?)',
-            (account, json.dumps(self._account_settings[account])))
+            'INSERT INTO accounts(account) VALUES(?)', (account,))
         self._commit()
 
     def remove_account(self, account: str) -> None:
@@ -760,9 +872,11 @@ def remove_account(self, account: str) -> None:
             raise ValueError(f'Unknown account: {account}')
 
         del self._account_settings[account]
+        self._discard_pending_account_settings(account)
         self._con.execute(
-            'DELETE FROM account_settings WHERE account = ?',
-            (account,))
+            'DELETE FROM accounts WHERE account = ?', (account,))
+        self._con.execute(
+            'DELETE FROM account_settings WHERE account = ?', (account,))
         self._commit()
 
     def get_accounts(self) -> list[str]:
@@ -867,13 +981,13 @@ def set_account_setting(self,
             except KeyError:
                 pass
 
-            self._commit_account_settings(account)
+            self._set_account_value(account, 'account', None, setting, None)
             self._notify(default, setting, account)
             return
 
         self._account_settings[account]['account'][setting] = value
 
-        self._commit_account_settings(account)
+        self._set_account_value(account, 'account', None, setting, value)
         self._notify(value, setting, account)
 
     @overload
@@ -1026,7 +1140,7 @@ def set_group_chat_setting(self,
             except KeyError:
                 pass
 
-            self._commit_account_settings(account)
+            self._set_account_value(account, 'group_chat', jid, setting, None)
             self._notify(default, setting, account, jid)
             return
 
@@ -1036,7 +1150,7 @@ def set_group_chat_setting(self,
         else:
             group_chat_settings[jid][setting] = value
 
-        self._commit_account_settings(account)
+        self._set_account_value(account, 'group_chat', jid, setting, value)
         self._notify(value, setting, account, jid)
 
     def set_group_chat_settings(self,
@@ -1141,7 +1255,7 @@ def set_contact_setting(self,
             except KeyError:
                 pass
 
-            self._commit_account_settings(account)
+            self._set_account_value(account, 'contact', jid, setting, None)
             self._notify(default, setting, account, jid)
             return
 
@@ -1151,7 +1265,7 @@ def set_contact_setting(self,
         else:
             contact_settings[jid][setting] = value
 
-        self._commit_account_settings(account)
+        self._set_account_value(account, 'contact', jid, setting, value)
         self._notify(value, setting, account, jid)
 
     def set_contact_settings(self,
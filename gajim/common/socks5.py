@@ -698,6 +698,7 @@ def get_file_contents(self, timeout):
                 self.file_props.last_time
             self.file_props.last_time = current_time
             self.file_props.received_len += lenn
+            self.file_props.update_hash(self.remaining_buff)
             self.remaining_buff = b''
             if self.file_props.received_len == self.file_props.size:
                 self.rem_fd(fd)
@@ -735,6 +736,7 @@ def get_file_contents(self, timeout):
                 self.disconnect()
                 self.file_props.error = -6 # file system error
                 return 0
+            self.file_props.update_hash(buff)
             if self.file_props.received_len >= self.file_props.size:
                 # transfer completed
                 self.rem_fd(fd)
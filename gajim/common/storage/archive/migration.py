@@ -17,6 +17,7 @@
 from nbxmpp.protocol import JID
 from nbxmpp.structs import CommonError
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
@@ -116,6 +117,8 @@ def __init__(self, archive: AlchemyStorage, user_version: int) -> None:
             self._v9()
         if user_version < 10:
             self._v10()
+        if user_version < 11:
+            self._v11()
 
         app.ged.raise_event(DBMigrationFinished())
 
@@ -266,6 +269,41 @@ def _v10(self) -> None:
             'PRAGMA user_version=10'
         ])
 
+    def _v11(self) -> None:
+        try:
+            self._execute_multiple([mod.MESSAGE_FTS_TABLE])
+        except OperationalError:
+            # SQLite was compiled without FTS5
+            log.exception('Unable to create full text index')
+            self._execute_multiple(['PRAGMA user_version=11'])
+            return
+
+        # Start from an empty index in case a previous run was interrupted
+        self._execute_multiple(
+            ["INSERT INTO message_fts(message_fts) VALUES('delete-all')"]
+        )
+
+        with self._engine.connect() as conn:
+            max_pk = conn.scalar(sa.select(sa.func.max(mod.Message.pk))) or 0
+
+        # Build the index in chunks, so memory usage stays bounded
+        # and progress can be reported
+        chunk_size = 10000
+        insert_stmt = sa.text(
+            'INSERT INTO message_fts(rowid, text) '
+            'SELECT pk, text FROM message '
+            'WHERE pk > :start AND pk <= :end AND text IS NOT NULL'
+        )
+
+        for start in range(0, max_pk, chunk_size):
+            with self._engine.begin() as conn:
+                conn.execute(insert_stmt, {'start': start, 'end': start + chunk_size})
+            app.ged.raise_event(DBMigrationProgress(count=max_pk, progress=start))
+
+        app.ged.raise_event(DBMigrationProgress(count=max_pk, progress=max_pk))
+
+        self._execute_multiple([*mod.MESSAGE_FTS_TRIGGERS, 'PRAGMA user_version=11'])
+
     def _process_archive_row(
         self,
         conn: sa.Connection,
@@ -730,3 +730,50 @@ def get_referenced_message(self) -> Message | None:
             self.type,
             self.reply.id
         )
+
+
+# Full text index over Message.text, the virtual table is not part of
+# Base.metadata because SQLAlchemy can not create FTS5 tables.
+# Corrections are Message rows as well, so they are indexed too.
+
+MessageFTS = sa.Table(
+    'message_fts',
+    sa.MetaData(),
+    sa.Column('rowid', sa.Integer, primary_key=True),
+    sa.Column('text', sa.Text),
+    sa.Column('rank', sa.Float),
+)
+
+MESSAGE_FTS_TABLE = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS message_fts USING fts5(
+        text,
+        content='message',
+        content_rowid='pk',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+'''
+
+MESSAGE_FTS_TRIGGERS = [
+    '''
+    CREATE TRIGGER IF NOT EXISTS message_fts_insert
+    AFTER INSERT ON message WHEN new.text IS NOT NULL BEGIN
+        INSERT INTO message_fts(rowid, text) VALUES (new.pk, new.text);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS message_fts_delete
+    AFTER DELETE ON message WHEN old.text IS NOT NULL BEGIN
+        INSERT INTO message_fts(message_fts, rowid, text)
+        VALUES ('delete', old.pk, old.text);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS message_fts_update
+    AFTER UPDATE OF text ON message BEGIN
+        INSERT INTO message_fts(message_fts, rowid, text)
+        SELECT 'delete', old.pk, old.text WHERE old.text IS NOT NULL;
+        INSERT INTO message_fts(rowid, text)
+        SELECT new.pk, new.text WHERE new.text IS NOT NULL;
+    END
+    ''',
+]
@@ -5,15 +5,24 @@
 from __future__ import annotations
 
 from typing import Any
+from typing import Concatenate
 from typing import Literal
+from typing import ParamSpec
+from typing import TypeVar
 
 import calendar
 import datetime as dt
 import logging
 import pprint
 import shutil
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from collections.abc import Iterable
 from collections.abc import Iterator
 from collections.abc import Sequence
+from dataclasses import dataclass
+from dataclasses import field
 from datetime import datetime
 from datetime import timedelta
 from datetime import timezone
@@ -27,6 +36,8 @@
 from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.engine import Engine
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import aliased
 from sqlalchemy.orm import Session
 
 from gajim.common import app
@@ -40,23 +51,148 @@
 from gajim.common.storage.archive.const import MessageType
 from gajim.common.storage.archive.models import Account
 from gajim.common.storage.archive.models import Base
+from gajim.common.storage.archive.models import DisplayedMarker
 from gajim.common.storage.archive.models import MAMArchiveState
 from gajim.common.storage.archive.models import Message
+from gajim.common.storage.archive.models import MESSAGE_FTS_TABLE
+from gajim.common.storage.archive.models import MESSAGE_FTS_TRIGGERS
 from gajim.common.storage.archive.models import MessageError
+from gajim.common.storage.archive.models import MessageFTS
 from gajim.common.storage.archive.models import Moderation
+from gajim.common.storage.archive.models import Occupant
+from gajim.common.storage.archive.models import Receipt
 from gajim.common.storage.archive.models import Remote
+from gajim.common.storage.archive.models import SecurityLabel
 from gajim.common.storage.archive.models import Thread
 from gajim.common.storage.base import AlchemyStorage
+from gajim.common.storage.base import Ingest
+from gajim.common.storage.base import sees_pending_rows
 from gajim.common.storage.base import timeit
 from gajim.common.storage.base import VALUE_MISSING
 from gajim.common.storage.base import with_session
 from gajim.common.util.datetime import FIRST_UTC_DATETIME
 
-CURRENT_USER_VERSION = 10
+CURRENT_USER_VERSION = 11
+
+# Messages deleted per transaction when pruning history
+PRUNE_CHUNK_SIZE = 1000
+
+# Conversations whose last message is loaded with one statement
+LAST_MESSAGE_CHUNK_SIZE = 200
+
+# Loaded messages which are kept for lookups by pk
+MESSAGE_CACHE_SIZE = 500
+
+# Rows which are loaded together with a message
+MESSAGE_METADATA = (DisplayedMarker, MessageError, Moderation, Receipt)
 
 
 log = logging.getLogger('gajim.c.storage.archive')
 
+P = ParamSpec('P')
+R = TypeVar('R')
+
+MessagePredicateT = Callable[[Message], bool]
+
+
+@dataclass(frozen=True)
+class SearchResult:
+    message: Message
+    # Excerpt of the matching text, None if no full text index is available
+    snippet: str | None = None
+
+
+@dataclass
+class IngestState:
+    # Messages which are not committed yet
+    message_pks: set[int] = field(default_factory=set)
+    next_message_pk: int | None = None
+    # Occupants written by the ingest and their pks
+    occupants: dict[tuple[str, JID, str], tuple[int, Occupant]] = field(
+        default_factory=dict)
+
+
+def make_fts_query(query: str) -> str | None:
+    '''
+    Turn user input into a FTS5 query, every word has to match and the
+    last word is matched as prefix. Returns None if there is nothing to
+    search for.
+    '''
+    terms: list[str] = []
+    for word in query.split():
+        word = word.replace('"', '""')
+        terms.append(f'"{word}"')
+
+    if not terms:
+        return None
+
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+class MessageCache:
+    '''
+    Bounded cache of loaded messages, least recently used messages are
+    removed first. Cached messages are shared between all callers and
+    must not be modified.
+    '''
+
+    def __init__(self, size: int) -> None:
+        self._size = size
+        self._messages: OrderedDict[int, Message] = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Incremented on every invalidation, messages which were loaded
+        # before an invalidation may be outdated and are not added
+        self.generation = 0
+
+    def get(self, pk: int) -> Message | None:
+        with self._lock:
+            message = self._messages.get(pk)
+            if message is not None:
+                self._messages.move_to_end(pk)
+            return message
+
+    def add(self, messages: Iterable[Message], generation: int) -> None:
+        with self._lock:
+            if generation != self.generation:
+                return
+
+            for message in messages:
+                self._messages[message.pk] = message
+                self._messages.move_to_end(message.pk)
+
+            while len(self._messages) > self._size:
+                self._messages.popitem(last=False)
+
+    def invalidate(self, predicate: MessagePredicateT) -> None:
+        with self._lock:
+            self.generation += 1
+            for pk, message in list(self._messages.items()):
+                if predicate(message):
+                    del self._messages[pk]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._messages.clear()
+
+
+def invalidates_messages(
+    func: Callable[Concatenate[Any, P], R]
+) -> Callable[Concatenate[Any, P], R]:
+    '''
+    Remove cached messages which were changed by func, after func
+    committed its changes
+    '''
+    def wrapper(self: Any, *args: P.args, **kwargs: P.kwargs) -> R:
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            self._invalidate_messages(kwargs.get('ingest'))
+
+    return wrapper
+
 
 class MessageArchiveStorage(AlchemyStorage):
     def __init__(self, in_memory: bool = False, path: Path | None = None) -> None:
@@ -75,11 +211,21 @@ def __init__(self, in_memory: bool = False, path: Path | None = None) -> None:
 
         self._account_pks: dict[str, int] = {}
         self._jid_pks: dict[JID, int] = {}
+        self._fts_available = False
+
+        self._message_cache = MessageCache(MESSAGE_CACHE_SIZE)
+        self._ingest_states: dict[Ingest, IngestState] = {}
+        # Invalidations of the current write request, per thread
+        self._stale = threading.local()
 
     def init(self) -> None:
         super().init()
         with self._session as s:
             self._load_jids(s)
+            self._fts_available = self._has_fts_index(s)
+
+        if not self._fts_available:
+            self._log.warning('No full text index available')
 
     def _log_row(self, row: Any) -> None:
         if self._log.getEffectiveLevel() != logging.DEBUG:
@@ -88,7 +234,25 @@ def _log_row(self, row: Any) -> None:
 
     def _create_table(self, session: Session, engine: Engine) -> None:
         Base.metadata.create_all(engine)
+
+        try:
+            session.execute(sa.text(MESSAGE_FTS_TABLE))
+        except OperationalError:
+            # SQLite was compiled without FTS5
+            self._log.exception('Unable to create full text index')
+        else:
+            for trigger in MESSAGE_FTS_TRIGGERS:
+                session.execute(sa.text(trigger))
+
         session.execute(sa.text(f'PRAGMA user_version={CURRENT_USER_VERSION}'))
+        session.commit()
+
+    @staticmethod
+    def _has_fts_index(session: Session) -> bool:
+        stmt = sa.text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'message_fts'"
+        )
+        return session.scalar(stmt) is not None
 
     def _make_backup(self) -> None:
         db_path = configpaths.get('LOG_DB')
@@ -118,10 +282,7 @@ def _get_account_pk(self, session: Session, account: str) -> int:
 
         pk = session.scalar(select(Account.pk).where(Account.jid == jid))
         if pk is None:
-            acc = Account(jid=jid)
-            session.add(acc)
-            session.flush()
-            pk = acc.pk
+            pk = self._insert_unique_jid(session, Account, jid)
 
         self._account_pks[account] = pk
         return pk
@@ -131,15 +292,31 @@ def _get_jid_pk(self, session: Session, jid: JID) -> int:
         if pk is not None:
             return pk
 
-        jid_row = Remote(jid=jid)
-        session.add(jid_row)
-        session.flush()
-
-        pk = jid_row.pk
+        pk = self._insert_unique_jid(session, Remote, jid)
         self._jid_pks[jid] = pk
         return pk
 
-    def _set_foreign_keys(self, session: Session, row: Any) -> None:
+    @staticmethod
+    def _insert_unique_jid(
+        session: Session, table: type[Account] | type[Remote], jid: JID
+    ) -> int:
+        # The writer thread and the main thread can try to insert
+        # the same jid concurrently
+        stmt = (
+            insert(table)
+            .values(jid=jid)
+            .on_conflict_do_nothing()
+            .returning(table.pk)
+        )
+        pk = session.scalar(stmt)
+        if pk is None:
+            pk = session.scalar(select(table.pk).where(table.jid == jid))
+        assert pk is not None
+        return pk
+
+    def _set_foreign_keys(
+        self, session: Session, row: Any, ingest: Ingest | None = None
+    ) -> None:
         fk_account_pk = None
         account = getattr(row, 'account_', None)
         if account is not None:
@@ -190,28 +367,173 @@ def _set_foreign_keys(self, session: Session, row: Any) -> None:
 
         occupant = getattr(row, 'occupant_', None)
         if occupant is not None:
-            pk = self._upsert_row(session, occupant)
+            pk = self._upsert_occupant(session, occupant, ingest)
             row.occupant_ = None
             row.fk_occupant_pk = pk
 
+    def _upsert_occupant(
+        self, session: Session, occupant: Occupant, ingest: Ingest | None
+    ) -> int:
+        if ingest is None:
+            return self._upsert_row(session, occupant)
+
+        # The messages of a page are mostly from the same few occupants,
+        # nobody else can write them while the ingest holds the lock
+        occupants = self._get_ingest_state(ingest).occupants
+        key = (occupant.account_, occupant.remote_jid_, occupant.id)
+        written = occupants.get(key)
+        if written is not None and not occupant.needs_update(written[1]):
+            return written[0]
+
+        pk = self._upsert_row(session, occupant)
+        occupants[key] = (pk, occupant)
+        return pk
+
+    def _get_ingest_state(self, ingest: Ingest) -> IngestState:
+        state = self._ingest_states.get(ingest)
+        if state is None:
+            state = self._ingest_states[ingest] = IngestState()
+            ingest.call_after_commit(
+                lambda: self._ingest_states.pop(ingest, None))
+        return state
+
+    def _get_next_message_pk(self, session: Session, ingest: Ingest) -> int:
+        # Messages have no unique constraints and the ingest holds the
+        # write lock, so they can be added with their pk and written in
+        # one batch. SQLite would choose the same pk.
+        state = self._get_ingest_state(ingest)
+        if state.next_message_pk is None:
+            pks = [row.pk for row in ingest.pending_rows
+                   if isinstance(row, Message)]
+            pks.append(session.scalar(select(sa.func.max(Message.pk))) or 0)
+            state.next_message_pk = max(pks) + 1
+
+        pk = state.next_message_pk
+        state.next_message_pk += 1
+        return pk
+
+    def _mark_stale(self, predicate: MessagePredicateT) -> None:
+        predicates = getattr(self._stale, 'predicates', None)
+        if predicates is None:
+            predicates = self._stale.predicates = []
+        predicates.append(predicate)
+
+    def _invalidate_messages(self, ingest: Ingest | None = None) -> None:
+        predicates: list[MessagePredicateT] | None = getattr(
+            self._stale, 'predicates', None)
+        if not predicates:
+            return
+
+        self._stale.predicates = []
+
+        def _invalidate() -> None:
+            self._message_cache.invalidate(
+                lambda message: any(pred(message) for pred in predicates))
+
+        _invalidate()
+        if ingest is not None:
+            # Messages loaded by other sessions until the ingest is
+            # committed do not contain the changes
+            ingest.call_after_commit(_invalidate)
+
+    def _on_ingest_rolled_back(self) -> None:
+        # Cached messages and pks may refer to rows which were rolled back
+        self._message_cache.clear()
+        self._ingest_states.clear()
+        self._account_pks.clear()
+        with self._create_session() as session:
+            self._load_jids(session)
+
+    def _on_row_written(self, row: Any, updated_pk: int | None = None) -> None:
+        if (isinstance(row, MESSAGE_METADATA) or
+                (isinstance(row, Message) and row.correction_id is not None)):
+            # The row may belong to any message of the chat
+            account_pk = row.fk_account_pk
+            remote_pk = row.fk_remote_pk
+            self._mark_stale(
+                lambda message: (message.fk_account_pk == account_pk and
+                                 message.fk_remote_pk == remote_pk))
+            return
+
+        if updated_pk is None:
+            return
+
+        if isinstance(row, Occupant):
+            self._mark_stale(
+                lambda message: message.fk_occupant_pk == updated_pk)
+
+        elif isinstance(row, SecurityLabel):
+            self._mark_stale(
+                lambda message: message.fk_security_label_pk == updated_pk)
+
+        elif isinstance(row, Message):
+            self._mark_stale(lambda message: message.pk == updated_pk)
+
+    @invalidates_messages
     @with_session
+    @sees_pending_rows
     @timeit
     def insert_object(
-        self, session: Session, obj: Any, ignore_on_conflict: bool = True
+        self,
+        session: Session,
+        obj: Any,
+        ignore_on_conflict: bool = True,
+        *,
+        ingest: Ingest | None = None,
     ) -> int:
-        self._set_foreign_keys(session, obj)
+        self._set_foreign_keys(session, obj, ingest)
         self._log_row(obj)
-        session.add(obj)
 
-        try:
-            session.commit()
-        except Exception:
-            if not ignore_on_conflict:
-                raise
-            return -1
+        if ingest is not None and isinstance(obj, Message):
+            obj.pk = self._get_next_message_pk(session, ingest)
+            ingest.add_pending_row(obj)
+            self._on_row_written(obj)
+            self._invalidate_messages(ingest)
+            # Most messages of an ingest are never requested before it
+            # is committed, they are loaded when they are requested
+            self._get_ingest_state(ingest).message_pks.add(obj.pk)
+            return obj.pk
+
+        if ingest is not None:
+            # Use a savepoint so a conflict does not roll back
+            # the whole ingest transaction
+            try:
+                with session.begin_nested():
+                    session.add(obj)
+            except Exception:
+                if not ignore_on_conflict:
+                    raise
+                return -1
+
+        else:
+            # Flush instead of commit, so the message can be loaded
+            # below, it is committed with the session
+            session.add(obj)
+
+            try:
+                session.flush()
+            except Exception:
+                session.rollback()
+                if not ignore_on_conflict:
+                    raise
+                return -1
+
+        self._on_row_written(obj)
+
+        if isinstance(obj, Message):
+            self._invalidate_messages(ingest)
+            # New messages are usually requested right away by the
+            # handlers of MessageReceived/MessageSent, load it with
+            # all relationships while the session is open
+            generation = self._message_cache.generation
+            session.expunge(obj)
+            message = self._get_message_with_pk(session, obj.pk)
+            if message is not None:
+                self._message_cache.add([message], generation)
 
         return obj.pk
 
+    @invalidates_messages
     @with_session
     @timeit
     def insert_row(
@@ -221,6 +543,7 @@ def insert_row(
         *,
         return_pk_on_conflict: bool = False,
         ignore_on_conflict: bool = False,
+        ingest: Ingest | None = None,
     ) -> int:
         return self._insert_row(
             session,
@@ -255,11 +578,15 @@ def _insert_row(
             raise
 
         assert pk is not None
+        self._on_row_written(row)
         return pk
 
+    @invalidates_messages
     @with_session
     @timeit
-    def upsert_row(self, session: Session, row: Any) -> int:
+    def upsert_row(
+        self, session: Session, row: Any, *, ingest: Ingest | None = None
+    ) -> int:
         return self._upsert_row(session, row)
 
     def _upsert_row(
@@ -278,6 +605,7 @@ def _upsert_row(
             stmt = insert(table).values(**row.get_insert_values()).returning(table.pk)
             pk = session.scalar(stmt)
             assert pk is not None
+            self._on_row_written(row)
             return pk
 
         if not row.needs_update(existing):
@@ -290,15 +618,50 @@ def _upsert_row(
         )
 
         session.execute(stmt)
+        self._on_row_written(row, existing.pk)
         return existing.pk
 
-    @with_session
     @timeit
-    def get_message_with_pk(
-        self, session: Session, pk: int, options: Any = None
+    def get_message_with_pk(self, pk: int, options: Any = None) -> Message | None:
+        if options is not None:
+            return self._load_message_with_pk(pk, options)
+
+        message = self._message_cache.get(pk)
+        if message is not None:
+            return message
+
+        generation = self._message_cache.generation
+        message = self._load_message_with_pk(
+            pk, ingest=self._get_ingest_of_message(pk))
+        if message is not None:
+            self._message_cache.add([message], generation)
+        return message
+
+    @with_session
+    def _load_message_with_pk(
+        self,
+        session: Session,
+        pk: int,
+        options: Any = None,
+        *,
+        ingest: Ingest | None = None,
     ) -> Message | None:
         return self._get_message_with_pk(session, pk, options)
 
+    def _get_ingest_of_message(self, pk: int) -> Ingest | None:
+        '''
+        Returns the ingest a message was written with if it is not committed
+        yet, the message is loaded with its session instead of committing it
+        '''
+        if threading.current_thread() is not threading.main_thread():
+            # Ingests are only used on the main thread
+            return None
+
+        for ingest, state in self._ingest_states.items():
+            if pk in state.message_pks:
+                return ingest
+        return None
+
     def _get_message_with_pk(
         self, session: Session, pk: int, options: Any = None
     ) -> Message | None:
@@ -359,6 +722,7 @@ def get_message_with_stanza_id(
         self._log.warning('Found more than one message with stanza id %s', stanza_id)
         return None
 
+    @invalidates_messages
     @with_session
     @timeit
     def delete_message(self, session: Session, pk: int) -> None:
@@ -369,6 +733,13 @@ def delete_message(self, session: Session, pk: int) -> None:
 
         self._delete_message(session, message)
 
+        # The message may have been a correction of another message
+        account_pk = message.fk_account_pk
+        remote_pk = message.fk_remote_pk
+        self._mark_stale(
+            lambda cached: (cached.fk_account_pk == account_pk and
+                            cached.fk_remote_pk == remote_pk))
+
     def _delete_message(self, session: Session, message: Message) -> None:
         if message.corrections:
             for correction in message.corrections:
@@ -383,13 +754,29 @@ def _delete_message(self, session: Session, message: Message) -> None:
         session.delete(message)
 
     @with_session
+    @sees_pending_rows
     @timeit
     def check_if_message_id_exists(
-        self, session: Session, account: str, jid: JID, message_id: str
+        self,
+        session: Session,
+        account: str,
+        jid: JID,
+        message_id: str,
+        *,
+        ingest: Ingest | None = None,
     ) -> bool:
         fk_account_pk = self._get_account_pk(session, account)
         fk_remote_pk = self._get_jid_pk(session, jid)
 
+        if ingest is not None and any(
+            isinstance(row, Message) and
+            row.id == message_id and
+            row.fk_remote_pk == fk_remote_pk and
+            row.fk_account_pk == fk_account_pk
+            for row in ingest.pending_rows
+        ):
+            return True
+
         exists_criteria = select(Message.id).where(
             Message.id == message_id,
             Message.fk_remote_pk == fk_remote_pk,
@@ -400,13 +787,29 @@ def check_if_message_id_exists(
         return bool(res)
 
     @with_session
+    @sees_pending_rows
     @timeit
     def check_if_stanza_id_exists(
-        self, session: Session, account: str, jid: JID, stanza_id: str
+        self,
+        session: Session,
+        account: str,
+        jid: JID,
+        stanza_id: str,
+        *,
+        ingest: Ingest | None = None,
     ) -> bool:
         fk_account_pk = self._get_account_pk(session, account)
         fk_remote_pk = self._get_jid_pk(session, jid)
 
+        if ingest is not None and any(
+            isinstance(row, Message) and
+            row.stanza_id == stanza_id and
+            row.fk_remote_pk == fk_remote_pk and
+            row.fk_account_pk == fk_account_pk
+            for row in ingest.pending_rows
+        ):
+            return True
+
         exists_criteria = select(Message.id).where(
             Message.stanza_id == stanza_id,
             Message.fk_remote_pk == fk_remote_pk,
@@ -457,10 +860,14 @@ def get_conversation_before_after(
             The maximal count of Message returned
         '''
 
+        generation = self._message_cache.generation
+
         fk_account_pk = self._get_account_pk(session, account)
         fk_remote_pk = self._get_jid_pk(session, jid)
 
-        stmt = select(Message).where(
+        # Only the pks of the page are selected here, the messages are
+        # loaded afterwards unless they are cached already
+        stmt = select(Message.pk).where(
             Message.fk_remote_pk == fk_remote_pk,
             Message.fk_account_pk == fk_account_pk,
             Message.correction_id.is_(None),
@@ -478,7 +885,35 @@ def get_conversation_before_after(
         stmt = stmt.limit(n_lines)
 
         self._explain(session, stmt)
-        return session.scalars(stmt).all()
+        pks = session.scalars(stmt).all()
+        return self._get_messages_with_pks(session, pks, generation)
+
+    def _get_messages_with_pks(
+        self, session: Session, pks: Sequence[int], generation: int
+    ) -> list[Message]:
+        '''
+        Load messages in the order of pks. Cached messages are reused,
+        the others are loaded with one statement.
+        '''
+
+        messages: dict[int, Message] = {}
+        missing_pks: list[int] = []
+        for pk in pks:
+            message = self._message_cache.get(pk)
+            if message is None:
+                missing_pks.append(pk)
+            else:
+                messages[pk] = message
+
+        if missing_pks:
+            stmt = select(Message).where(Message.pk.in_(missing_pks))
+            self._explain(session, stmt)
+            loaded = session.scalars(stmt).all()
+            self._message_cache.add(loaded, generation)
+            messages.update((message.pk, message) for message in loaded)
+
+        # Messages which were deleted in the meantime are missing
+        return [messages[pk] for pk in pks if pk in messages]
 
     @with_session
     @timeit
@@ -512,6 +947,57 @@ def get_last_conversation_row(
         self._explain(session, stmt)
         return session.scalar(stmt)
 
+    @with_session
+    @timeit
+    def get_last_conversation_rows(
+        self, session: Session, chats: Iterable[tuple[str, JID]]
+    ) -> dict[tuple[str, JID], Message]:
+        '''
+        Load the last line of many conversations at once, see
+        get_last_conversation_row().
+
+        :param chats:           (account, jid) tuples of the conversations
+
+        returns a dict mapping (account, jid) to the message, conversations
+        without messages are missing
+        '''
+
+        chat_keys: dict[tuple[int, int], tuple[str, JID]] = {}
+        for account, jid in chats:
+            fk_account_pk = self._get_account_pk(session, account)
+            fk_remote_pk = self._get_jid_pk(session, jid)
+            chat_keys[(fk_account_pk, fk_remote_pk)] = (account, jid)
+
+        generation = self._message_cache.generation
+        pks = list(chat_keys)
+        messages: dict[tuple[str, JID], Message] = {}
+        for index in range(0, len(pks), LAST_MESSAGE_CHUNK_SIZE):
+            chunk = pks[index : index + LAST_MESSAGE_CHUNK_SIZE]
+
+            # One subquery per conversation, each is answered from
+            # idx_message without looking at the rest of the history
+            last_pks = [
+                select(Message.pk)
+                .where(
+                    Message.fk_remote_pk == fk_remote_pk,
+                    Message.fk_account_pk == fk_account_pk,
+                    Message.correction_id.is_(None),
+                )
+                .order_by(sa.desc(Message.timestamp), sa.desc(Message.pk))
+                .limit(1)
+                .scalar_subquery()
+                for fk_account_pk, fk_remote_pk in chunk
+            ]
+
+            stmt = select(Message).where(Message.pk.in_(last_pks))
+            self._explain(session, stmt)
+            for message in session.scalars(stmt):
+                key = chat_keys[(message.fk_account_pk, message.fk_remote_pk)]
+                messages[key] = message
+
+        self._message_cache.add(messages.values(), generation)
+        return messages
+
     @with_session
     @timeit
     def get_last_correctable_message(
@@ -593,7 +1079,8 @@ def search_archive(
         from_users: list[str] | None = None,
         before: datetime | None = None,
         after: datetime | None = None,
-    ) -> Iterator[Message]:
+        sort_by_relevance: bool = False,
+    ) -> Iterator[SearchResult]:
         '''
         Search the conversation log for messages containing the `query` string.
 
@@ -601,6 +1088,9 @@ def search_archive(
         `account` and `jid` or be restricted to a single day by
         specifying `date`.
 
+        Corrections are searched as well, a matching correction
+        returns the corrected message.
+
         :param account: The account
 
         :param jid: The jid for which we request the conversation
@@ -613,10 +1103,11 @@ def search_archive(
 
         :param after: A datetime.datetime instance or None
 
-        returns a list of namedtuples
-        '''
+        :param sort_by_relevance: Sort by rank instead of timestamp,
+                                  only possible with a full text index
 
-        # TODO: Does not search in corrections
+        returns an iterator of SearchResult
+        '''
 
         if before is None:
             before = datetime.now(timezone.utc)
@@ -632,7 +1123,25 @@ def search_archive(
         if jid is not None:
             fk_remote_pk = self._get_jid_pk(session, jid)
 
-        stmt = select(Message)
+        fts_query = None
+        if self._fts_available:
+            fts_query = make_fts_query(query)
+            if fts_query is None:
+                return
+
+        rank = None
+        if fts_query is not None:
+            hits = self._get_fts_hits_subquery(fts_query)
+            rank = hits.c.rank
+            stmt = (
+                select(Message.pk, hits.c.rowid)
+                .join(hits, hits.c.pk == Message.pk)
+                .where(Message.correction_id.is_(None))
+            )
+
+        else:
+            stmt = select(Message.pk, sa.null()).where(
+                Message.text.ilike(f'%{query}%'))
 
         if fk_account_pk is not None:
             stmt = stmt.where(Message.fk_account_pk == fk_account_pk)
@@ -644,17 +1153,139 @@ def search_archive(
             lowercase_users = list(map(str.lower, from_users))
             stmt = stmt.where(sa.func.lower(Message.resource).in_(lowercase_users))
 
-        stmt = (
-            stmt.where(
-                Message.text.ilike(f'%{query}%'),
-                Message.timestamp.between(after, before),
+        stmt = stmt.where(Message.timestamp.between(after, before))
+
+        if sort_by_relevance and rank is not None:
+            stmt = stmt.order_by(rank, sa.desc(Message.timestamp))
+        else:
+            stmt = stmt.order_by(sa.desc(Message.timestamp), sa.desc(Message.pk))
+
+        stmt = stmt.execution_options(yield_per=25)
+
+        self._explain(session, stmt)
+        # Messages and snippets are only loaded for the pages of results
+        # which are requested
+        for rows in session.execute(stmt).partitions():
+            generation = self._message_cache.generation
+            match_rowids = dict(rows)
+
+            snippets: dict[int, str] = {}
+            if fts_query is not None:
+                snippets = self._get_fts_snippets(
+                    session, fts_query, list(match_rowids.values()))
+
+            messages = self._get_messages_with_pks(
+                session, list(match_rowids), generation)
+
+            for message in messages:
+                # The text shown for a message is the text of the last
+                # correction, a snippet of an older version would be stale
+                shown_pk = message.pk
+                if message.corrections:
+                    shown_pk = message.get_last_correction().pk
+
+                snippet = None
+                if match_rowids[message.pk] == shown_pk:
+                    snippet = snippets.get(shown_pk)
+
+                yield SearchResult(message=message, snippet=snippet)
+
+    @staticmethod
+    def _get_fts_hits_subquery(fts_query: str) -> sa.Subquery:
+        '''
+        Returns (pk, rank, rowid) of all messages matching the query,
+        rowid is the best matching message or correction. Matching
+        corrections are mapped to the pk of the corrected message.
+        '''
+
+        # The match is materialized, so the full text query runs only once
+        fts_table = sa.literal_column(MessageFTS.name)
+        matches = (
+            select(MessageFTS.c.rowid, MessageFTS.c.rank)
+            .where(fts_table.op('MATCH')(fts_query))
+            .cte('message_fts_match')
+            .prefix_with('MATERIALIZED')
+        )
+
+        # Same conditions as Message.corrections, so a correction only maps
+        # to a message it is shown for. If several messages qualify, the
+        # last one is used, like get_corrected_message() does.
+        # Corrections of corrections are removed by the caller, filtering
+        # here would keep SQLite from looking up the message by id.
+        match = aliased(Message)
+        original = aliased(Message)
+        corrected_pk = (
+            select(original.pk)
+            .where(
+                original.id == match.correction_id,
+                original.fk_remote_pk == match.fk_remote_pk,
+                original.fk_account_pk == match.fk_account_pk,
+                original.fk_occupant_pk.is_(match.fk_occupant_pk),
+                original.direction == match.direction,
+                sa.case(
+                    (
+                        sa.and_(
+                            original.type == MessageType.GROUPCHAT,
+                            original.fk_occupant_pk.is_(None),
+                        ),
+                        original.resource == match.resource,
+                    ),
+                    else_=True,
+                ),
             )
-            .order_by(sa.desc(Message.timestamp), sa.desc(Message.pk))
-            .execution_options(yield_per=25)
+            .order_by(sa.desc(original.timestamp))
+            .limit(1)
+            .scalar_subquery()
         )
 
+        targets = (
+            select(
+                sa.case(
+                    (match.correction_id.is_(None), match.pk),
+                    else_=corrected_pk,
+                ).label('pk'),
+                matches.c.rank,
+                matches.c.rowid,
+            )
+            .select_from(match)
+            .join(matches, matches.c.rowid == match.pk)
+            .cte('message_fts_target')
+            .prefix_with('MATERIALIZED')
+        )
+
+        # SQLite returns the bare column rowid from the row with the
+        # minimum rank, so this is the best match
+        return (
+            select(
+                targets.c.pk,
+                sa.func.min(targets.c.rank).label('rank'),
+                targets.c.rowid,
+            )
+            .where(targets.c.pk.isnot(None))
+            .group_by(targets.c.pk)
+            .subquery()
+        )
+
+    def _get_fts_snippets(
+        self, session: Session, fts_query: str, rowids: list[int | None]
+    ) -> dict[int, str]:
+        '''
+        Returns snippets of the matching text for the given rowids
+        '''
+
+        fts_table = sa.literal_column(MessageFTS.name)
+        stmt = (
+            select(
+                MessageFTS.c.rowid,
+                sa.func.snippet(fts_table, 0, '', '', '…', 16),
+            )
+            .where(
+                fts_table.op('MATCH')(fts_query),
+                MessageFTS.c.rowid.in_(rowids),
+            )
+        )
         self._explain(session, stmt)
-        yield from session.scalars(stmt)
+        return dict(session.execute(stmt).all())
 
     @with_session
     @timeit
@@ -847,6 +1478,7 @@ def reset_mam_archive_state(self, session: Session, account: str, jid: JID) -> N
 
         session.execute(stmt)
 
+    @invalidates_messages
     @with_session
     @timeit
     def update_pending_message(
@@ -856,6 +1488,8 @@ def update_pending_message(
         jid: JID,
         message_id: str,
         stanza_id: str | None,
+        *,
+        ingest: Ingest | None = None,
     ) -> int | None:
         fk_account_pk = self._get_account_pk(session, account)
         fk_remote_pk = self._get_jid_pk(session, jid)
@@ -873,40 +1507,178 @@ def update_pending_message(
         )
 
         self._explain(session, stmt)
-        return session.scalar(stmt)
+        pk = session.scalar(stmt)
+        if pk is not None:
+            self._mark_stale(lambda message: message.pk == pk)
+        return pk
 
-    @with_session
-    @timeit
-    def remove_history_for_jid(self, session: Session, account: str, jid: JID) -> None:
+    def _delete_messages_with_pks(self, session: Session, pks: list[int]) -> None:
         '''
-        Remove messages and metadata for a specific jid.
+        Delete messages and all rows which reference them, with one
+        statement per table. OOB, calls, replies and file transfers
+        are removed by the foreign key cascade.
+
+        Other rows reference messages by id and chat, they are only
+        deleted if no remaining message of the chat has the same id.
         '''
 
-        fk_account_pk = self._get_account_pk(session, account)
-        fk_remote_pk = self._get_jid_pk(session, jid)
+        stmt = select(
+            Message.id,
+            Message.stanza_id,
+            Message.fk_remote_pk,
+            Message.fk_account_pk,
+        ).where(Message.pk.in_(pks))
+
+        message_ids: set[tuple[str, int, int]] = set()
+        stanza_ids: set[tuple[str, int, int]] = set()
+        for message_id, stanza_id, fk_remote_pk, fk_account_pk in session.execute(
+            stmt
+        ):
+            if message_id is not None:
+                message_ids.add((message_id, fk_remote_pk, fk_account_pk))
+            if stanza_id is not None:
+                stanza_ids.add((stanza_id, fk_remote_pk, fk_account_pk))
+
+        session.execute(delete(Message).where(Message.pk.in_(pks)))
+
+        def _unreferenced(
+            table: Any, id_column: Any, ids: set[tuple[str, int, int]]
+        ) -> sa.ColumnElement[bool]:
+            remaining = aliased(Message)
+            return sa.and_(
+                sa.tuple_(
+                    id_column, table.fk_remote_pk, table.fk_account_pk
+                ).in_(list(ids)),
+                ~sa.exists().where(
+                    sa.or_(
+                        remaining.id == id_column,
+                        remaining.stanza_id == id_column,
+                    ),
+                    remaining.fk_remote_pk == table.fk_remote_pk,
+                    remaining.fk_account_pk == table.fk_account_pk,
+                    remaining.correction_id.is_(None),
+                ),
+            )
 
-        stmt = delete(MessageError).where(
-            MessageError.fk_account_pk == fk_account_pk,
-            MessageError.fk_remote_pk == fk_remote_pk,
-        )
+        if message_ids:
+            session.execute(
+                delete(Message).where(
+                    _unreferenced(Message, Message.correction_id, message_ids)
+                )
+            )
+            session.execute(
+                delete(MessageError).where(
+                    _unreferenced(
+                        MessageError, MessageError.message_id, message_ids)
+                )
+            )
+            session.execute(
+                delete(Receipt).where(
+                    _unreferenced(Receipt, Receipt.id, message_ids)
+                )
+            )
 
-        session.execute(stmt)
+        if stanza_ids:
+            session.execute(
+                delete(Moderation).where(
+                    _unreferenced(Moderation, Moderation.stanza_id, stanza_ids)
+                )
+            )
 
-        stmt = delete(Moderation).where(
-            Moderation.fk_account_pk == fk_account_pk,
-            Moderation.fk_remote_pk == fk_remote_pk,
-        )
+        if message_ids or stanza_ids:
+            session.execute(
+                delete(DisplayedMarker).where(
+                    _unreferenced(
+                        DisplayedMarker,
+                        DisplayedMarker.id,
+                        message_ids | stanza_ids,
+                    )
+                )
+            )
 
-        session.execute(stmt)
+    @with_session
+    def _get_prune_criteria(
+        self, session: Session, account: str, jid: JID | None = None
+    ) -> list[sa.ColumnElement[bool]]:
+        criteria = [Message.fk_account_pk == self._get_account_pk(session, account)]
+        if jid is not None:
+            criteria.append(Message.fk_remote_pk == self._get_jid_pk(session, jid))
+        return criteria
 
-        stmt = delete(Message).where(
-            Message.fk_account_pk == fk_account_pk, Message.fk_remote_pk == fk_remote_pk
+    @with_session
+    def _count_messages(
+        self, session: Session, *criteria: sa.ColumnElement[bool]
+    ) -> int:
+        return session.scalar(select(sa.func.count(Message.pk)).where(*criteria)) or 0
+
+    @invalidates_messages
+    @with_session
+    def _prune_chunk(
+        self, session: Session, *criteria: sa.ColumnElement[bool]
+    ) -> int:
+        stmt = (
+            select(Message.pk, Message.fk_account_pk, Message.fk_remote_pk)
+            .where(*criteria)
+            .order_by(Message.pk)
+            .limit(PRUNE_CHUNK_SIZE)
         )
+        rows = session.execute(stmt).all()
+        if not rows:
+            return 0
 
-        session.execute(stmt)
+        self._delete_messages_with_pks(session, [row.pk for row in rows])
+
+        # Corrections and metadata of other messages of the chats may
+        # have been removed as well
+        chats = {(row.fk_account_pk, row.fk_remote_pk) for row in rows}
+        self._mark_stale(
+            lambda message: (message.fk_account_pk,
+                             message.fk_remote_pk) in chats)
+        return len(rows)
+
+    def _prune_messages(self, *criteria: sa.ColumnElement[bool]) -> int:
+        '''
+        Delete all messages matching criteria in chunks, every chunk is
+        committed on its own. If interrupted, calling this again with the
+        same criteria continues where it stopped.
+        '''
+
+        total = self._count_messages(*criteria)
+
+        deleted = 0
+        while count := self._prune_chunk(*criteria):
+            deleted += count
+            self._log.info('Removed %s of %s messages', deleted, total)
+
+        return deleted
+
+    @with_session
+    def _remove_chat_metadata(self, session: Session, account: str, jid: JID) -> None:
+        fk_account_pk = self._get_account_pk(session, account)
+        fk_remote_pk = self._get_jid_pk(session, jid)
+
+        for table in (MessageError, Moderation, Receipt, DisplayedMarker):
+            session.execute(
+                delete(table).where(
+                    table.fk_account_pk == fk_account_pk,
+                    table.fk_remote_pk == fk_remote_pk,
+                )
+            )
+
+    @timeit
+    def remove_history_for_jid(self, account: str, jid: JID) -> None:
+        '''
+        Remove messages and metadata for a specific jid.
+        '''
+
+        self._prune_messages(*self._get_prune_criteria(account, jid))
+
+        # Remove metadata which did not reference any message
+        self._remove_chat_metadata(account, jid)
 
         log.info('Removed history for: %s', jid)
 
+    @invalidates_messages
     @with_session
     @timeit
     def remove_all_history(self, session: Session) -> None:
@@ -917,21 +1689,24 @@ def remove_all_history(self, session: Session) -> None:
         session.execute(delete(MessageError))
         session.execute(delete(Moderation))
         session.execute(delete(Message))
+        self._mark_stale(lambda _message: True)
 
         log.info('Removed all chat history')
 
+    @invalidates_messages
     @with_session
     @timeit
     def remove_account(self, session: Session, account: str) -> None:
         fk_account_pk = self._get_account_pk(session, account)
 
         session.execute(delete(Account).where(Account.pk == fk_account_pk))
+        self._mark_stale(
+            lambda message: message.fk_account_pk == fk_account_pk)
 
         self._account_pks.pop(account)
 
-    @with_session
     @timeit
-    def cleanup_chat_history(self, session: Session) -> None:
+    def cleanup_chat_history(self) -> None:
         '''
         Remove messages from account where messages are older than max_age
         '''
@@ -940,18 +1715,14 @@ def cleanup_chat_history(self, session: Session) -> None:
             if max_age == -1:
                 continue
 
-            fk_account_pk = self._get_account_pk(session, account)
-
             now = datetime.now(timezone.utc)
             threshold = now - timedelta(seconds=max_age)
 
-            stmt = select(Message).where(
-                Message.fk_account_pk == fk_account_pk, Message.timestamp < threshold
+            self._prune_messages(
+                *self._get_prune_criteria(account),
+                Message.timestamp < threshold,
             )
 
-            for message in session.scalars(stmt).unique().all():
-                self._delete_message(session, message)
-
             log.info('Removed messages older then %s', threshold.isoformat())
 
     @with_session
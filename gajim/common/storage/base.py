@@ -7,18 +7,24 @@
 from typing import Any
 from typing import cast
 from typing import Concatenate
+from typing import NamedTuple
 from typing import ParamSpec
 from typing import TypeVar
 
+import functools
 import json
 import logging
 import math
 import os
 import pprint
+import queue
 import sqlite3
 import sys
+import threading
 import time
+from collections import namedtuple
 from collections.abc import Callable
+from concurrent.futures import Future
 from datetime import datetime
 from datetime import timezone
 from pathlib import Path
@@ -132,6 +138,24 @@ def _datetime_converter(data: bytes) -> datetime:
 sqlite3.register_adapter(ValueMissingT, lambda _val: None)
 
 
+@functools.lru_cache(maxsize=256)
+def get_row_class(fields: tuple[str, ...]) -> type[NamedTuple]:
+    '''
+    Returns a namedtuple class for the fields, creating a namedtuple class
+    is expensive, so classes are shared between all rows and queries
+    with the same fields
+    '''
+    return namedtuple('Row', fields)  # pyright: ignore
+
+
+def namedtuple_factory(cursor: sqlite3.Cursor,
+                       row: tuple[Any, ...]) -> NamedTuple:
+
+    assert cursor.description is not None
+    fields = tuple(col[0] for col in cursor.description)
+    return get_row_class(fields)._make(row)
+
+
 class Encoder(json.JSONEncoder):
     def default(self, o: Any) -> Any:
         if isinstance(o, set):
@@ -309,6 +333,210 @@ def shutdown(self) -> None:
         del self._con
 
 
+class StorageWriter:
+    '''
+    Executes write requests in a dedicated thread, in the order
+    they were submitted
+    '''
+
+    def __init__(self, log: logging.Logger) -> None:
+        self._log = log
+        self._queue: queue.SimpleQueue[
+            tuple[Callable[[], Any], Future[Any]] | None] = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run,
+                                        name='StorageWriter',
+                                        daemon=True)
+        self._thread.start()
+
+    def submit(self, func: Callable[..., R], *args: Any) -> Future[R]:
+        future: Future[R] = Future()
+        self._queue.put((lambda: func(*args), future))
+        return future
+
+    def flush(self) -> None:
+        '''
+        Block until all requests submitted so far are executed
+        '''
+        self.submit(lambda: None).result()
+
+    def _run(self) -> None:
+        while True:
+            request = self._queue.get()
+            if request is None:
+                break
+
+            func, future = request
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                result = func()
+            except Exception as error:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def shutdown(self) -> None:
+        self._log.info('Wait for pending write requests')
+        self._queue.put(None)
+        self._thread.join()
+
+
+class Ingest:
+    '''
+    Batches the writes of a bulk import, like the messages of an archive
+    query, in one transaction. Only calls which are passed the ingest use
+    its session. The transaction is committed once the main loop is idle,
+    so it is never kept open while waiting for the network, or before
+    any other call on the main thread accesses the database.
+
+    Rows which can not conflict may be added as pending rows, they are
+    written together before the next call which does not handle them
+    itself (see sees_pending_rows), or with the commit.
+    '''
+
+    def __init__(self, storage: AlchemyStorage) -> None:
+        self._storage = storage
+        self._session: Session | None = None
+        self._commit_source_id: int | None = None
+        self._commit_callbacks: list[Callable[[], Any]] = []
+        self._pending_rows: list[Any] = []
+
+    def _get_session(self) -> Session:
+        if self._session is None:
+            self._storage._commit_ingests()
+            self._session = self._storage._create_session()
+            # pysqlite does not begin a transaction before a savepoint,
+            # releasing the savepoint would commit each call on its own.
+            # Take the write lock right away, a read snapshot could not
+            # be upgraded once the writer thread committed.
+            self._session.execute(sa.text('BEGIN IMMEDIATE'))
+        return self._session
+
+    def execute(
+        self,
+        func: Callable[Concatenate[Any, Session, P], R],
+        storage: Any,
+        *args: P.args,
+        **kwargs: P.kwargs,
+    ) -> R:
+        assert threading.current_thread() is threading.main_thread()
+
+        session = self._get_session()
+        if not getattr(func, 'sees_pending_rows', False):
+            self._flush_pending_rows()
+
+        pending_count = len(self._pending_rows)
+        try:
+            # A failing call only rolls back its own writes
+            with session.begin_nested():
+                result = func(storage, session, *args, **kwargs)
+        except Exception:
+            del self._pending_rows[pending_count:]
+            if session.is_active:
+                self._storage._on_ingest_rolled_back()
+            else:
+                self.rollback()
+            raise
+        finally:
+            if self._session is not None:
+                # Return detached objects like a closed session would
+                self._session.expunge_all()
+
+        self._schedule_commit()
+        return result
+
+    @property
+    def pending_rows(self) -> list[Any]:
+        return self._pending_rows
+
+    def add_pending_row(self, row: Any) -> None:
+        self._pending_rows.append(row)
+        self._schedule_commit()
+
+    def _flush_pending_rows(self) -> None:
+        if not self._pending_rows:
+            return
+
+        assert self._session is not None
+        session = self._session
+        rows = self._pending_rows
+        self._pending_rows = []
+        try:
+            session.add_all(rows)
+            session.flush()
+        except Exception:
+            # Events were already raised for the rows
+            self.rollback()
+            raise
+        finally:
+            if self._session is not None:
+                self._session.expunge_all()
+
+    def call_after_commit(self, func: Callable[[], Any]) -> None:
+        self._commit_callbacks.append(func)
+
+    def _schedule_commit(self) -> None:
+        if self._commit_source_id is None:
+            self._commit_source_id = GLib.idle_add(self._on_commit_idle)
+
+    def _on_commit_idle(self) -> bool:
+        self._commit_source_id = None
+        try:
+            self.commit()
+        except Exception:
+            self._storage._log.exception('Failed to commit ingest')
+        return False
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._session is not None
+
+    @timeit
+    def commit(self) -> None:
+        if self._session is None:
+            return
+
+        self._flush_pending_rows()
+        try:
+            self._session.commit()
+        except Exception:
+            self.rollback()
+            raise
+
+        self._session.close()
+        self._session = None
+
+        callbacks = self._commit_callbacks
+        self._commit_callbacks = []
+        for func in callbacks:
+            func()
+
+    def rollback(self) -> None:
+        if self._session is None:
+            return
+
+        self._storage._log.warning('Roll back ingest')
+        try:
+            self._session.rollback()
+        finally:
+            self._session.close()
+            self._session = None
+            self._commit_callbacks.clear()
+            self._pending_rows.clear()
+            self._storage._on_ingest_rolled_back()
+
+    def close(self) -> None:
+        if self._commit_source_id is not None:
+            GLib.source_remove(self._commit_source_id)
+            self._commit_source_id = None
+
+        try:
+            self.commit()
+        finally:
+            self._storage._on_ingest_closed(self)
+
+
 class AlchemyStorage:
     def __init__(
         self,
@@ -322,6 +550,8 @@ def __init__(
         self._session = self._create_session()
         self._commit_source_id = None
         self._pragma = pragma or {}
+        self._ingests: set[Ingest] = set()
+        self._writer: StorageWriter | None = None
 
     def init(self) -> None:
         if self._path is None or not self._path.exists():
@@ -332,6 +562,50 @@ def init(self) -> None:
 
         self._migrate_storage()
 
+        if self._path is not None:
+            # In memory databases are bound to the connection of one
+            # thread, they are always written synchronously
+            self._writer = StorageWriter(self._log)
+
+    def submit(
+        self,
+        func: Callable[..., R],
+        *args: Any,
+        callback: Callable[[R], Any] | None = None,
+    ) -> Future[R]:
+        '''
+        Execute a write request in the writer thread, callback is
+        called with the result on the main loop
+        '''
+        if self._writer is None:
+            future: Future[R] = Future()
+            try:
+                future.set_result(func(*args))
+            except Exception as error:
+                future.set_exception(error)
+            self._on_write_finished(future, callback)
+            return future
+
+        future = self._writer.submit(func, *args)
+        future.add_done_callback(
+            lambda f: GLib.idle_add(self._on_write_finished, f, callback))
+        return future
+
+    def _on_write_finished(
+        self,
+        future: Future[R],
+        callback: Callable[[R], Any] | None,
+    ) -> bool:
+        error = future.exception()
+        if error is not None:
+            self._log.error('Write request failed',
+                            exc_info=(type(error), error, error.__traceback__))
+            return False
+
+        if callback is not None:
+            callback(future.result())
+        return False
+
     def get_session(self) -> Session:
         return self._session
 
@@ -415,6 +689,35 @@ def _migrate_storage(self) -> None:
     def _migrate(self) -> None:
         raise NotImplementedError
 
+    def begin_ingest(self) -> Ingest:
+        '''
+        Returns a new ingest, the writes which are passed the ingest are
+        committed in batches instead of one by one
+        '''
+        ingest = Ingest(self)
+        self._ingests.add(ingest)
+        return ingest
+
+    def _commit_ingests(self) -> None:
+        '''
+        Commit all open ingest transactions, they hold the write lock
+        and would block any other write on the main thread
+        '''
+        for ingest in list(self._ingests):
+            if not ingest.in_transaction:
+                continue
+
+            try:
+                ingest.commit()
+            except Exception:
+                self._log.exception('Failed to commit ingest')
+
+    def _on_ingest_closed(self, ingest: Ingest) -> None:
+        self._ingests.discard(ingest)
+
+    def _on_ingest_rolled_back(self) -> None:
+        pass
+
     def _explain(self, session: Session, stmt: Any) -> None:
         if not os.environ.get('GAJIM_EXPLAIN'):
             return
@@ -428,16 +731,46 @@ def _explain(self, session: Session, stmt: Any) -> None:
         log.debug('\n%s\n%s', stmt, explanation)
 
     def shutdown(self) -> None:
+        for ingest in list(self._ingests):
+            ingest.close()
+
+        if self._writer is not None:
+            self._writer.shutdown()
+            self._writer = None
+
         self._run_analyze()
         self._engine.dispose()
         del self._session
         del self._engine
 
 
+def sees_pending_rows(
+    func: Callable[Concatenate[Any, Session, P], R]
+) -> Callable[Concatenate[Any, Session, P], R]:
+    '''
+    Mark func as handling the pending rows of an ingest itself, they
+    are not written before it is called with the ingest
+    '''
+    func.sees_pending_rows = True  # pyright: ignore
+    return func
+
+
 def with_session(
     func: Callable[Concatenate[Any, Session, P], R]
 ) -> Callable[Concatenate[Any, P], R]:
+    '''
+    Pass a new session to func, or the session of the ingest if func
+    was called with one
+    '''
     def wrapper(self: Any, *args: P.args, **kwargs: P.kwargs) -> R:
+        ingest = cast(Ingest | None, kwargs.get('ingest'))
+        if ingest is not None:
+            return ingest.execute(func, self, *args, **kwargs)
+
+        if (self._ingests and
+                threading.current_thread() is threading.main_thread()):
+            self._commit_ingests()
+
         with self._create_session() as session, session.begin():
             return func(self, session, *args, **kwargs)
 
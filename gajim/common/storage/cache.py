@@ -12,7 +12,7 @@
 import sqlite3
 import time
 from collections import defaultdict
-from collections import namedtuple
+from collections.abc import Iterable
 
 from nbxmpp.protocol import JID
 from nbxmpp.structs import DiscoInfo
@@ -21,12 +21,21 @@
 from gajim.common import configpaths
 from gajim.common.storage.base import Encoder
 from gajim.common.storage.base import json_decoder
+from gajim.common.storage.base import namedtuple_factory
 from gajim.common.storage.base import SqliteStorage
 from gajim.common.storage.base import timeit
 
 ContactCacheDictT = dict[tuple[str, JID], dict[str, Any]]
 
-CURRENT_USER_VERSION = 10
+CURRENT_USER_VERSION = 11
+
+ROSTER_TABLE = '''
+    CREATE TABLE roster(
+            account TEXT,
+            jid TEXT,
+            item TEXT,
+            PRIMARY KEY (account, jid)
+    );'''
 
 CACHE_SQL_STATEMENT = '''
     CREATE TABLE caps_cache (
@@ -40,10 +49,7 @@
             disco_info TEXT,
             last_seen INTEGER
     );
-    CREATE TABLE roster(
-            account TEXT PRIMARY KEY UNIQUE,
-            roster TEXT
-    );
+    %s
     CREATE TABLE muc(
             account TEXT,
             jid TEXT,
@@ -73,7 +79,7 @@
     CREATE INDEX idx_muc ON muc(jid);
 
     PRAGMA user_version=%s;
-    ''' % CURRENT_USER_VERSION
+    ''' % (ROSTER_TABLE, CURRENT_USER_VERSION)
 
 log = logging.getLogger('gajim.c.storage.cache')
 
@@ -103,21 +109,12 @@ def init(self, **kwargs: Any) -> None:
         SqliteStorage.init(self,
                            detect_types=sqlite3.PARSE_COLNAMES)
         self._set_journal_mode('WAL')
-        self._con.row_factory = self._namedtuple_factory
+        self._con.row_factory = namedtuple_factory
 
         self._fill_disco_info_cache()
         self._clean_caps_table()
         self._load_caps_data()
 
-    @staticmethod
-    def _namedtuple_factory(cursor: sqlite3.Cursor,
-                            row: tuple[Any, ...]) -> NamedTuple:
-
-        assert cursor.description is not None
-        fields = [col[0] for col in cursor.description]
-        Row = namedtuple('Row', fields)  # pyright: ignore
-        return Row(*row)
-
     def _migrate(self) -> None:
         try:
             user_version = self.user_version
@@ -135,6 +132,25 @@ def _migrate(self) -> None:
             self._reinit_storage()
             return
 
+        if user_version < 11:
+            self._migrate_roster()
+
+    def _migrate_roster(self) -> None:
+        # Split the roster, which was stored as one JSON list per
+        # account, into one row per contact
+        rows = self._con.execute('SELECT account, roster FROM roster').fetchall()
+
+        self._con.execute('BEGIN')
+        self._con.execute('DROP TABLE roster')
+        self._con.execute(ROSTER_TABLE)
+
+        for account, roster in rows:
+            items = json.loads(roster, object_hook=json_decoder)
+            self._insert_roster_items(account, items)
+
+        self._con.execute('PRAGMA user_version=11')
+        self._con.commit()
+
     @timeit
     def _load_caps_data(self) -> None:
         rows = self._con.execute(
@@ -248,30 +264,43 @@ def set_last_disco_info(self,
         self._disco_info_cache[jid] = disco_info
         self._delayed_commit()
 
-    @timeit
-    def store_roster(self, account: str, roster: dict[JID, RosterItem]) -> None:
-        serialized = json.dumps(list(roster.values()), cls=Encoder)
+    def _insert_roster_items(self,
+                             account: str,
+                             items: Iterable[RosterItem]) -> None:
 
-        insert_sql = 'INSERT INTO roster(account, roster) VALUES(?, ?)'
-        update_sql = 'UPDATE roster SET roster = ? WHERE account = ?'
+        sql = '''INSERT OR REPLACE INTO roster(account, jid, item)
+                 VALUES(?, ?, ?)'''
+        self._con.executemany(
+            sql, ((account, item.jid, json.dumps(item, cls=Encoder))
+                  for item in items))
 
-        try:
-            self._con.execute(insert_sql, (account, serialized))
-        except sqlite3.IntegrityError:
-            self._con.execute(update_sql, (serialized, account))
+    @timeit
+    def store_roster_items(self,
+                           account: str,
+                           items: Iterable[RosterItem]) -> None:
+        self._insert_roster_items(account, items)
+        self._delayed_commit()
 
+    @timeit
+    def remove_roster_items(self, account: str, jids: Iterable[JID]) -> None:
+        sql = 'DELETE FROM roster WHERE account = ? AND jid = ?'
+        self._con.executemany(sql, ((account, jid) for jid in jids))
         self._delayed_commit()
 
     @timeit
-    def load_roster(self, account: str) -> dict[JID, RosterItem] | None:
-        select_sql = 'SELECT roster FROM roster WHERE account = ?'
-        result = self._con.execute(select_sql, (account,)).fetchone()
-        if result is None:
-            return None
+    def load_roster_jids(self, account: str) -> list[JID]:
+        sql = 'SELECT jid as "jid [jid]" FROM roster WHERE account = ?'
+        rows = self._con.execute(sql, (account,)).fetchall()
+        return [row.jid for row in rows]
+
+    @timeit
+    def load_roster(self, account: str) -> dict[JID, RosterItem]:
+        sql = 'SELECT item FROM roster WHERE account = ?'
+        rows = self._con.execute(sql, (account,)).fetchall()
 
         roster: dict[JID, RosterItem] = {}
-        data = json.loads(result.roster, object_hook=json_decoder)
-        for item in data:
+        for row in rows:
+            item = json.loads(row.item, object_hook=json_decoder)
             roster[item.jid] = item
         return roster
 
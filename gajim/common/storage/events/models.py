@@ -9,6 +9,7 @@
 import datetime
 
 from nbxmpp import JID
+from sqlalchemy import Index
 from sqlalchemy import types
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.orm import Mapped
@@ -37,3 +38,5 @@ class Event(MappedAsDataclass, Base, kw_only=True):
     event: Mapped[str] = mapped_column()
     timestamp: Mapped[datetime.datetime] = mapped_column(EpochTimestampType)
     data: Mapped[str] = mapped_column()
+
+    __table_args__ = (Index('idx_event', 'account', 'jid', 'timestamp'),)
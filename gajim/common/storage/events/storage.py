@@ -10,8 +10,11 @@
 import datetime as dt
 import json
 import logging
+from collections import defaultdict
 
 import sqlalchemy as sa
+from gi.repository import GLib
+from nbxmpp.protocol import JID
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 
@@ -40,6 +43,15 @@
 
 log = logging.getLogger('gajim.c.storage.events')
 
+# Only the most recent events of each chat are kept. Old events are
+# removed once a chat has PRUNE_THRESHOLD more events than the limit.
+MAX_EVENTS_PER_CHAT = 1000
+PRUNE_THRESHOLD = 100
+
+# Events are collected and inserted together, presence floods in
+# large group chats would otherwise result in one insert per presence
+FLUSH_DELAY = 100  # ms
+
 
 class EventStorage(AlchemyStorage):
     def __init__(self):
@@ -49,6 +61,10 @@ def __init__(self):
             None,
         )
 
+        self._pending: list[dict[str, Any]] = []
+        self._flush_source_id: int | None = None
+        self._event_counts: dict[tuple[str, JID], int] = defaultdict(int)
+
     def _create_table(self, session: Session, engine: Engine) -> None:
         mod.Base.metadata.create_all(engine)
         session.execute(sa.text('PRAGMA user_version=1'))
@@ -56,24 +72,82 @@ def _create_table(self, session: Session, engine: Engine) -> None:
     def _migrate(self) -> None:
         pass
 
-    @with_session
-    def store(self, session: Session, contact: ChatContactT, event_: Any) -> None:
+    def store(self, contact: ChatContactT, event_: Any) -> None:
         event_dict = dataclasses.asdict(event_)
         name = event_dict.pop('name')
         timestamp = event_dict.pop('timestamp')
 
-        event = mod.Event(
-            account=contact.account,
-            jid=contact.jid,
-            event=name,
-            timestamp=timestamp,
-            data=json.dumps(event_dict, cls=Encoder),
+        self._pending.append({
+            'account': contact.account,
+            'jid': contact.jid,
+            'event': name,
+            'timestamp': timestamp,
+            'data': json.dumps(event_dict, cls=Encoder),
+        })
+
+        if self._flush_source_id is None:
+            self._flush_source_id = GLib.timeout_add(FLUSH_DELAY,
+                                                     self._on_flush)
+
+    def _on_flush(self) -> bool:
+        self._flush_source_id = None
+        self.flush()
+        return False
+
+    def flush(self) -> None:
+        '''
+        Insert all events which were stored since the last flush
+        '''
+        if self._flush_source_id is not None:
+            GLib.source_remove(self._flush_source_id)
+            self._flush_source_id = None
+
+        if not self._pending:
+            return
+
+        pending = self._pending
+        self._pending = []
+        self._insert(pending)
+
+    @with_session
+    def _insert(self, session: Session, rows: list[dict[str, Any]]) -> None:
+        session.execute(sa.insert(mod.Event), rows)
+
+        chats: set[tuple[str, JID]] = set()
+        for row in rows:
+            chat = (row['account'], row['jid'])
+            self._event_counts[chat] += 1
+            chats.add(chat)
+
+        for chat in chats:
+            if self._event_counts[chat] > MAX_EVENTS_PER_CHAT + PRUNE_THRESHOLD:
+                self._prune(session, *chat)
+
+    def _prune(self, session: Session, account: str, jid: JID) -> None:
+        old_events = (
+            sa.select(mod.Event.pk)
+            .where(mod.Event.account == account, mod.Event.jid == jid)
+            .order_by(sa.desc(mod.Event.timestamp))
+            .offset(MAX_EVENTS_PER_CHAT)
         )
 
-        session.add(event)
+        result = session.execute(
+            sa.delete(mod.Event).where(mod.Event.pk.in_(old_events)))
+        log.info('Removed %s old events of %s', result.rowcount, jid)
+        self._event_counts[(account, jid)] = MAX_EVENTS_PER_CHAT
 
-    @with_session
     def load(
+        self,
+        contact: ChatContactT,
+        before: bool,
+        timestamp_: float,
+        n_lines: int,
+    ) -> list[events.ApplicationEvent]:
+        self.flush()
+        return self._load(contact, before, timestamp_, n_lines)
+
+    @with_session
+    def _load(
         self,
         session: Session,
         contact: ChatContactT,
@@ -10,9 +10,9 @@
 from typing import Any
 from typing import NamedTuple
 
+import functools
 import sqlite3
 import time
-from collections import namedtuple
 from pathlib import Path
 
 from omemo_dr.const import OMEMOTrust
@@ -29,6 +29,7 @@
 
 from gajim.common import app
 from gajim.common.modules.util import LogAdapter
+from gajim.common.storage.base import get_row_class
 
 
 def _convert_identity_key(key: bytes) -> IdentityKey | None:
@@ -45,6 +46,23 @@ def _convert_record(record: bytes) -> SessionRecord:
 sqlite3.register_converter('session_record', _convert_record)
 
 
+@functools.lru_cache(maxsize=64)
+def _get_row_class(columns: tuple[str, ...]) -> type[NamedTuple]:
+    fields: list[str] = []
+    for column in columns:
+        if column == '_id':
+            fields.append('id')
+        elif 'strftime' in column:
+            fields.append('formated_time')
+        elif 'MAX' in column or 'COUNT' in column:
+            col_name = column.replace('(', '_')
+            col_name = col_name.replace(')', '')
+            fields.append(col_name.lower())
+        else:
+            fields.append(column)
+    return get_row_class(tuple(fields))
+
+
 class OMEMOStorage(Store):
     def __init__(self, account: str, db_path: Path, log: LogAdapter) -> None:
         self._log = log
@@ -73,19 +91,8 @@ def _namedtuple_factory(cursor: sqlite3.Cursor,
                             row: tuple[Any, ...]
                             ) -> NamedTuple:
 
-        fields: list[str] = []
-        for col in cursor.description:
-            if col[0] == '_id':
-                fields.append('id')
-            elif 'strftime' in col[0]:
-                fields.append('formated_time')
-            elif 'MAX' in col[0] or 'COUNT' in col[0]:
-                col_name = col[0].replace('(', '_')
-                col_name = col_name.replace(')', '')
-                fields.append(col_name.lower())
-            else:
-                fields.append(col[0])
-        return namedtuple('Row', fields)(*row)  # pyright: ignore
+        columns = tuple(col[0] for col in cursor.description)
+        return _get_row_class(columns)._make(row)
 
     def user_version(self) -> int:
         return self._con.execute('PRAGMA user_version').fetchone()[0]
@@ -10,6 +10,7 @@
 import string
 from dataclasses import dataclass
 from dataclasses import field
+from itertools import accumulate
 from re import Match
 
 from gi.repository import GLib
@@ -168,14 +169,29 @@ class ParsingResult:
     blocks: list[Block]
 
 
-def find_byte_index(text: str, index: int):
-    byte_index = -1
-    for index_, c in enumerate(text):
-        byte_index += len(c.encode())
-        if index == index_:
-            return byte_index
+class ByteIndex:
+    '''
+    Maps char indices of a line to the index of the last UTF-8 byte of
+    the char, the offsets are computed once per line on first use
+    '''
+
+    def __init__(self, line: str) -> None:
+        self._line = line
+        self._is_ascii = line.isascii()
+        self._offsets: list[int] | None = None
+
+    def find(self, index: int) -> int:
+        if not 0 <= index < len(self._line):
+            raise ValueError(f'index not in string: {self._line}, {index}')
 
-    raise ValueError(f'index not in string: {text}, {index}')
+        if self._is_ascii:
+            return index
+
+        if self._offsets is None:
+            # Cumulative UTF-8 length of the line up to each char
+            self._offsets = list(accumulate(
+                len(char.encode()) for char in self._line))
+        return self._offsets[index] - 1
 
 
 def process(text: str | bytes, level: int = 0) -> ParsingResult:
@@ -216,6 +232,28 @@ def process_uris(text: str | bytes) -> list[BaseHyperlink]:
     return uris
 
 
+def split_plain_lines(text: str) -> list[tuple[str, bool]]:
+    '''
+    Splits text into lines like process() does and returns each line
+    together with whether it is part of a plain block
+    '''
+    lines: list[tuple[str, bool]] = []
+    for block in _parse_blocks(text, 0):
+        # Blocks always start and end at line boundaries
+        is_plain = isinstance(block, PlainBlock)
+        lines += [(line, is_plain) for line in
+                  block.text.splitlines(keepends=True)]
+    return lines
+
+
+def parse_line(line: str) -> list[Span]:
+    '''
+    Returns the spans of a single line of a plain block, offsets are
+    relative to the line
+    '''
+    return _parse_line(line, 0, 0)
+
+
 def _parse_blocks(text: str, level: int) -> list[Block]:
     blocks: list[Block] = []
     text_len = len(text)
@@ -256,6 +294,7 @@ def _parse_line(line: str, offset: int, offset_bytes: int) -> list[Span]:
     length = len(line)
     stack: list[tuple[str, int]] = []
     spans: list[Span] = []
+    byte_index = ByteIndex(line)
 
     while index < length:
         sd = line[index]
@@ -277,6 +316,7 @@ def _parse_line(line: str, offset: int, offset_bytes: int) -> list[Span]:
                                          index,
                                          offset,
                                          offset_bytes,
+                                         byte_index,
                                          spans)
                 continue
 
@@ -300,7 +340,8 @@ def _parse_line(line: str, offset: int, offset_bytes: int) -> list[Span]:
                                     start_pos,
                                     index,
                                     offset,
-                                    offset_bytes))
+                                    offset_bytes,
+                                    byte_index))
 
         index += 1
 
@@ -311,12 +352,14 @@ def _parse_uris(line: str,
                 offset: int,
                 offset_bytes: int) -> list[BaseHyperlink]:
     uris: list[BaseHyperlink] = []
+    byte_index = ByteIndex(line)
+    first_parenthesis = line.find('(')
 
     def make(start: int, end: int, is_jid: bool) -> BaseHyperlink | None:
         if line[end - 1] == ',':
             # Trim one trailing comma
             end -= 1
-        if '(' in line[:start] and line[end - 1] == ')':
+        if 0 <= first_parenthesis < start and line[end - 1] == ')':
             # Trim one trailing closing parenthesis if the match is preceded
             # by an opening one somewhere on the line
             end -= 1
@@ -328,6 +371,7 @@ def make(start: int, end: int, is_jid: bool) -> BaseHyperlink | None:
                                end - 1,
                                offset,
                                offset_bytes,
+                               byte_index,
                                is_jid)
 
     for match in URI_OR_JID_RX.finditer(line):
@@ -343,6 +387,7 @@ def _handle_pre_span(line: str,
                      index: int,
                      offset: int,
                      offset_bytes: int,
+                     byte_index: ByteIndex,
                      spans: list[Span]) -> int:
 
     # Scan ahead for the end
@@ -354,7 +399,8 @@ def _handle_pre_span(line: str,
         # empty span
         return index + 1
 
-    spans.append(_make_span(line, PRE, index, end, offset, offset_bytes))
+    spans.append(_make_span(
+        line, PRE, index, end, offset, offset_bytes, byte_index))
     return end + 1
 
 
@@ -363,12 +409,13 @@ def _make_span(line: str,
                start: int,
                end: int,
                offset: int,
-               offset_bytes: int) -> Span:
+               offset_bytes: int,
+               byte_index: ByteIndex) -> Span:
 
     text = line[start:end + 1]
 
-    start_byte = find_byte_index(line, start) + offset_bytes
-    end_byte = find_byte_index(line, end) + offset_bytes + 1
+    start_byte = byte_index.find(start) + offset_bytes
+    end_byte = byte_index.find(end) + offset_bytes + 1
 
     start += offset
     end += offset + 1
@@ -387,12 +434,13 @@ def _make_hyperlink(line: str,
                     end: int,
                     offset: int,
                     offset_bytes: int,
+                    byte_index: ByteIndex,
                     is_jid: bool) -> BaseHyperlink | None:
 
     text = line[start:end + 1]
 
-    start_byte = find_byte_index(line, start) + offset_bytes
-    end_byte = find_byte_index(line, end) + offset_bytes + 1
+    start_byte = byte_index.find(start) + offset_bytes
+    end_byte = byte_index.find(end) + offset_bytes + 1
 
     start += offset
     end += offset + 1
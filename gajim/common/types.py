@@ -70,3 +70,6 @@
 GroupchatContactT = Union['GroupchatContact']
 
 PresenceShowT = PresenceShowExt | PresenceShow
+
+# Not our own nickname, show rank, collation key of the nickname
+ParticipantSortKeyT = tuple[bool, int, str]
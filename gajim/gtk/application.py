@@ -849,17 +849,22 @@ def _on_mute_chat_action(_action: Gio.SimpleAction,
     def _on_remove_history_action(_action: Gio.SimpleAction,
                                   params: structs.RemoveHistoryActionParams
                                   ) -> None:
-        def _remove() -> None:
-            app.storage.archive.remove_history_for_jid(
-                params.account, params.jid)
-
+        def _on_removed(_result: None) -> None:
             app.window.clear_chat_list_row(params.account, params.jid)
             control = app.window.get_control()
+            control.remove_cached_views(params.account, params.jid)
             if not control.is_loaded(params.account, params.jid):
                 return
 
             control.reset_view()
 
+        def _remove() -> None:
+            app.storage.archive.submit(
+                app.storage.archive.remove_history_for_jid,
+                params.account,
+                params.jid,
+                callback=_on_removed)
+
         ConfirmationDialog(
             _('Remove Chat History'),
             _('Remove Chat History?'),
@@ -882,4 +887,7 @@ def _on_forget_groupchat_action(_action: Gio.SimpleAction,
         client.get_module('MUC').leave(params.jid)
         client.get_module('Bookmarks').remove(params.jid)
 
-        app.storage.archive.remove_history_for_jid(params.account, params.jid)
+        app.storage.archive.submit(
+            app.storage.archive.remove_history_for_jid,
+            params.account,
+            params.jid)
@@ -4,17 +4,24 @@
 
 from __future__ import annotations
 
+from typing import Any
+
 import functools
 import hashlib
 import logging
 import math
 from collections import defaultdict
+from collections import OrderedDict
+from collections.abc import Hashable
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
 from math import pi
 from pathlib import Path
 
 import cairo
 from gi.repository import Gdk
 from gi.repository import GdkPixbuf
+from gi.repository import GLib
 from gi.repository import Pango
 from gi.repository import PangoCairo
 from nbxmpp.protocol import JID
@@ -25,6 +32,7 @@
 from gajim.common.const import AvatarSize
 from gajim.common.const import StyleAttr
 from gajim.common.helpers import get_groupchat_name
+from gajim.common.modules.contacts import GroupchatParticipant
 from gajim.common.util.classes import Singleton
 
 from gajim.gtk.const import DEFAULT_WORKSPACE_COLOR
@@ -41,12 +49,17 @@
 log = logging.getLogger('gajim.gtk.avatar')
 
 
-AvatarCacheT = dict[JID | str, dict[tuple[int, int, str | None, str | None],
-                                          cairo.ImageSurface]]
+AvatarKeyT = tuple[int, int, str | None, str | None, str]
 
 CIRCLE_RATIO = 0.18
 CIRCLE_FILL_RATIO = 0.80
 
+# Memory budgets for finished avatars (clipped, with status and transport
+# icon) and for decoded avatar images, from which all sizes are derived
+AVATAR_CACHE_SIZE = 32 * 1024 * 1024
+DECODED_CACHE_SIZE = 16 * 1024 * 1024
+DECODE_WORKERS = 2
+
 
 def generate_avatar_letter(text: str) -> str:
     return get_first_graphemes(text.lstrip(), 1).upper()
@@ -385,12 +398,94 @@ def convert_to_greyscale(surface: cairo.ImageSurface) -> cairo.ImageSurface:
     return context.get_target()
 
 
+class SurfaceCache:
+    '''
+    LRU cache for surfaces, bounded by the memory used by the surfaces.
+    Entries are grouped, so all entries of e.g. one JID can be removed.
+    '''
+
+    def __init__(self, max_bytes: int) -> None:
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self._surfaces: OrderedDict[
+            tuple[Hashable, Hashable], cairo.ImageSurface] = OrderedDict()
+        self._groups: defaultdict[
+            Hashable, set[Hashable]] = defaultdict(set)
+
+    def get(self, group: Hashable, key: Hashable) -> cairo.ImageSurface | None:
+        surface = self._surfaces.get((group, key))
+        if surface is not None:
+            self._surfaces.move_to_end((group, key))
+        return surface
+
+    def set(self,
+            group: Hashable,
+            key: Hashable,
+            surface: cairo.ImageSurface) -> None:
+
+        self._remove((group, key))
+        self._surfaces[(group, key)] = surface
+        self._groups[group].add(key)
+        self._bytes += _get_surface_bytes(surface)
+
+        while self._bytes > self._max_bytes and len(self._surfaces) > 1:
+            cache_key, _surface = next(iter(self._surfaces.items()))
+            self._remove(cache_key)
+
+    def remove_group(self, group: Hashable) -> None:
+        for key in list(self._groups.get(group, ())):
+            self._remove((group, key))
+
+    def _remove(self, cache_key: tuple[Hashable, Hashable]) -> None:
+        surface = self._surfaces.pop(cache_key, None)
+        if surface is None:
+            return
+
+        self._bytes -= _get_surface_bytes(surface)
+        group, key = cache_key
+        keys = self._groups[group]
+        keys.discard(key)
+        if not keys:
+            del self._groups[group]
+
+
+def _get_surface_bytes(surface: cairo.ImageSurface) -> int:
+    return surface.get_stride() * surface.get_height()
+
+
+def scale_surface(surface: cairo.ImageSurface,
+                  size: int,
+                  scale: int) -> cairo.ImageSurface:
+
+    # Scales a square surface to size pixels
+    new_surface = cairo.ImageSurface(cairo.Format.ARGB32, size, size)
+    context = cairo.Context(new_surface)
+    factor = size / surface.get_width()
+    context.scale(factor, factor)
+    context.set_source_surface(surface, 0, 0)
+    context.paint()
+    new_surface.set_device_scale(scale, scale)
+    return new_surface
+
+
 class AvatarStorage(metaclass=Singleton):
     def __init__(self):
-        self._cache: AvatarCacheT = defaultdict(dict)
+        self._cache = SurfaceCache(AVATAR_CACHE_SIZE)
+
+        # Square, unclipped avatar images by sha, with the largest size
+        # which was requested so far. Smaller sizes are scaled down from
+        # these instead of reading the file again.
+        self._decoded = SurfaceCache(DECODED_CACHE_SIZE)
+
+        self._executor = ThreadPoolExecutor(max_workers=DECODE_WORKERS,
+                                            thread_name_prefix='AvatarDecoder')
+
+        # sha -> contacts which wait for the image to be decoded
+        self._decoding: dict[str, dict[int, Any]] = {}
+        self._failed: set[str] = set()
 
     def invalidate_cache(self, jid: JID | str) -> None:
-        self._cache.pop(jid, None)
+        self._cache.remove_group(jid)
 
     def get_pixbuf(self,
                    contact: (types.BareContact |
@@ -420,25 +515,41 @@ def get_surface(self,
                     show: str | None = None,
                     default: bool = False,
                     transport_icon: str | None = None,
-                    style: str = 'circle') -> cairo.ImageSurface:
+                    style: str = 'circle',
+                    load_async: bool = False) -> cairo.ImageSurface:
+
+        '''
+        With load_async a letter avatar is returned while the avatar image
+        is decoded, the contact notifies an avatar update once it is done
+        '''
 
         jid = contact.jid
+        key: AvatarKeyT = (size, scale, show, transport_icon, style)
 
+        cache = True
         if not default:
-            surface = self._cache[jid].get((size, scale, show, transport_icon))
+            surface = self._cache.get(jid, key)
             if surface is not None:
                 return surface
 
-            surface = self._get_avatar_from_storage(contact, size, scale, style)
-            if surface is not None:
-                if show is not None:
-                    surface = add_status_to_avatar(surface, show)
+            avatar_sha = contact.avatar_sha
+            if avatar_sha is not None:
+                surface = self._get_avatar_image(
+                    avatar_sha, size, scale, not load_async, contact)
+                if surface is not None:
+                    surface = clip(surface, style)
+                    if show is not None:
+                        surface = add_status_to_avatar(surface, show)
 
-                if transport_icon is not None:
-                    surface = add_transport_to_avatar(surface, transport_icon)
+                    if transport_icon is not None:
+                        surface = add_transport_to_avatar(
+                            surface, transport_icon)
 
-                self._cache[jid][(size, scale, show, transport_icon)] = surface
-                return surface
+                    self._cache.set(jid, key, surface)
+                    return surface
+
+                # Show a placeholder while the image is decoded
+                cache = avatar_sha not in self._decoding
 
         name = contact.name
         color = get_contact_color(contact)
@@ -451,7 +562,8 @@ def get_surface(self,
         if transport_icon is not None:
             surface = add_transport_to_avatar(surface, transport_icon)
 
-        self._cache[jid][(size, scale, show, transport_icon)] = surface
+        if cache:
+            self._cache.set(jid, key, surface)
         return surface
 
     def get_muc_surface(self,
@@ -461,32 +573,41 @@ def get_muc_surface(self,
                         scale: int,
                         default: bool = False,
                         transport_icon: str | None = None,
-                        style: str = 'circle') -> cairo.ImageSurface:
+                        style: str = 'circle',
+                        load_async: bool = False) -> cairo.ImageSurface:
+
+        key: AvatarKeyT = (size, scale, None, transport_icon, style)
 
         if not default:
-            surface = self._cache[jid].get((size, scale, None, transport_icon))
+            surface = self._cache.get(jid, key)
             if surface is not None:
                 return surface
 
+        client = app.get_client(account)
+        contact = client.get_module('Contacts').get_bare_contact(jid)
+
+        cache = True
+        if not default:
             avatar_sha = app.storage.cache.get_muc(account, jid, 'avatar')
             if avatar_sha is not None:
-                surface = self.surface_from_filename(avatar_sha, size, scale)
+                surface = self._get_avatar_image(
+                    avatar_sha, size, scale, not load_async, contact)
                 if surface is not None:
                     if transport_icon is not None:
                         surface = add_transport_to_avatar(
                             surface, transport_icon)
 
                     surface = clip(surface, style)
-                    self._cache[jid][
-                        (size, scale, None, transport_icon)] = surface
+                    self._cache.set(jid, key, surface)
                     return surface
 
-                # avatar_sha set, but image is missing
-                # (e.g. avatar cache deleted)
-                app.storage.cache.set_muc(account, jid, 'avatar', None)
-
-        client = app.get_client(account)
-        contact = client.get_module('Contacts').get_bare_contact(jid)
+                if avatar_sha in self._decoding:
+                    # Show a placeholder while the image is decoded
+                    cache = False
+                else:
+                    # avatar_sha set, but image is missing
+                    # (e.g. avatar cache deleted)
+                    app.storage.cache.set_muc(account, jid, 'avatar', None)
 
         name = get_groupchat_name(client, jid)
         color = get_contact_color(contact)
@@ -495,7 +616,8 @@ def get_muc_surface(self,
         if transport_icon is not None:
             surface = add_transport_to_avatar(surface, transport_icon)
 
-        self._cache[jid][(size, scale, None, transport_icon)] = surface
+        if cache:
+            self._cache.set(jid, key, surface)
         return surface
 
     def get_workspace_surface(self,
@@ -503,7 +625,8 @@ def get_workspace_surface(self,
                               size: int,
                               scale: int) -> cairo.ImageSurface | None:
 
-        surface = self._cache[workspace_id].get((size, scale, None, None))
+        key: AvatarKeyT = (size, scale, None, None, 'round-corners')
+        surface = self._cache.get(workspace_id, key)
         if surface is not None:
             return surface
 
@@ -512,7 +635,7 @@ def get_workspace_surface(self,
         avatar_sha = app.settings.get_workspace_setting(
             workspace_id, 'avatar_sha')
         if avatar_sha:
-            surface = self._load_surface_from_storage(avatar_sha, size, scale)
+            surface = self._get_avatar_image(avatar_sha, size, scale, True)
             if surface is not None:
                 return clip(surface, 'round-corners')
 
@@ -523,7 +646,7 @@ def get_workspace_surface(self,
         rgba = make_rgba(color or DEFAULT_WORKSPACE_COLOR)
         surface = make_workspace_avatar(
             name, rgba_to_float(rgba), size, scale)
-        self._cache[workspace_id][(size, scale, None, None)] = surface
+        self._cache.set(workspace_id, key, surface)
         return surface
 
     @staticmethod
@@ -544,8 +667,7 @@ def _load_for_publish(path: str) -> tuple[bool, bytes] | None:
         assert pixbuf is not None
         return pixbuf.save_to_bufferv('png', [], [])
 
-    @staticmethod
-    def save_avatar(data: bytes) -> str | None:
+    def save_avatar(self, data: bytes) -> str | None:
         '''
         Save an avatar to the harddisk
 
@@ -562,6 +684,8 @@ def save_avatar(data: bytes) -> str | None:
         except Exception:
             log.exception('Storing avatar failed')
             return None
+
+        self._failed.discard(sha)
         return sha
 
     @staticmethod
@@ -579,47 +703,99 @@ def surface_from_filename(self,
                               size: int,
                               scale: int) -> cairo.ImageSurface | None:
 
-        size = size * scale
-        path = self.get_avatar_path(filename)
-        if path is None:
-            return None
+        return self._get_avatar_image(filename, size, scale, True)
 
-        pixbuf = load_pixbuf(path, size)
-        if pixbuf is None:
+    def _get_avatar_image(self,
+                          filename: str,
+                          size: int,
+                          scale: int,
+                          sync: bool,
+                          requester: Any | None = None
+                          ) -> cairo.ImageSurface | None:
+
+        '''
+        Returns the square avatar image with size * scale pixels. If it
+        has not been decoded at this size, it is decoded synchronously
+        or in the background, requester is notified once it is done.
+        '''
+
+        pixel_size = size * scale
+        decoded = self._decoded.get(filename, None)
+        if decoded is not None and decoded.get_width() >= pixel_size:
+            return scale_surface(decoded, pixel_size, scale)
+
+        if sync:
+            pixbuf = self._load_pixbuf(filename, pixel_size)
+            self._on_decode_finished(filename, pixel_size, pixbuf)
+            decoded = self._decoded.get(filename, None)
+            if decoded is None:
+                return None
+            return scale_surface(decoded, pixel_size, scale)
+
+        if filename in self._failed:
             return None
 
-        surface = Gdk.cairo_surface_create_from_pixbuf(pixbuf, scale)
-        return fit(surface, size)
+        requesters = self._decoding.get(filename)
+        if requesters is None:
+            requesters = self._decoding[filename] = {}
+            future = self._executor.submit(
+                self._load_pixbuf, filename, pixel_size)
+            future.add_done_callback(
+                lambda f: GLib.idle_add(
+                    self._on_decoded, f, filename, pixel_size))
 
-    def _load_surface_from_storage(self,
-                                   filename: str,
-                                   size: int,
-                                   scale: int) -> cairo.ImageSurface | None:
+        if requester is not None:
+            requesters[id(requester)] = requester
+        return None
+
+    def _load_pixbuf(self,
+                     filename: str,
+                     size: int) -> GdkPixbuf.Pixbuf | None:
 
-        size = size * scale
         path = self.get_avatar_path(filename)
         if path is None:
             return None
+        return load_pixbuf(path, size)
+
+    def _on_decoded(self,
+                    future: Future[GdkPixbuf.Pixbuf | None],
+                    filename: str,
+                    size: int) -> bool:
+
+        pixbuf = None
+        try:
+            pixbuf = future.result()
+        except Exception:
+            log.exception('Loading avatar failed: %s', filename)
+
+        self._on_decode_finished(filename, size, pixbuf)
+
+        requesters = self._decoding.pop(filename, {})
+        for contact in requesters.values():
+            self._notify_avatar_update(contact)
+        return False
+
+    def _on_decode_finished(self,
+                            filename: str,
+                            size: int,
+                            pixbuf: GdkPixbuf.Pixbuf | None) -> None:
 
-        pixbuf = load_pixbuf(path, size)
         if pixbuf is None:
-            return None
-        surface = Gdk.cairo_surface_create_from_pixbuf(pixbuf, scale)
-        return fit(surface, size)
-
-    def _get_avatar_from_storage(self,
-                                 contact: (types.BareContact |
-                                           types.GroupchatContact |
-                                           types.GroupchatParticipant),
-                                 size: int,
-                                 scale: int,
-                                 style: str) -> cairo.ImageSurface | None:
-
-        avatar_sha = contact.avatar_sha
-        if avatar_sha is None:
-            return None
+            self._failed.add(filename)
+            return
 
-        surface = self._load_surface_from_storage(avatar_sha, size, scale)
-        if surface is None:
-            return None
-        return clip(surface, style)
+        self._failed.discard(filename)
+
+        decoded = self._decoded.get(filename, None)
+        if decoded is not None and decoded.get_width() >= size:
+            return
+
+        surface = Gdk.cairo_surface_create_from_pixbuf(pixbuf, 1)
+        self._decoded.set(filename, None, fit(surface, size))
+
+    @staticmethod
+    def _notify_avatar_update(contact: Any) -> None:
+        if isinstance(contact, GroupchatParticipant):
+            contact.notify('user-avatar-update')
+        else:
+            contact.notify('avatar-update')
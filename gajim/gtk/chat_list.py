@@ -174,7 +174,8 @@ def add_chat(self,
                  jid: JID,
                  type_: str,
                  pinned: bool,
-                 position: int
+                 position: int,
+                 last_messages: dict[tuple[str, JID], Message] | None = None
                  ) -> None:
 
         key = (account, jid)
@@ -182,12 +183,17 @@ def add_chat(self,
             # Chat is already in the List
             return
 
+        if last_messages is None:
+            last_messages = app.storage.archive.get_last_conversation_rows(
+                [key])
+
         row = ChatListRow(self._workspace_id,
                           account,
                           jid,
                           type_,
                           pinned,
-                          position)
+                          position,
+                          last_messages.get(key))
 
         self._chats[key] = row
         if pinned:
@@ -487,20 +493,8 @@ def _sort_func(self, row1: ChatListRow, row2: ChatListRow) -> int:
             log.debug('Sort inhibited')
             return 0
 
-        # Sort pinned rows according to stored order
-        if row1.is_pinned and row2.is_pinned:
-            if row1.position > row2.position:
-                return 1
-            return -1
-
-        # Sort pinned rows to top
-        if row1.is_pinned > row2.is_pinned:
-            return -1
-        if row2.is_pinned > row1.is_pinned:
-            return 1
-
-        # Sort by timestamp
-        return -1 if row1.timestamp > row2.timestamp else 1
+        # Pinned rows in stored order first, then by timestamp
+        return -1 if row1.sort_key < row2.sort_key else 1
 
     def invalidate_sort(self) -> None:
         if self._is_sort_inhibited():
@@ -65,7 +65,8 @@ def __init__(self,
                  jid: JID,
                  type_: str,
                  pinned: bool,
-                 position: int
+                 position: int,
+                 last_message: mod.Message | None
                  ) -> None:
 
         Gtk.ListBoxRow.__init__(self)
@@ -74,7 +75,14 @@ def __init__(self,
         self.jid = jid
         self.workspace_id = workspace_id
         self.type = type_
-        self.position = position
+
+        # Key used by ChatList for sorting, it is updated whenever
+        # the position, the timestamp or the pinned state changes
+        self.sort_key: tuple[bool, float]
+        self._pinned: bool = pinned
+        self._position = position
+        self._timestamp: float = 0
+        self._update_sort_key()
 
         self._conversations_header = RowHeader(RowHeaderType.CONVERSATIONS)
         self._pinned_header = RowHeader(RowHeaderType.PINNED)
@@ -88,13 +96,11 @@ def __init__(self,
         self._connect_contact_signals()
 
         self.contact_name: str = self.contact.name
-        self.timestamp: float = 0
         self.stanza_id: str | None = None
         self.message_id: str | None = None
 
         self._unread_count: int = 0
         self._needs_muc_highlight: bool = False
-        self._pinned: bool = pinned
 
         self.get_style_context().add_class('chatlist-row')
 
@@ -139,11 +145,14 @@ def __init__(self,
             self._ui.unread_label.get_style_context().add_class(
                 'unread-counter-silent')
 
-        self._display_last_conversation_row()
+        self._display_message(last_message)
 
     def _display_last_conversation_row(self) -> None:
         message = app.storage.archive.get_last_conversation_row(
             self.contact.account, self.contact.jid)
+        self._display_message(message)
+
+    def _display_message(self, message: mod.Message | None) -> None:
         if message is None:
             self.show_all()
             return
@@ -207,6 +216,31 @@ def _display_last_conversation_row(self) -> None:
     def is_pinned(self) -> bool:
         return self._pinned
 
+    @property
+    def position(self) -> int:
+        return self._position
+
+    @position.setter
+    def position(self, position: int) -> None:
+        self._position = position
+        self._update_sort_key()
+
+    @property
+    def timestamp(self) -> float:
+        return self._timestamp
+
+    @timestamp.setter
+    def timestamp(self, timestamp: float) -> None:
+        self._timestamp = timestamp
+        self._update_sort_key()
+
+    def _update_sort_key(self) -> None:
+        # Pinned rows first in stored order, then the most recent chats
+        if self._pinned:
+            self.sort_key = (False, self._position)
+        else:
+            self.sort_key = (True, -self._timestamp)
+
     @property
     def unread_count(self) -> int:
         if (isinstance(self.contact, GroupchatContact) and
@@ -328,7 +362,8 @@ def update_avatar(self) -> None:
         assert isinstance(
             self.contact,
             BareContact | GroupchatContact | GroupchatParticipant)
-        surface = self.contact.get_avatar(AvatarSize.ROSTER, scale)
+        surface = self.contact.get_avatar(
+            AvatarSize.ROSTER, scale, load_async=True)
         self._ui.avatar_image.set_from_surface(surface)
 
     def update_name(self) -> None:
@@ -395,6 +430,7 @@ def reset_unread(self) -> None:
 
     def toggle_pinned(self) -> None:
         self._pinned = not self._pinned
+        self._update_sort_key()
 
     def _update_unread(self) -> None:
         unread_count = self._get_unread_string(self._unread_count)
@@ -18,6 +18,7 @@
 from gajim.common.ged import EventHelper
 from gajim.common.i18n import _
 from gajim.common.modules.contacts import GroupchatContact
+from gajim.common.storage.archive.models import Message
 
 from gajim.gtk import structs
 from gajim.gtk.chat_filter import ChatFilter
@@ -185,13 +186,15 @@ def add_chat(self,
                  jid: JID,
                  type_: str,
                  pinned: bool,
-                 position: int
+                 position: int,
+                 last_messages: dict[tuple[str, JID], Message] | None = None
                  ) -> None:
 
         chat_list = self._chat_lists.get(workspace_id)
         if chat_list is None:
             chat_list = self.add_chat_list(workspace_id)
-        chat_list.add_chat(account, jid, type_, pinned, position)
+        chat_list.add_chat(
+            account, jid, type_, pinned, position, last_messages)
 
     def select_chat(self, account: str, jid: JID) -> None:
         chat_list = self.find_chat(account, jid)
@@ -18,6 +18,7 @@
 from nbxmpp import JID
 
 from gajim.common import app
+from gajim.common.storage.archive.models import Message
 
 from gajim.gtk.builder import get_builder
 from gajim.gtk.chat_filter import ChatFilter
@@ -249,7 +250,10 @@ def add_chat_for_workspace(self,
                                pinned: bool = False,
                                position: int = -1,
                                select: bool = False,
-                               message: str | None = None) -> None:
+                               message: str | None = None,
+                               last_messages: dict[tuple[str, JID],
+                                                   Message] | None = None
+                               ) -> None:
 
         client = app.get_client(account)
 
@@ -268,7 +272,7 @@ def add_chat_for_workspace(self,
             return
 
         self._chat_list_stack.add_chat(workspace_id, account, jid, type_,
-                                       pinned, position)
+                                       pinned, position, last_messages)
 
         if self._startup_finished:
             if select:
@@ -283,17 +287,23 @@ def load_workspace_chats(self, workspace_id: str) -> None:
                                                         'chats')
 
         active_accounts = app.settings.get_active_accounts()
-        for open_chat in open_chats:
-            account = open_chat['account']
-            if account not in active_accounts:
-                continue
+        open_chats = [open_chat for open_chat in open_chats
+                      if open_chat['account'] in active_accounts]
+
+        # Load the last message of all chats at once instead of
+        # querying the archive for every row
+        last_messages = app.storage.archive.get_last_conversation_rows(
+            [(open_chat['account'], open_chat['jid'])
+             for open_chat in open_chats])
 
+        for open_chat in open_chats:
             self.add_chat_for_workspace(workspace_id,
-                                        account,
+                                        open_chat['account'],
                                         open_chat['jid'],
                                         open_chat['type'],
                                         pinned=open_chat['pinned'],
-                                        position=open_chat['position'])
+                                        position=open_chat['position'],
+                                        last_messages=last_messages)
 
     def is_chat_selected(self, account: str, jid: JID) -> bool:
         return self._chat_list_stack.is_chat_selected(account, jid)
@@ -338,6 +348,7 @@ def _on_chat_removed(self,
 
         if self._chat_control.is_loaded(account, jid):
             self._chat_control.clear()
+        self._chat_control.remove_cached_views(account, jid)
 
         if type_ == 'groupchat' and app.account_is_connected(account):
             client = app.get_client(account)
@@ -352,6 +363,7 @@ def remove_chats_for_account(self, account: str) -> None:
         if self._chat_control.has_active_chat():
             if self._chat_control.contact.account == account:
                 self._chat_control.clear()
+        self._chat_control.remove_cached_views(account)
 
     def get_control(self) -> ChatControl:
         return self._chat_control
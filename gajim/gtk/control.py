@@ -10,6 +10,7 @@
 import datetime as dt
 import logging
 import time
+from collections import OrderedDict
 from collections.abc import Sequence
 
 from gi.repository import Gio
@@ -59,12 +60,14 @@ def __init__(self) -> None:
 
         self._ui = get_builder('chat_control.ui')
 
-        self._scrolled_view = ConversationView()
-        self._scrolled_view.connect('autoscroll-changed',
-                                    self._on_autoscroll_changed)
-        self._scrolled_view.connect('request-history', self._request_history)
+        self._scrolled_view = self._create_view()
         self._ui.conv_view_overlay.add(self._scrolled_view)
 
+        # Views of recently shown chats and the time they were hidden,
+        # the least recently shown chat comes first
+        self._cached_views: OrderedDict[
+            tuple[str, JID], tuple[ConversationView, float]] = OrderedDict()
+
         self._groupchat_state = GroupchatState()
         self._ui.conv_view_overlay.add_overlay(self._groupchat_state)
 
@@ -159,12 +162,33 @@ def clear(self) -> None:
         if self._contact is not None:
             self._contact.disconnect_all_from_obj(self)
 
+        if self._cache_view():
+            self._show_view(self._create_view())
+        else:
+            self._scrolled_view.clear()
+
         self._contact = None
         self._client = None
-        self._scrolled_view.clear()
         self._groupchat_state.clear()
         self._roster.clear()
-        self.unregister_events()
+
+        if not self._cached_views:
+            # Cached views are kept up to date by the event handlers
+            self.unregister_events()
+
+    def remove_cached_views(self, account: str, jid: JID | None = None) -> None:
+        '''
+        Remove cached views of a closed chat or of all chats of an account
+        '''
+        for key in list(self._cached_views):
+            if key[0] != account or jid not in (None, key[1]):
+                continue
+
+            view, _hidden_at = self._cached_views.pop(key)
+            self._destroy_view(view)
+
+        if self._contact is None and not self._cached_views:
+            self.unregister_events()
 
     def remove_message(self, pk: int) -> None:
         self._scrolled_view.remove_message(pk)
@@ -213,13 +237,21 @@ def switch_contact(
         if self._contact is not None:
             self._contact.disconnect_all_from_obj(self)
 
+        view_cached = self._cache_view()
+
         self._contact = contact
 
         self._client = app.get_client(contact.account)
 
         self._jump_to_end_button.switch_contact(contact)
-        self._scrolled_view.switch_contact(contact)
-        self._request_history(None, True)
+
+        restored = self._restore_view(contact)
+        if not restored:
+            if view_cached:
+                self._show_view(self._create_view())
+            self._scrolled_view.switch_contact(contact)
+            self._request_history(None, True)
+
         self._groupchat_state.switch_contact(contact)
         self._roster.switch_contact(contact)
 
@@ -253,6 +285,10 @@ def switch_contact(
 
         self._client.get_module('Chatstate').set_active(contact)
 
+        if restored:
+            # Rows of file transfers and the subject are part of the view
+            return
+
         transfers = self._client.get_module('HTTPUpload').get_running_transfers(
             contact)
         if transfers is not None:
@@ -269,6 +305,103 @@ def switch_contact(
                 self._scrolled_view.add_muc_subject(
                     muc_data.subject, muc_data.last_subject_timestamp)
 
+    def _create_view(self) -> ConversationView:
+        view = ConversationView()
+        view.connect('autoscroll-changed', self._on_autoscroll_changed)
+        view.connect('request-history', self._request_history)
+        return view
+
+    def _destroy_view(self, view: ConversationView) -> None:
+        if view is self._scrolled_view:
+            # The current view is destroyed when it is replaced
+            return
+
+        view.clear()
+        view.destroy()
+
+    def _show_view(self, view: ConversationView) -> None:
+        old_view = self._scrolled_view
+        if view is not old_view:
+            self._ui.conv_view_overlay.remove(old_view)
+            self._scrolled_view = view
+            self._ui.conv_view_overlay.add(view)
+            view.show()
+
+            if not any(cached_view is old_view
+                       for cached_view, _hidden_at
+                       in self._cached_views.values()):
+                self._destroy_view(old_view)
+
+        self._trim_view_cache()
+
+    def _cache_view(self) -> bool:
+        '''
+        Keep the view of the current chat, so it can be shown again
+        without loading the conversation. Returns False if the cache
+        is disabled.
+        '''
+        if self._contact is None:
+            return False
+
+        if app.settings.get('conversation_view_cache_size') <= 0:
+            return False
+
+        key = (self._contact.account, self._contact.jid)
+        self._cached_views[key] = (self._scrolled_view, time.time())
+        self._cached_views.move_to_end(key)
+        return True
+
+    def _trim_view_cache(self) -> None:
+        cache_size = app.settings.get('conversation_view_cache_size')
+        max_rows = app.settings.get('conversation_view_cache_rows')
+
+        row_count = sum(view.get_row_count()
+                        for view, _hidden_at in self._cached_views.values())
+
+        while self._cached_views and (len(self._cached_views) > cache_size or
+                                      row_count > max_rows):
+            _key, (view, _hidden_at) = self._cached_views.popitem(last=False)
+            row_count -= view.get_row_count()
+            self._destroy_view(view)
+
+    def _restore_view(self, contact: types.ChatContactT) -> bool:
+        '''
+        Show the cached view of the chat and add the events which were
+        stored in the meantime. Returns False if there is no cached view.
+        '''
+        cached = self._cached_views.pop((contact.account, contact.jid), None)
+        if cached is None:
+            return False
+
+        view, hidden_at = cached
+        if view.contact is not contact:
+            # The contact was replaced, e.g. after the account was disabled
+            self._destroy_view(view)
+            return False
+
+        new_events = app.storage.events.load(contact,
+                                             False,
+                                             hidden_at,
+                                             REQUEST_LINES_COUNT)
+        if len(new_events) >= REQUEST_LINES_COUNT:
+            # Too much happened while the chat was hidden
+            self._destroy_view(view)
+            return False
+
+        view.block_signals(True)
+        view.disable_row_selection()
+        self._show_view(view)
+
+        for event in new_events:
+            self._add_history_event(event)
+
+        if view.get_autoscroll():
+            view.scroll_to_end()
+        self._jump_to_end_button.toggle(not view.get_autoscroll())
+
+        GLib.idle_add(view.block_signals, False)
+        return True
+
     def _register_events(self) -> None:
         if self.has_events_registered():
             return
@@ -305,6 +438,33 @@ def _is_event_processable(self, event: Any) -> bool:
             return False
         return True
 
+    def _get_event_view(self, event: Any) -> ConversationView | None:
+        '''
+        Returns the view of the chat the event belongs to, which is either
+        the current view or a cached view
+        '''
+        if self._is_event_processable(event):
+            return self._scrolled_view
+
+        cached = self._cached_views.get((event.account, event.jid))
+        if cached is None:
+            return None
+        return cached[0]
+
+    def _add_event_message(
+        self,
+        event: events.MessageReceived | events.MessageSent
+    ) -> None:
+
+        view = self._get_event_view(event)
+        if view is None:
+            return
+
+        if view is self._scrolled_view:
+            self._add_message(event.message)
+        elif view.get_lower_complete():
+            view.add_message_from_db(event.message)
+
     def _on_presence_received(self, event: events.PresenceReceived) -> None:
         if not self._is_event_processable(event):
             return
@@ -321,80 +481,82 @@ def _on_presence_received(self, event: events.PresenceReceived) -> None:
                                             contact.status)
 
     def _on_message_sent(self, event: events.MessageSent) -> None:
-        if not self._is_event_processable(event):
-            return
-
-        self._add_message(event.message)
+        self._add_event_message(event)
 
     def _on_message_deleted(self, event: events.MessageDeleted) -> None:
-        if not self._is_event_processable(event):
+        view = self._get_event_view(event)
+        if view is None:
             return
 
-        self.remove_message(event.pk)
+        view.remove_message(event.pk)
 
     def _on_message_acknowledged(
         self,
         event: events.MessageAcknowledged
     ) -> None:
-        if not self._is_event_processable(event):
+        view = self._get_event_view(event)
+        if view is None:
             return
 
-        self._scrolled_view.acknowledge_message(event)
+        view.acknowledge_message(event)
 
     def _on_message_received(self, event: events.MessageReceived) -> None:
-        if not self._is_event_processable(event):
-            return
-
-        self._add_message(event.message)
+        self._add_event_message(event)
 
     def _on_message_corrected(self, event: events.MessageCorrected) -> None:
-        if not self._is_event_processable(event):
+        view = self._get_event_view(event)
+        if view is None:
             return
 
         if event.original_message is None:
             return
 
-        self._scrolled_view.correct_message(event.original_message)
+        view.correct_message(event.original_message)
 
     def _on_message_moderated(self, event: events.MessageModerated) -> None:
-        if not self._is_event_processable(event):
+        view = self._get_event_view(event)
+        if view is None:
             return
 
         text = get_retraction_text(
             event.moderation.by,
             event.moderation.reason)
-        self._scrolled_view.show_message_retraction(
-            event.moderation.stanza_id, text)
+        view.show_message_retraction(event.moderation.stanza_id, text)
 
     def _on_receipt_received(self, event: events.ReceiptReceived) -> None:
-        if not self._is_event_processable(event):
+        view = self._get_event_view(event)
+        if view is None:
             return
 
-        self._scrolled_view.set_receipt(event.receipt_id)
+        view.set_receipt(event.receipt_id)
 
     def _on_displayed_received(self, event: events.DisplayedReceived) -> None:
-        if not self._is_event_processable(event):
+        view = self._get_event_view(event)
+        if view is None:
             return
 
-        self._scrolled_view.set_read_marker(event.marker_id)
+        view.set_read_marker(event.marker_id)
 
     def _on_message_error(self, event: events.MessageError) -> None:
-        if not self._is_event_processable(event):
+        view = self._get_event_view(event)
+        if view is None:
             return
 
-        self._scrolled_view.show_error(event.message_id, event.error)
+        view.show_error(event.message_id, event.error)
 
     def _on_call_stopped(self, event: events.CallStopped) -> None:
-        if not self._is_event_processable(event):
+        view = self._get_event_view(event)
+        if view is None:
             return
 
-        self._scrolled_view.update_call_rows()
+        view.update_call_rows()
 
     def _on_jingle_request_received(self,
                                     event: events.JingleRequestReceived
                                     ) -> None:
 
-        if not self._is_event_processable(event):
+        view = self._get_event_view(event)
+        if view is None:
             return
 
         if not any(item in ('audio', 'video') for item in event.contents):
@@ -403,37 +565,51 @@ def _on_jingle_request_received(self,
 
         active_jid = app.call_manager.get_active_call_jid()
         # Don't add a second row if contact upgrades to video
-        if active_jid is None:
-            self._add_call_message(event=event)
+        if active_jid is None and view.get_lower_complete():
+            view.add_call_message(event=event)
 
     def _on_file_request_event(
         self,
         event: events.FileRequestReceivedEvent | events.FileRequestSent
     ) -> None:
 
-        if not self._is_event_processable(event):
+        view = self._get_event_view(event)
+        if view is None:
             return
 
-        self._add_jingle_file_transfer(event=event)
+        if view.get_lower_complete():
+            view.add_jingle_file_transfer(event)
 
     def _on_http_upload_started(self, event: events.HTTPUploadStarted) -> None:
-        self._add_file_transfer(event.transfer)
+        view = self._get_event_view(event)
+        if view is None:
+            return
+
+        view.add_file_transfer(event.transfer)
 
     def _on_http_upload_error(self, event: events.HTTPUploadError) -> None:
-        self.add_info_message(event.error_msg)
+        view = self._get_event_view(event)
+        if view is None:
+            return
+
+        view.add_info_message(event.error_msg)
 
     def _on_encryption_info(self, event: events.EncryptionInfo) -> None:
-        if not self._is_event_processable(event):
+        view = self._get_event_view(event)
+        if view is None:
             return
 
-        if self._allow_add_message():
-            self._scrolled_view.add_encryption_info(event)
+        if view.get_lower_complete():
+            view.add_encryption_info(event)
 
     def _on_autoscroll_changed(self,
-                               _widget: ConversationView,
+                               widget: ConversationView,
                                autoscroll: bool
                                ) -> None:
 
+        if widget is not self._scrolled_view:
+            return
+
         if not autoscroll:
             self._jump_to_end_button.toggle(True)
             return
@@ -487,17 +663,6 @@ def _allow_add_message(self) -> bool:
     def _add_file_transfer(self, transfer: HTTPFileTransfer) -> None:
         self._scrolled_view.add_file_transfer(transfer)
 
-    def _add_jingle_file_transfer(
-        self,
-        event: events.FileRequestReceivedEvent | events.FileRequestSent | None
-    ) -> None:
-        if self._allow_add_message():
-            self._scrolled_view.add_jingle_file_transfer(event)
-
-    def _add_call_message(self, event: events.JingleRequestReceived) -> None:
-        if self._allow_add_message():
-            self._scrolled_view.add_call_message(event=event)
-
     def _add_message(self, message: Message) -> None:
         # TODO: Unify with _add_db_row()
         if self._allow_add_message():
@@ -563,10 +728,13 @@ def _request_events(self, before: bool) -> list[events.ApplicationEvent]:
                                        REQUEST_LINES_COUNT)
 
     def _request_history(self,
-                         _widget: Any,
+                         widget: ConversationView | None,
                          before: bool
                          ) -> None:
 
+        if widget is not None and widget is not self._scrolled_view:
+            return
+
         self._scrolled_view.block_signals(True)
 
         messages = self._request_messages(before)
@@ -577,50 +745,53 @@ def _request_history(self,
         for row in rows:
             if not isinstance(row, events.ApplicationEvent):
                 self._add_messages([row])
+            else:
+                self._add_history_event(row)
 
-            elif isinstance(row, events.MUCUserJoined):
-                self._process_muc_user_joined(row)
+        if len(rows) < REQUEST_LINES_COUNT:
+            self._scrolled_view.set_history_complete(before, True)
 
-            elif isinstance(row, events.MUCUserLeft):
-                self._process_muc_user_left(row)
+        self._scrolled_view.block_signals(False)
 
-            elif isinstance(row, events.MUCNicknameChanged):
-                self._process_muc_nickname_changed(row)
+    def _add_history_event(self, event: events.ApplicationEvent) -> None:
+        if isinstance(event, events.MUCUserJoined):
+            self._process_muc_user_joined(event)
 
-            elif isinstance(row, events.MUCRoomKicked):
-                self._process_muc_room_kicked(row)
+        elif isinstance(event, events.MUCUserLeft):
+            self._process_muc_user_left(event)
 
-            elif isinstance(row, events.MUCUserAffiliationChanged):
-                self._process_muc_user_affiliation_changed(row)
+        elif isinstance(event, events.MUCNicknameChanged):
+            self._process_muc_nickname_changed(event)
 
-            elif isinstance(row, events.MUCAffiliationChanged):
-                self._process_room_affiliation_changed(row)
+        elif isinstance(event, events.MUCRoomKicked):
+            self._process_muc_room_kicked(event)
 
-            elif isinstance(row, events.MUCUserRoleChanged):
-                self._process_muc_user_role_changed(row)
+        elif isinstance(event, events.MUCUserAffiliationChanged):
+            self._process_muc_user_affiliation_changed(event)
 
-            elif isinstance(row, events.MUCUserStatusShowChanged):
-                self._process_muc_user_status_show_changed(row)
+        elif isinstance(event, events.MUCAffiliationChanged):
+            self._process_room_affiliation_changed(event)
 
-            elif isinstance(row, events.MUCRoomConfigChanged):
-                self._process_muc_room_config_changed(row)
+        elif isinstance(event, events.MUCUserRoleChanged):
+            self._process_muc_user_role_changed(event)
 
-            elif isinstance(row, events.MUCRoomConfigFinished):
-                self._process_muc_room_config_finished(row)
+        elif isinstance(event, events.MUCUserStatusShowChanged):
+            self._process_muc_user_status_show_changed(event)
 
-            elif isinstance(row, events.MUCRoomPresenceError):
-                self._process_muc_room_presence_error(row)
+        elif isinstance(event, events.MUCRoomConfigChanged):
+            self._process_muc_room_config_changed(event)
 
-            elif isinstance(row, events.MUCRoomDestroyed):
-                self._process_muc_room_destroyed(row)
+        elif isinstance(event, events.MUCRoomConfigFinished):
+            self._process_muc_room_config_finished(event)
 
-            else:
-                raise ValueError('Unknown event: %s' % type(row))
+        elif isinstance(event, events.MUCRoomPresenceError):
+            self._process_muc_room_presence_error(event)
 
-        if len(rows) < REQUEST_LINES_COUNT:
-            self._scrolled_view.set_history_complete(before, True)
+        elif isinstance(event, events.MUCRoomDestroyed):
+            self._process_muc_room_destroyed(event)
 
-        self._scrolled_view.block_signals(False)
+        else:
+            raise ValueError('Unknown event: %s' % type(event))
 
     @staticmethod
     def _sort_request_rows(messages: Sequence[Message],
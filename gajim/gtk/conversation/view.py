@@ -9,9 +9,13 @@
 from typing import Literal
 
 import logging
+from bisect import bisect_left
+from bisect import bisect_right
+from collections import defaultdict
 from collections.abc import Generator
 from datetime import datetime
 from datetime import timedelta
+from operator import attrgetter
 
 from gi.repository import Gdk
 from gi.repository import Gio
@@ -53,6 +57,8 @@
 
 log = logging.getLogger('gajim.gtk.conversation_view')
 
+_get_timestamp = attrgetter('timestamp')
+
 
 class ConversationView(Gtk.ScrolledWindow):
 
@@ -95,7 +101,9 @@ def __init__(self) -> None:
 
         self._list_box = Gtk.ListBox()
 
-        # Keeps track of the number of rows shown in ConversationView
+        # Keeps track of the number of rows shown in ConversationView.
+        # Each row is a widget, widgets are not virtualized or recycled,
+        # reduce_message_count() keeps their number bounded instead.
         self._row_count: int = 0
         self._max_row_count: int = 100
 
@@ -105,6 +113,20 @@ def __init__(self) -> None:
         # message_id -> row mapping
         self._message_id_row_map: dict[str, MessageRow] = {}
 
+        # All rows of the list box ordered by timestamp. The position of
+        # a new row is found with a binary search, instead of letting a
+        # sorted Gtk.ListBox compare it to the other rows. Neighbour
+        # lookups use this list instead of the list box.
+        self._rows: list[BaseRow] = []
+        # Index of each row in _rows when it was last looked up
+        self._row_indexes: dict[BaseRow, int] = {}
+
+        # Indexes for fast row lookups, rows remove themselves
+        # from all indexes when they are destroyed
+        self._pk_row_map: dict[int, MessageRow] = {}
+        self._stanza_id_row_map: dict[str, MessageRow] = {}
+        self._type_rows_map: defaultdict[str, set[BaseRow]] = defaultdict(set)
+
         self._read_marker_row = None
         self._scroll_hint_row = None
 
@@ -122,10 +144,18 @@ def __init__(self) -> None:
         self.add(self._list_box)
         self.set_focus_vadjustment(Gtk.Adjustment())
 
-        app.window.get_action('scroll-view-up').connect(
-            'activate', self._on_scroll_view)
-        app.window.get_action('scroll-view-down').connect(
-            'activate', self._on_scroll_view)
+        self._scroll_action_handlers: list[tuple[Gio.SimpleAction, int]] = []
+        for action_name in ('scroll-view-up', 'scroll-view-down'):
+            action = app.window.get_action(action_name)
+            handler_id = action.connect('activate', self._on_scroll_view)
+            self._scroll_action_handlers.append((action, handler_id))
+
+        self.connect('destroy', self._on_destroy)
+
+    def _on_destroy(self, _widget: ConversationView) -> None:
+        for action, handler_id in self._scroll_action_handlers:
+            action.disconnect(handler_id)
+        self._scroll_action_handlers.clear()
 
     def copy_selected_messages(self) -> None:
         format_string = app.settings.get('date_time_format')
@@ -165,6 +195,10 @@ def _on_scroll_view(self,
                         action: Gio.SimpleAction,
                         _param: Literal[None]) -> None:
 
+        if self.get_parent() is None:
+            # Views of cached chats are not shown
+            return
+
         action_name = action.get_name()
         if action_name == 'scroll-view-down':
             self.emit('scroll-child', Gtk.ScrollType.PAGE_DOWN, False)
@@ -210,10 +244,10 @@ def switch_contact(self, contact: ChatContactT) -> None:
         self.disable_row_selection()
 
         self._read_marker_row = ReadMarkerRow(self._contact)
-        self._list_box.add(self._read_marker_row)
+        self._add_row(self._read_marker_row)
 
         self._scroll_hint_row = ScrollHintRow(self._contact.account)
-        self._list_box.add(self._scroll_hint_row)
+        self._add_row(self._scroll_hint_row)
 
         app.settings.disconnect_signals(self)
 
@@ -245,7 +279,6 @@ def _reset_list_box(self) -> None:
         self._list_box.destroy()
         self._list_box = Gtk.ListBox()
         self._list_box.set_selection_mode(Gtk.SelectionMode.NONE)
-        self._list_box.set_sort_func(self._sort_func)
         self._list_box.show()
 
         current_child = self.get_child()
@@ -267,6 +300,11 @@ def _reset(self) -> None:
         self._row_count = 0
         self._active_date_rows = set()
         self._message_id_row_map = {}
+        self._rows = []
+        self._row_indexes = {}
+        self._pk_row_map = {}
+        self._stanza_id_row_map = {}
+        self._type_rows_map = defaultdict(set)
         self._read_marker_row = None
         self._scroll_hint_row = None
 
@@ -286,6 +324,9 @@ def set_history_complete(self, before: bool, complete: bool) -> None:
     def get_lower_complete(self) -> bool:
         return self._lower_complete
 
+    def get_row_count(self) -> int:
+        return len(self._rows)
+
     def _on_adj_upper_changed(self,
                               adj: Gtk.Adjustment,
                               _pspec: GObject.ParamSpec) -> None:
@@ -367,14 +408,37 @@ def contact(self) -> types.ChatContactT:
         assert self._contact is not None
         return self._contact
 
-    def _get_row_at_index(self, index: int) -> BaseRow:
-        row = self._list_box.get_row_at_index(index)
-        assert row is not None
-        return cast(BaseRow, row)
+    def _get_row_at_index(self, index: int) -> BaseRow | None:
+        if not 0 <= index < len(self._rows):
+            return None
+        return self._rows[index]
+
+    def _get_index(self, row: BaseRow) -> int:
+        # The index of the last lookup is still valid as long as no row
+        # was inserted or removed before the row
+        index = self._row_indexes.get(row)
+        if (index is not None and index < len(self._rows) and
+                self._rows[index] is row):
+            return index
+
+        # Rows with equal timestamps are next to each other, so only
+        # this range has to be searched for the row itself
+        index = bisect_left(self._rows, row.timestamp, key=_get_timestamp)
+        while (index < len(self._rows) and
+               self._rows[index].timestamp == row.timestamp):
+            if self._rows[index] is row:
+                self._row_indexes[row] = index
+                return index
+            index += 1
+
+        # The timestamp of the row changed after it was inserted
+        index = self._rows.index(row)
+        self._row_indexes[row] = index
+        return index
 
     def get_first_row(self
     ) -> MessageRow | CallRow | FileTransferJingleRow | None:
-        for row in self._list_box.get_children():
+        for row in self._rows:
             if isinstance(row, MessageRow | CallRow | FileTransferJingleRow):
                 return row
         return None
@@ -382,15 +446,14 @@ def get_first_row(self
     def get_last_row(
         self
     ) -> MessageRow | CallRow | FileTransferJingleRow | None:
-        children = reversed(self._list_box.get_children())
-        for row in children:
+        for row in reversed(self._rows):
             if isinstance(row, MessageRow | CallRow | FileTransferJingleRow):
                 return row
         return None
 
     def get_first_message_row(self
     ) -> MessageRow | None:
-        for row in self._list_box.get_children():
+        for row in self._rows:
             if isinstance(row, MessageRow):
                 return row
         return None
@@ -398,32 +461,23 @@ def get_first_message_row(self
     def get_last_message_row(
         self
     ) -> MessageRow | None:
-        children = reversed(self._list_box.get_children())
-        for row in children:
+        for row in reversed(self._rows):
             if isinstance(row, MessageRow):
                 return row
         return None
 
     def get_first_event_row(self) -> InfoMessage | MUCJoinLeft | None:
-        for row in self._list_box.get_children():
+        for row in self._rows:
             if isinstance(row, InfoMessage | MUCJoinLeft):
                 return row
         return None
 
     def get_last_event_row(self) -> InfoMessage | MUCJoinLeft | None:
-        children = self._list_box.get_children()
-        children.reverse()
-        for row in children:
+        for row in reversed(self._rows):
             if isinstance(row, InfoMessage | MUCJoinLeft):
                 return row
         return None
 
-    @staticmethod
-    def _sort_func(row1: BaseRow, row2: BaseRow) -> int:
-        if row1.timestamp == row2.timestamp:
-            return 0
-        return -1 if row1.timestamp < row2.timestamp else 1
-
     def add_muc_subject(self,
                         subject: MucSubject,
                         timestamp: float | None = None
@@ -538,8 +592,61 @@ def add_message_from_db(self, message: Message) -> None:
 
         self._insert_message(message_row)
 
+    def _add_row(self, row: BaseRow) -> None:
+        self._insert_row(row)
+        self._type_rows_map[row.type].add(row)
+        if isinstance(row, MessageRow):
+            self._index_pks(row)
+            self._index_stanza_id(row)
+
+        row.connect('destroy', self._on_row_destroyed)
+
+    def _insert_row(self, row: BaseRow) -> None:
+        # O(log n) comparisons to find the position, insert after all
+        # rows with the same timestamp like a sorted Gtk.ListBox does
+        index = bisect_right(self._rows, row.timestamp, key=_get_timestamp)
+        self._rows.insert(index, row)
+        self._row_indexes[row] = index
+        self._list_box.insert(row, index)
+
+    def _on_row_destroyed(self, row: BaseRow) -> None:
+        del self._rows[self._get_index(row)]
+        del self._row_indexes[row]
+        self._type_rows_map[row.type].discard(row)
+        if not isinstance(row, MessageRow):
+            return
+
+        self._unindex_pks(row)
+        self._unindex_stanza_id(row)
+
+        for message_id in (row.message_id, row.last_message_id):
+            if message_id is None:
+                continue
+            if self._message_id_row_map.get(message_id) is row:
+                del self._message_id_row_map[message_id]
+
+    def _index_pks(self, row: MessageRow) -> None:
+        for pk in (row.pk, row.orig_pk):
+            if pk is not None:
+                self._pk_row_map[pk] = row
+
+    def _unindex_pks(self, row: MessageRow) -> None:
+        for pk in (row.pk, row.orig_pk):
+            if pk is not None and self._pk_row_map.get(pk) is row:
+                del self._pk_row_map[pk]
+
+    def _index_stanza_id(self, row: MessageRow) -> None:
+        if row.stanza_id is not None:
+            self._stanza_id_row_map[row.stanza_id] = row
+
+    def _unindex_stanza_id(self, row: MessageRow) -> None:
+        if row.stanza_id is None:
+            return
+        if self._stanza_id_row_map.get(row.stanza_id) is row:
+            del self._stanza_id_row_map[row.stanza_id]
+
     def _insert_message(self, message: BaseRow) -> None:
-        self._list_box.add(message)
+        self._add_row(message)
         self._add_date_row(message.timestamp)
         self._check_for_merge(message)
         assert self._read_marker_row is not None
@@ -555,9 +662,9 @@ def _add_date_row(self, timestamp: datetime) -> None:
 
         date_row = DateRow(self.contact.account, start_of_day)
         self._active_date_rows.add(start_of_day)
-        self._list_box.add(date_row)
+        self._add_row(date_row)
 
-        row = self._list_box.get_row_at_index(date_row.get_index() + 1)
+        row = self._get_row_at_index(self._get_index(date_row) + 1)
         if row is None:
             return
 
@@ -580,12 +687,10 @@ def _check_for_merge(self, message: BaseRow) -> None:
             message.set_merged(message.is_mergeable(ancestor))
 
     def _find_ancestor(self, message: MessageRow) -> MessageRow | None:
-        index = message.get_index()
+        index = self._get_index(message)
         while index != 0:
             index -= 1
-            row = self._list_box.get_row_at_index(index)
-            if row is None:
-                return None
+            row = self._rows[index]
 
             if isinstance(row, ReadMarkerRow):
                 continue
@@ -601,10 +706,10 @@ def _find_ancestor(self, message: MessageRow) -> MessageRow | None:
         return None
 
     def _update_descendants(self, message: MessageRow) -> None:
-        index = message.get_index()
+        index = self._get_index(message)
         while True:
             index += 1
-            row = self._list_box.get_row_at_index(index)
+            row = self._get_row_at_index(index)
             if row is None:
                 return
 
@@ -620,7 +725,7 @@ def _update_descendants(self, message: MessageRow) -> None:
 
     def reduce_message_count(self, before: bool) -> bool:
         success = False
-        row_count = len(self._list_box.get_children())
+        row_count = len(self._rows)
         while row_count > self._max_row_count:
             if before:
                 if self._reduce_messages_before():
@@ -637,8 +742,8 @@ def _reduce_messages_before(self) -> bool:
         success = False
 
         # We want to keep relevant DateRows when removing rows
-        row1 = self._get_row_at_index(2)
-        row2 = self._get_row_at_index(3)
+        row1 = self._rows[2]
+        row2 = self._rows[3]
 
         if row1.type == 'date' and row2.type == 'date':
             # First two rows are date rows,
@@ -660,17 +765,16 @@ def _reduce_messages_before(self) -> bool:
         return success
 
     def _reduce_messages_after(self) -> None:
-        row = self._get_row_at_index(len(self._list_box.get_children()) - 1)
-        row.destroy()
+        self._rows[-1].destroy()
 
     def remove_message(self, pk: int) -> None:
         row = self.get_row_by_pk(pk)
         if row is None:
             return
 
-        index = row.get_index()
+        index = self._get_index(row)
         row.destroy()
-        decendant_row = self._list_box.get_row_at_index(index)
+        decendant_row = self._get_row_at_index(index)
         if isinstance(decendant_row, MessageRow):
             # Unset possible merged state if we delete a 'top level' message.
             # Checks for same sender etc. are not necessary, since we simply
@@ -682,12 +786,14 @@ def acknowledge_message(self, event: events.MessageAcknowledged) -> None:
         if row is None:
             return
 
+        self._unindex_stanza_id(row)
         row.set_acknowledged(event.stanza_id)
+        self._index_stanza_id(row)
         self._check_for_merge(row)
 
     def scroll_to_message_and_highlight(self, pk: int) -> None:
         highlight_row = None
-        for row in cast(list[BaseRow], self._list_box.get_children()):
+        for row in self._rows:
             if row.pk == pk:
                 highlight_row = row
                 break
@@ -726,14 +832,14 @@ def _get_message_row_by_direction(
         if direction is None:
             return row
 
-        index = row.get_index()
+        index = self._get_index(row)
         while True:
             if direction == Direction.PREV:
                 index -= 1
             else:
                 index += 1
 
-            row = self._list_box.get_row_at_index(index)
+            row = self._get_row_at_index(index)
             if row is None:
                 return None
 
@@ -759,34 +865,22 @@ def get_next_message_row(
             pk, direction=Direction.NEXT)
 
     def get_row_by_pk(self, pk: int) -> MessageRow | None:
-        for row in cast(list[BaseRow], self._list_box.get_children()):
-            if not isinstance(row, MessageRow):
-                continue
-            if pk in {row.pk, row.orig_pk}:
-                return row
-
-        return None
+        return self._pk_row_map.get(pk)
 
     def get_row_by_stanza_id(self, stanza_id: str) -> MessageRow | None:
-        for row in cast(list[BaseRow], self._list_box.get_children()):
-            if not isinstance(row, MessageRow):
-                continue
-            if row.stanza_id == stanza_id:
-                return row
-        return None
+        return self._stanza_id_row_map.get(stanza_id)
 
     def iter_rows(self) -> Generator[BaseRow, None, None]:
-        yield from cast(list[BaseRow], self._list_box.get_children())
+        yield from list(self._rows)
 
     def remove_rows_by_type(self, row_type: str) -> None:
-        for row in self.iter_rows():
-            if row.type == row_type:
-                row.destroy()
+        for row in list(self._type_rows_map.get(row_type, ())):
+            row.destroy()
 
     def update_call_rows(self) -> None:
-        for row in cast(list[BaseRow], self._list_box.get_children()):
-            if isinstance(row, CallRow):
-                row.update()
+        for row in self._type_rows_map.get('call', ()):
+            assert isinstance(row, CallRow)
+            row.update()
 
     def set_read_marker(self, id_: str) -> None:
         row = self._get_row_by_message_id(id_)
@@ -798,10 +892,22 @@ def set_read_marker(self, id_: str) -> None:
         if self._read_marker_row.timestamp > timestamp:
             return
 
-        self._read_marker_row.set_timestamp(timestamp)
+        self._set_read_marker_timestamp(timestamp)
+
+    def _set_read_marker_timestamp(self,
+                                   timestamp: datetime,
+                                   force: bool = False
+                                   ) -> None:
+
+        # The row has to be moved to its new position
+        assert self._read_marker_row is not None
+        del self._rows[self._get_index(self._read_marker_row)]
+        self._list_box.remove(self._read_marker_row)
+        self._read_marker_row.set_timestamp(timestamp, force=force)
+        self._insert_row(self._read_marker_row)
 
     def update_avatars(self) -> None:
-        for row in cast(list[BaseRow], self._list_box.get_children()):
+        for row in self._rows:
             if isinstance(row, MessageRow):
                 row.update_avatar()
 
@@ -815,14 +921,17 @@ def correct_message(self, original_message: Message) -> None:
         if corr_message_id is not None:
             self._message_id_row_map[corr_message_id] = message_row
 
+        # The row pk changes to the pk of the last correction
+        self._unindex_pks(message_row)
         message_row.refresh_original_message(original_message)
+        self._index_pks(message_row)
 
         assert self._read_marker_row is not None
         timestamp = message_row.timestamp + timedelta(microseconds=1)
         if self._read_marker_row.timestamp == timestamp:
             # This exact message has been marked as read
             # -> set read marker to before this message
-            self._read_marker_row.set_timestamp(
+            self._set_read_marker_timestamp(
                 message_row.timestamp - timedelta(microseconds=1), force=True)
 
     def show_message_retraction(self, stanza_id: str, text: str) -> None:
@@ -438,7 +438,8 @@ def send_file(self,
             filetransfers=[ft_data],
         )
 
-        app.storage.archive.insert_object(message_data)
+        app.storage.archive.submit(app.storage.archive.insert_object,
+                                   message_data)
 
         client = app.get_client(account)
         client.get_module('Jingle').start_file_transfer(
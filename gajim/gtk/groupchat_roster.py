@@ -5,11 +5,12 @@
 from __future__ import annotations
 
 from typing import Any
+from typing import Literal
 
-import locale
 import logging
 from enum import IntEnum
 
+import cairo
 from gi.repository import Gdk
 from gi.repository import GLib
 from gi.repository import Gtk
@@ -22,11 +23,13 @@
 from gajim.common.const import StyleAttr
 from gajim.common.events import ApplicationEvent
 from gajim.common.events import MUCNicknameChanged
+from gajim.common.helpers import get_participant_sort_key
 from gajim.common.helpers import get_uf_affiliation
 from gajim.common.helpers import get_uf_role
 from gajim.common.helpers import jid_is_blocked
 from gajim.common.i18n import p_
 from gajim.common.modules.contacts import GroupchatContact
+from gajim.common.types import ParticipantSortKeyT
 
 from gajim.gtk.builder import get_builder
 from gajim.gtk.menus import get_groupchat_participant_menu
@@ -53,6 +56,15 @@ class Column(IntEnum):
     NICK_OR_GROUP = 3
 
 
+# Delay in ms after which queued participant changes are applied
+UPDATE_BATCH_DELAY = 100
+
+# Batches larger than this are applied with the model detached from
+# the view and sorting disabled
+BULK_UPDATE_THRESHOLD = 50
+
+PendingUpdateT = tuple[Literal['add', 'remove'], 'types.GroupchatParticipant']
+
 CONTACT_SIGNALS = {
     'user-affiliation-changed',
     'user-avatar-update',
@@ -79,6 +91,19 @@ def __init__(self) -> None:
         self._contact_refs: dict[str, Gtk.TreeRowReference] = {}
         self._group_refs: dict[str, Gtk.TreeRowReference] = {}
 
+        # Collation keys of all participants in the store, nick -> key
+        self._sort_keys: dict[str, ParticipantSortKeyT] = {}
+
+        # Joins and leaves arrive in bursts, they are queued and
+        # applied together
+        self._pending_updates: list[PendingUpdateT] = []
+        self._pending_updates_id: int | None = None
+
+        # Avatars of rows added in bulk are rendered when the row is drawn
+        # and stored in the model afterwards, nick -> surface
+        self._pending_avatars: dict[str, cairo.ImageSurface] = {}
+        self._pending_avatars_id: int | None = None
+
         self._store = self._ui.participant_store
         self._store.set_sort_func(Column.TEXT, self._tree_compare_iters)
 
@@ -93,6 +118,8 @@ def __init__(self) -> None:
             app.settings.get('groupchat_roster_width'))
         self._ui.contact_column.set_cell_data_func(self._ui.text_renderer,
                                                    self._text_cell_data_func)
+        self._ui.contact_column.set_cell_data_func(self._ui.avatar_renderer,
+                                                   self._avatar_cell_data_func)
 
         self._ui.connect_signals(self)
 
@@ -248,9 +275,95 @@ def _on_user_joined(self,
                         user_contact: types.GroupchatParticipant,
                         *args: Any
                         ) -> None:
-        self._add_contact(user_contact)
+        self._queue_update('add', user_contact)
+
+    def _queue_update(self,
+                      action: Literal['add', 'remove'],
+                      contact: types.GroupchatParticipant
+                      ) -> None:
+
+        self._pending_updates.append((action, contact))
+        if self._pending_updates_id is None:
+            self._pending_updates_id = GLib.timeout_add(
+                UPDATE_BATCH_DELAY, self._apply_pending_updates)
+
+    def _cancel_pending_updates(self) -> None:
+        if self._pending_updates_id is not None:
+            GLib.source_remove(self._pending_updates_id)
+            self._pending_updates_id = None
+        self._pending_updates.clear()
+
+    def _flush_pending_updates(self) -> None:
+        if self._pending_updates_id is not None:
+            GLib.source_remove(self._pending_updates_id)
+            self._apply_pending_updates()
+
+    def _apply_pending_updates(self) -> bool:
+        self._pending_updates_id = None
+        updates = self._pending_updates
+        self._pending_updates = []
+
+        log.debug('Apply %s queued participant updates', len(updates))
+        groups = set(self._group_refs)
+        expanded_groups = self._get_expanded_groups()
+        vadjustment = self._roster.get_vadjustment()
+        scroll_position = vadjustment.get_value()
+
+        bulk = len(updates) > BULK_UPDATE_THRESHOLD
+        if bulk:
+            self._roster.set_model(None)
+            self._enable_sort(False)
+
+        for action, contact in updates:
+            if action == 'remove':
+                self._remove_contact(contact)
+            else:
+                self._add_contact(contact, bulk=True)
+
+        self._draw_groups()
+
+        if bulk:
+            self._enable_sort(True)
+            self._roster.set_model(self._modelfilter)
+            # Detaching the model collapsed all rows and reset the scroll
+            # position, restore them once the rows are allocated
+            self._expand_groups(expanded_groups)
+            GLib.idle_add(vadjustment.set_value, scroll_position)
+
+        # Only expand new groups, the user may have collapsed others
+        self._expand_groups(set(self._group_refs) - groups)
+        return False
+
+    def _get_expanded_groups(self) -> set[str]:
+        model = self._roster.get_model()
+        if model is None:
+            return set()
+
+        expanded: set[str] = set()
+        self._roster.map_expanded_rows(
+            lambda _treeview, path: expanded.add(
+                model[path][Column.NICK_OR_GROUP]))
+        return expanded
+
+    def _expand_groups(self, groups: set[str]) -> None:
+        if self._roster.get_model() is None:
+            return
 
-    def _add_contact(self, contact: types.GroupchatParticipant) -> None:
+        for group in groups:
+            group_iter = self._get_group_iter(group)
+            if group_iter is None:
+                continue
+            # Groups are never filtered, so paths are the same in the store
+            self._roster.expand_row(self._store.get_path(group_iter), False)
+
+    def _add_contact(self,
+                     contact: types.GroupchatParticipant,
+                     bulk: bool = False
+                     ) -> None:
+        '''
+        In bulk mode the avatar is rendered once the row becomes visible
+        and groups have to be drawn by the caller
+        '''
         group_name, group_text = self._get_group_from_contact(contact)
         nick = contact.name
 
@@ -265,16 +378,23 @@ def _add_contact(self, contact: types.GroupchatParticipant) -> None:
             self._group_refs[group_name] = group_ref
 
         # Avatar
-        surface = contact.get_avatar(AvatarSize.ROSTER,
-                                     self.get_scale_factor())
+        surface = None
+        if not bulk:
+            surface = contact.get_avatar(AvatarSize.ROSTER,
+                                         self.get_scale_factor(),
+                                         load_async=True)
 
+        self._update_sort_key(contact)
         iter_ = self._store.append(group_iter,
                                    [surface, nick, True, nick])
         self._contact_refs[nick] = Gtk.TreeRowReference(
             self._store, self._store.get_path(iter_))
 
+        self._draw_contact(nick, draw_avatar=not bulk)
+        if bulk:
+            return
+
         self._draw_groups()
-        self._draw_contact(nick)
 
         if (role_path is not None and
                 self._roster.get_model() is not None):
@@ -287,8 +407,7 @@ def _on_user_left(self,
                       *args: Any
                       ) -> None:
 
-        self._remove_contact(user_contact)
-        self._draw_groups()
+        self._queue_update('remove', user_contact)
 
     def _update_contact(self,
                         _contact: types.GroupchatContact,
@@ -297,6 +416,7 @@ def _update_contact(self,
                         *args: Any
                         ) -> None:
 
+        self._flush_pending_updates()
         self._remove_contact(user_contact)
         self._add_contact(user_contact)
 
@@ -308,6 +428,7 @@ def _on_user_nickname_changed(self,
                                   new_contact: types.GroupchatParticipant
                                   ) -> None:
 
+        self._flush_pending_updates()
         self._remove_contact(old_contact)
         self._add_contact(new_contact)
 
@@ -318,6 +439,9 @@ def _on_user_status_show_changed(self,
                                      *args: Any
                                      ) -> None:
 
+        # The store resorts the row when its text is set by _draw_contact()
+        if user_contact.name in self._sort_keys:
+            self._update_sort_key(user_contact)
         self._draw_contact(user_contact.name)
 
     def _remove_contact(self, contact: types.GroupchatParticipant) -> None:
@@ -332,6 +456,7 @@ def _remove_contact(self, contact: types.GroupchatParticipant) -> None:
 
         self._store.remove(iter_)
         del self._contact_refs[nick]
+        self._sort_keys.pop(nick, None)
         if not self._store.iter_has_child(group_iter):
             group = self._store[group_iter][Column.NICK_OR_GROUP]
             del self._group_refs[group]
@@ -371,6 +496,56 @@ def _text_cell_data_func(_column: Gtk.TreeViewColumn,
             renderer.set_property('weight', 600)
             renderer.set_property('ypad', 6)
 
+    def _avatar_cell_data_func(self,
+                               _column: Gtk.TreeViewColumn,
+                               renderer: Gtk.CellRenderer,
+                               model: Gtk.TreeModel,
+                               iter_: Gtk.TreeIter,
+                               _user_data: object | None
+                               ) -> None:
+
+        if not model[iter_][Column.IS_CONTACT]:
+            return
+
+        if model[iter_][Column.AVATAR] is not None:
+            return
+
+        # Rows added in bulk get their avatar once they are drawn. The
+        # model must not be changed while drawing, so the avatar is
+        # stored in the model afterwards.
+        nick = model[iter_][Column.NICK_OR_GROUP]
+        surface = self._pending_avatars.get(nick)
+        if surface is None:
+            assert self._contact is not None
+            contact = self._contact.get_resource(nick)
+            surface = contact.get_avatar(AvatarSize.ROSTER,
+                                         self.get_scale_factor(),
+                                         load_async=True)
+            self._pending_avatars[nick] = surface
+            if self._pending_avatars_id is None:
+                self._pending_avatars_id = GLib.idle_add(
+                    self._store_pending_avatars)
+
+        renderer.set_property('surface', surface)
+
+    def _store_pending_avatars(self) -> bool:
+        self._pending_avatars_id = None
+        pending_avatars = self._pending_avatars
+        self._pending_avatars = {}
+
+        for nick, surface in pending_avatars.items():
+            iter_ = self._get_contact_iter(nick)
+            if iter_ is None or self._store[iter_][Column.AVATAR] is not None:
+                continue
+            self._store[iter_][Column.AVATAR] = surface
+        return False
+
+    def _cancel_pending_avatars(self) -> None:
+        if self._pending_avatars_id is not None:
+            GLib.source_remove(self._pending_avatars_id)
+            self._pending_avatars_id = None
+        self._pending_avatars.clear()
+
     def _on_roster_row_activated(self,
                                  _treeview: Gtk.TreeView,
                                  path: Gtk.TreePath,
@@ -477,28 +652,12 @@ def _tree_compare_iters(self,
         '''
         Compare two iterators to sort them
         '''
-        is_contact = model.iter_parent(iter1)
-        if is_contact:
-
-            nick1 = model[iter1][Column.NICK_OR_GROUP]
-            nick2 = model[iter2][Column.NICK_OR_GROUP]
-
-            assert self._contact is not None
-            our_nick = self._contact.nickname
-            if our_nick in (nick1, nick2):
-                # Always show our nickname at the top
-                return -1 if our_nick == nick1 else 1
-
-            if not app.settings.get('sort_by_show_in_muc'):
-                return locale.strcoll(nick1.lower(), nick2.lower())
-
-            contact1 = self._contact.get_resource(nick1)
-            contact2 = self._contact.get_resource(nick2)
-
-            if contact1.show != contact2.show:
-                return -1 if contact1.show > contact2.show else 1
-
-            return locale.strcoll(nick1.lower(), nick2.lower())
+        if model[iter1][Column.IS_CONTACT]:
+            key1 = self._sort_keys[model[iter1][Column.NICK_OR_GROUP]]
+            key2 = self._sort_keys[model[iter2][Column.NICK_OR_GROUP]]
+            if key1 == key2:
+                return 0
+            return -1 if key1 < key2 else 1
 
         # Group
         group1 = model[iter1][Column.NICK_OR_GROUP]
@@ -531,8 +690,9 @@ def _load_roster(self) -> None:
         })
 
         for participant in self._contact.get_participants():
-            self._add_contact(participant)
+            self._add_contact(participant, bulk=True)
 
+        self._draw_groups()
         self._enable_sort(True)
         self._roster.set_model(self._modelfilter)
 
@@ -546,6 +706,8 @@ def _unload_roster(self) -> None:
         log.info('Unload Roster')
         assert self._contact is not None
         self._contact.multi_disconnect(self, CONTACT_SIGNALS)
+        self._cancel_pending_updates()
+        self._cancel_pending_avatars()
 
         self._roster.set_model(None)
         self._store.clear()
@@ -553,8 +715,21 @@ def _unload_roster(self) -> None:
 
         self._contact_refs = {}
         self._group_refs = {}
+        self._sort_keys = {}
+
+    def _update_sort_key(self, contact: types.GroupchatParticipant) -> None:
+        assert self._contact is not None
+        self._sort_keys[contact.name] = get_participant_sort_key(
+            contact.name,
+            contact.show,
+            contact.name == self._contact.nickname,
+            app.settings.get('sort_by_show_in_muc'))
 
     def invalidate_sort(self) -> None:
+        if self._contact is not None:
+            for nick in self._sort_keys:
+                self._update_sort_key(self._contact.get_resource(nick))
+
         self._enable_sort(False)
         self._enable_sort(True)
 
@@ -563,7 +738,7 @@ def _redraw(self) -> None:
         self._roster.set_model(self._store)
         self._roster.expand_all()
 
-    def _draw_contact(self, nick: str) -> None:
+    def _draw_contact(self, nick: str, draw_avatar: bool = True) -> None:
         iter_ = self._get_contact_iter(nick)
         if not iter_:
             return
@@ -571,7 +746,8 @@ def _draw_contact(self, nick: str) -> None:
         assert self._contact is not None
         contact = self._contact.get_resource(nick)
 
-        self._draw_avatar(contact)
+        if draw_avatar:
+            self._draw_avatar(contact)
 
         name = GLib.markup_escape_text(contact.name)
         self_contact = self._contact.get_self()
@@ -625,8 +801,10 @@ def _draw_avatar(self, contact: types.GroupchatParticipant) -> None:
             return
 
         surface = contact.get_avatar(AvatarSize.ROSTER,
-                                     self.get_scale_factor())
+                                     self.get_scale_factor(),
+                                     load_async=True)
 
+        self._pending_avatars.pop(contact.name, None)
         self._store[iter_][Column.AVATAR] = surface
 
     def _on_user_avatar_update(self,
@@ -638,10 +816,7 @@ def _on_user_avatar_update(self,
         self._draw_avatar(user_contact)
 
     def _get_total_user_count(self) -> int:
-        count = 0
-        for group_row in self._store:
-            count += self._store.iter_n_children(group_row.iter)
-        return count
+        return len(self._contact_refs)
 
     def _on_theme_update(self, _event: ApplicationEvent) -> None:
         if self._contact is None:
@@ -740,13 +740,18 @@ def _on_delete_message_locally(self,
                                    params: DeleteMessageParam
                                    ) -> None:
 
-        def _on_delete() -> None:
-            app.storage.archive.delete_message(params.pk)
+        def _on_deleted(_result: None) -> None:
             app.ged.raise_event(
                 events.MessageDeleted(account=params.account,
                                       jid=params.jid,
                                       pk=params.pk))
 
+        def _on_delete() -> None:
+            app.storage.archive.submit(
+                app.storage.archive.delete_message,
+                params.pk,
+                callback=_on_deleted)
+
         ConfirmationDialog(
             _('Delete Message'),
             _('Delete message locally?'),
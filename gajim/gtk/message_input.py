@@ -25,8 +25,8 @@
 from gajim.common.i18n import _
 from gajim.common.i18n import get_default_lang
 from gajim.common.storage.archive import models as mod
-from gajim.common.styling import PlainBlock
-from gajim.common.styling import process
+from gajim.common.styling import parse_line
+from gajim.common.styling import split_plain_lines
 from gajim.common.types import ChatContactT
 
 from gajim.gtk.chat_action_processor import ChatActionProcessor
@@ -43,6 +43,9 @@
     'pre': '`',
 }
 
+# Delay in ms after the last change before styling is applied
+STYLING_DELAY = 100
+
 log = logging.getLogger('gajim.gtk.message_input')
 
 
@@ -75,6 +78,11 @@ def __init__(self) -> None:
 
         self._contact: ChatContactT | None = None
 
+        # Lines of the buffer as they were when styling was last applied,
+        # only lines which changed since then are styled again
+        self._styled_lines: list[tuple[str, bool]] = []
+        self._styling_source_id: int | None = None
+
         self._text_buffer_manager = TextBufferManager(self)
         self._text_buffer_manager.connect(
             'buffer-changed', self._on_buffer_changed)
@@ -105,19 +113,22 @@ def end_correction(self) -> None:
         self.clear()
 
     def switch_contact(self, contact: ChatContactT) -> None:
+        self._cancel_styling()
         self._text_buffer_manager.switch_contact(contact)
+        self._styled_lines = []
         self.clear()
         self._contact = contact
         self._chat_action_processor.switch_contact(contact)
 
     def _on_destroy(self, _widget: Gtk.Widget) -> None:
+        self._cancel_styling()
         self._chat_action_processor.destroy()
         app.check_finalize(self)
 
     def _on_buffer_changed(self,
                            _text_buffer_manager: TextBufferManager
                            ) -> None:
-        self._on_text_changed()
+        self._schedule_styling()
         self.emit('buffer-changed')
 
     def _on_focus_in(self,
@@ -140,7 +151,7 @@ def _on_focus_out(self,
         scrolled.get_style_context().remove_class('message-input-focus')
         return False
 
-    def _clear_tags(self) -> None:
+    def _clear_tags(self, start: Gtk.TextIter, end: Gtk.TextIter) -> None:
         to_remove: list[Gtk.TextTag] = []
 
         def _check(tag: Gtk.TextTag) -> None:
@@ -150,33 +161,69 @@ def _check(tag: Gtk.TextTag) -> None:
             to_remove.append(tag)
 
         buf = self.get_buffer()
-        start, end = buf.get_bounds()
         tag_table = buf.get_tag_table()
         tag_table.foreach(_check)
         for tag in to_remove:
             buf.remove_tag(tag, start, end)
 
-    def _on_text_changed(self) -> None:
-        text = self.get_text()
-        if not text:
-            return
+    def _schedule_styling(self) -> None:
+        # Bursts of changes (typing, pasting) are styled once
+        self._cancel_styling()
+        self._styling_source_id = GLib.timeout_add(
+            STYLING_DELAY, self._apply_styling)
+
+    def _cancel_styling(self) -> None:
+        if self._styling_source_id is not None:
+            GLib.source_remove(self._styling_source_id)
+            self._styling_source_id = None
 
-        self._clear_tags()
+    def _apply_styling(self) -> bool:
+        self._styling_source_id = None
 
+        buf = self.get_buffer()
+        text = self.get_text()
         if len(text) > MAX_MESSAGE_LENGTH:
             # Limit message styling processing
-            return
+            self._clear_tags(*buf.get_bounds())
+            self._styled_lines = []
+            return False
+
+        lines = split_plain_lines(text)
+        old_lines = self._styled_lines
+        self._styled_lines = lines
+
+        # Tags move with the text, so lines which are unchanged before
+        # and after the edited region keep their styling
+        max_unchanged = min(len(lines), len(old_lines))
+        prefix = 0
+        while (prefix < max_unchanged and
+               lines[prefix] == old_lines[prefix]):
+            prefix += 1
+
+        max_unchanged -= prefix
+        suffix = 0
+        while (suffix < max_unchanged and
+               lines[-1 - suffix] == old_lines[-1 - suffix]):
+            suffix += 1
+
+        offset = sum(len(line) for line, _ in lines[:prefix])
+        for line, is_plain in lines[prefix:len(lines) - suffix]:
+            self._style_line(line, is_plain, offset)
+            offset += len(line)
+
+        return False
 
+    def _style_line(self, line: str, is_plain: bool, offset: int) -> None:
         buf = self.get_buffer()
-        result = process(text)
-        for block in result.blocks:
-            if isinstance(block, PlainBlock):
-                for span in block.spans:
-                    start_iter = buf.get_iter_at_offset(
-                        span.start + block.start)
-                    end_iter = buf.get_iter_at_offset(
-                        span.end + block.start)
-                    buf.apply_tag_by_name(span.name, start_iter, end_iter)
+        self._clear_tags(buf.get_iter_at_offset(offset),
+                         buf.get_iter_at_offset(offset + len(line)))
+        if not is_plain:
+            return
+
+        for span in parse_line(line):
+            start_iter = buf.get_iter_at_offset(span.start + offset)
+            end_iter = buf.get_iter_at_offset(span.end + offset)
+            buf.apply_tag_by_name(span.name, start_iter, end_iter)
 
     def insert_text(self, text: str) -> None:
         self.get_buffer().insert_at_cursor(text)
@@ -81,6 +81,22 @@ def get_text(self) -> str:
             return ''
         return self._preview.uri
 
+    def is_on_screen(self) -> bool:
+        if self._destroyed or not self.get_mapped():
+            return False
+
+        scrolled = self.get_ancestor(Gtk.ScrolledWindow)
+        if scrolled is None:
+            return True
+
+        coords = self.translate_coordinates(scrolled, 0, 0)
+        if coords is None:
+            return False
+
+        _x, y = coords
+        height = self.get_allocated_height()
+        return y + height > 0 and y < scrolled.get_allocated_height()
+
     @ensure_not_destroyed
     def update_progress(self, _preview: Preview, progress: float) -> None:
         self._ui.preview_stack.set_visible_child_name('preview')
@@ -623,7 +623,7 @@ def _draw_contact_row(self,
         self._store[iter_][Column.TEXT] = name
 
         surface = contact.get_avatar(
-            AvatarSize.ROSTER, self.get_scale_factor())
+            AvatarSize.ROSTER, self.get_scale_factor(), load_async=True)
         self._store[iter_][Column.AVATAR] = surface
         self._store[iter_][Column.VISIBLE] = self._get_contact_visible(contact)
 
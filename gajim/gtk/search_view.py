@@ -28,7 +28,7 @@
 from gajim.common.modules.contacts import ResourceContact
 from gajim.common.storage.archive.const import ChatDirection
 from gajim.common.storage.archive.const import MessageType
-from gajim.common.storage.archive.models import Message
+from gajim.common.storage.archive.storage import SearchResult
 
 from gajim.gtk.builder import get_builder
 from gajim.gtk.conversation.message_widget import MessageWidget
@@ -52,7 +52,7 @@ def __init__(self) -> None:
 
         self._account: str | None = None
         self._jid: JID | None = None
-        self._results_iterator: Iterator[Message] | None = None
+        self._results_iterator: Iterator[SearchResult] | None = None
 
         self._first_date: dt.datetime | None = None
         self._last_date: dt.datetime | None = None
@@ -146,6 +146,11 @@ def _on_search(self, entry: Gtk.Entry) -> None:
                 self._ui.date_hint.show()
                 return
 
+        # sort:relevance
+        text, sort_filters = self._strip_filters(text, 'sort')
+        sort_by_relevance = (sort_filters is not None and
+                             'relevance' in sort_filters)
+
         everywhere = self._ui.search_checkbutton.get_active()
         context = self._account is not None and self._jid is not None
         if not context:
@@ -165,7 +170,8 @@ def _on_search(self, entry: Gtk.Entry) -> None:
                 text,
                 from_users=from_filters,
                 before=before_filters,
-                after=after_filters)
+                after=after_filters,
+                sort_by_relevance=sort_by_relevance)
 
         self._add_results()
 
@@ -185,8 +191,8 @@ def _strip_filters(text: str,
 
     def _add_results(self) -> None:
         assert self._results_iterator is not None
-        for db_row in itertools.islice(self._results_iterator, 25):
-            result_row = ResultRow(db_row)
+        for result in itertools.islice(self._results_iterator, 25):
+            result_row = ResultRow(result)
             self._ui.results_listbox.add(result_row)
 
     def _on_edge_reached(self,
@@ -377,9 +383,11 @@ def __init__(self, account: str, jid: JID, timestamp: dt.datetime) -> None:
 
 
 class ResultRow(Gtk.ListBoxRow):
-    def __init__(self, db_row: Message) -> None:
+    def __init__(self, result: SearchResult) -> None:
         Gtk.ListBoxRow.__init__(self)
 
+        db_row = result.message
+
         self._client = self._get_client(str(db_row.account.jid))
         self.account = self._client.account
 
@@ -424,6 +432,10 @@ def __init__(self, db_row: Message) -> None:
         if db_row.corrections:
             text = db_row.get_last_correction().text
 
+        if result.snippet is not None:
+            # Show only the matching part of long messages
+            text = result.snippet
+
         assert text is not None
 
         message_widget = MessageWidget(self.account, selectable=False)
@@ -104,6 +104,12 @@ def handle_event_file_rcv_completed(self,
                 return
 
             if file_props.hash_ and file_props.error == 0:
+                hash_ = file_props.get_hash()
+                if hash_ is not None:
+                    # The file was hashed while it was received
+                    self.__verify_hash(account, file_props, hash_)
+                    return
+
                 # We compare hashes in a new thread
                 self.hashThread = Thread(
                     target=self.__compare_hashes,
@@ -153,6 +159,10 @@ def __compare_hashes(account: str, file_props: FileProp) -> None:
         log.debug('Computing file hash')
         hash_ = hashes.calculateHash(file_props.algo, file_)
         file_.close()
+        Interface.__verify_hash(account, file_props, hash_)
+
+    @staticmethod
+    def __verify_hash(account: str, file_props: FileProp, hash_: str) -> None:
         # File is corrupt if the calculated hash differs from the received hash
         jid = JID.from_string(file_props.sender)
         if file_props.hash_ == hash_:
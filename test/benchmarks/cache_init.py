@@ -0,0 +1,88 @@
+# Measures loading the caps and disco info caches at startup of
+# CacheStorage with a large database, using the row factory which was
+# used before against the shared row factory.
+#
+# Run with: python -m test.benchmarks.cache_init
+
+from __future__ import annotations
+
+from typing import Any
+from typing import NamedTuple
+
+import sqlite3
+import time
+import timeit
+from collections import namedtuple
+
+from gajim.common import app
+from gajim.common.storage.base import namedtuple_factory
+from gajim.common.storage.cache import CacheStorage
+
+ENTRY_COUNT = 5000
+REPEAT = 5
+
+DISCO_INFO = '''
+<iq xmlns="jabber:client" type="result" from="{jid}" id="1">
+<query xmlns="http://jabber.org/protocol/disco#info">
+<identity category="client" type="pc" name="Gajim" />
+<feature var="http://jabber.org/protocol/caps" />
+<feature var="http://jabber.org/protocol/disco#info" />
+<feature var="urn:xmpp:receipts" />
+</query>
+</iq>'''
+
+
+def _old_namedtuple_factory(cursor: sqlite3.Cursor,
+                            row: tuple[Any, ...]) -> NamedTuple:
+
+    # Row factory as it was used by CacheStorage before
+    assert cursor.description is not None
+    fields = [col[0] for col in cursor.description]
+    Row = namedtuple('Row', fields)  # pyright: ignore
+    return Row(*row)
+
+
+def _create_storage() -> CacheStorage:
+    # Set up like the application does
+    storage = app.storage.cache = CacheStorage(in_memory=True)
+    storage.init()
+
+    con = storage.get_connection()
+    now = int(time.time())
+    for index in range(ENTRY_COUNT):
+        jid = f'user{index}@example.org/gajim'
+        disco_info = DISCO_INFO.format(jid=jid)
+        con.execute('INSERT INTO caps_cache VALUES (?, ?, ?, ?)',
+                    ('sha-1', f'hash{index}', disco_info, now))
+        con.execute('INSERT INTO last_seen_disco_info VALUES (?, ?, ?)',
+                    (jid, disco_info, now))
+    con.commit()
+    return storage
+
+
+def _load(storage: CacheStorage) -> None:
+    # The part of CacheStorage.init() which reads the tables
+    storage._fill_disco_info_cache()  # pyright: ignore
+    storage._load_caps_data()  # pyright: ignore
+
+
+def main() -> None:
+    storage = _create_storage()
+    con = storage.get_connection()
+
+    factories = {
+        'namedtuple per row': _old_namedtuple_factory,
+        'shared row classes': namedtuple_factory,
+    }
+
+    for name, factory in factories.items():
+        con.row_factory = factory
+        duration = min(timeit.repeat(lambda: _load(storage),
+                                     number=1,
+                                     repeat=REPEAT))
+        print(f'{ENTRY_COUNT} caps and disco info entries, {name}: '
+              f'{duration * 1000:.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
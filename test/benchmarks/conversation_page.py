@@ -0,0 +1,159 @@
+# Measures loading pages of a conversation from a large message archive,
+# like ChatControl does when a chat is opened or scrolled, with the
+# statement which was used before against loading the pks of a page
+# first and only the messages which are not cached.
+#
+# Run with: python -m test.benchmarks.conversation_page [message count]
+
+from __future__ import annotations
+
+from typing import Any
+
+import sys
+import tempfile
+import timeit
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from pathlib import Path
+
+import sqlalchemy as sa
+from nbxmpp.protocol import JID
+from sqlalchemy import insert
+from sqlalchemy import select
+
+from gajim.common import app
+from gajim.common.settings import Settings
+from gajim.common.storage.archive.const import ChatDirection
+from gajim.common.storage.archive.const import MessageState
+from gajim.common.storage.archive.const import MessageType
+from gajim.common.storage.archive.models import Message
+from gajim.common.storage.archive.storage import MessageArchiveStorage
+
+ACCOUNT = 'testacc1'
+MESSAGE_COUNT = 1_000_000
+CHAT_COUNT = 1000
+INSERT_CHUNK_SIZE = 10000
+
+# Same as REQUEST_LINES_COUNT in gajim.gtk.control
+PAGE_SIZE = 20
+PAGE_COUNT = 10
+REPEAT = 5
+
+START = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def _init_settings() -> None:
+    app.settings = Settings(in_memory=True)
+    app.settings.init()
+    app.settings.add_account(ACCOUNT)
+    app.settings.set_account_setting(ACCOUNT, 'name', 'user')
+    app.settings.set_account_setting(ACCOUNT, 'hostname', 'domain.org')
+
+
+def _create_archive(path: Path, message_count: int) -> MessageArchiveStorage:
+    archive = MessageArchiveStorage(path=path)
+    archive.init()
+
+    with archive.get_session() as session:
+        account_pk = archive._get_account_pk(session, ACCOUNT)  # pyright: ignore
+        remote_pks = [
+            archive._get_jid_pk(  # pyright: ignore
+                session, JID.from_string(f'user{index}@example.org'))
+            for index in range(CHAT_COUNT)
+        ]
+
+        for start in range(0, message_count, INSERT_CHUNK_SIZE):
+            rows: list[dict[str, Any]] = []
+            end = min(start + INSERT_CHUNK_SIZE, message_count)
+            for index in range(start, end):
+                rows.append({
+                    'fk_account_pk': account_pk,
+                    'fk_remote_pk': remote_pks[index % CHAT_COUNT],
+                    'resource': 'res',
+                    'type': MessageType.CHAT,
+                    'direction': ChatDirection.INCOMING,
+                    'timestamp': START + timedelta(seconds=index),
+                    'state': MessageState.ACKNOWLEDGED,
+                    'id': f'messageid{index}',
+                    'text': f'Message {index}',
+                })
+            session.execute(insert(Message), rows)
+        session.commit()
+
+    return archive
+
+
+def _load_pages_old(archive: MessageArchiveStorage, jid: JID) -> None:
+    # The statement get_conversation_before_after() used before
+    with archive.get_session() as session:
+        account_pk = archive._get_account_pk(session, ACCOUNT)  # pyright: ignore
+        remote_pk = archive._get_jid_pk(session, jid)  # pyright: ignore
+
+    timestamp = datetime.now(timezone.utc)
+    for _index in range(PAGE_COUNT):
+        stmt = (
+            select(Message)
+            .where(
+                Message.fk_remote_pk == remote_pk,
+                Message.fk_account_pk == account_pk,
+                Message.correction_id.is_(None),
+                Message.timestamp < timestamp,
+            )
+            .order_by(sa.desc(Message.timestamp), sa.desc(Message.pk))
+            .limit(PAGE_SIZE)
+        )
+        with archive.get_session() as session:
+            messages = session.scalars(stmt).all()
+        if not messages:
+            break
+        timestamp = messages[-1].timestamp
+
+
+def _load_pages(archive: MessageArchiveStorage, jid: JID) -> None:
+    timestamp = datetime.now(timezone.utc)
+    for _index in range(PAGE_COUNT):
+        messages = archive.get_conversation_before_after(
+            ACCOUNT, jid, True, timestamp, PAGE_SIZE)
+        if not messages:
+            break
+        timestamp = messages[-1].timestamp
+
+
+def _measure(func: Any) -> float:
+    duration = min(timeit.repeat(func, number=1, repeat=REPEAT))
+    return duration * 1000 / PAGE_COUNT
+
+
+def main() -> None:
+    message_count = MESSAGE_COUNT
+    if len(sys.argv) > 1:
+        message_count = int(sys.argv[1])
+
+    _init_settings()
+
+    with tempfile.TemporaryDirectory() as directory:
+        archive = _create_archive(Path(directory) / 'archive.db',
+                                  message_count)
+        jid = JID.from_string('user0@example.org')
+        cache = archive._message_cache  # pyright: ignore
+
+        def _load_cold() -> None:
+            cache.clear()
+            _load_pages(archive, jid)
+
+        results = {
+            'full messages': _measure(lambda: _load_pages_old(archive, jid)),
+            'pks, cold cache': _measure(_load_cold),
+            'pks, warm cache': _measure(lambda: _load_pages(archive, jid)),
+        }
+
+        for name, duration in results.items():
+            print(f'{message_count} messages, {PAGE_SIZE} per page, '
+                  f'{name}: {duration:.2f} ms per page')
+
+        archive.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+# Sends a file over In-Band Bytestreams to a fake stream which answers
+# each data stanza after a simulated round trip time, for different
+# sizes of the send window.
+#
+# Run with: python -m test.benchmarks.ibb_send
+
+from __future__ import annotations
+
+from typing import Any
+
+import io
+import time
+from types import SimpleNamespace
+
+from gi.repository import GLib
+
+from gajim.common import app
+from gajim.common.file_props import FileProp
+from gajim.common.file_props import FilesProp
+from gajim.common.modules.ibb import IBB
+
+ACCOUNT = 'bench'
+FILE_SIZE = 1024 * 1024
+RTT = 50  # ms
+WINDOWS = [1, 4, 8, 16, 32]
+
+
+class FakeTask:
+    def __init__(self, user_data: Any) -> None:
+        self._user_data = user_data
+
+    def finish(self) -> None:
+        pass
+
+    def get_user_data(self) -> Any:
+        return self._user_data
+
+
+class FakeStream:
+    '''
+    Stands in for the nbxmpp IBB module, results arrive in order after RTT
+    '''
+
+    def __init__(self) -> None:
+        self.received = io.BytesIO()
+        self.expected_seq = 0
+
+    def send_data(self,
+                  _to: str,
+                  _sid: str,
+                  seq: int,
+                  data: bytes,
+                  callback: Any,
+                  user_data: Any
+                  ) -> None:
+
+        assert seq == self.expected_seq
+        self.expected_seq = (seq + 1) % 65536
+        self.received.write(data)
+        GLib.timeout_add(RTT, self._answer, callback, user_data)
+
+    @staticmethod
+    def _answer(callback: Any, user_data: Any) -> bool:
+        callback(FakeTask(user_data))
+        return False
+
+    def send_close(self, _to: str, _sid: str, callback: Any) -> None:
+        pass
+
+
+class FakeSocksQueue:
+    def __init__(self, loop: GLib.MainLoop) -> None:
+        self._loop = loop
+
+    def progress_transfer_cb(self, _account: str, _file_props: FileProp):
+        pass
+
+    def complete_transfer_cb(self, _account: str, _file_props: FileProp):
+        self._loop.quit()
+
+    def error_cb(self, *args: Any) -> None:
+        raise AssertionError(args)
+
+
+def _send_file(ibb: IBB, stream: FakeStream, data: bytes) -> float:
+    file_props = FilesProp.getNewFileProp(ACCOUNT, f'sid-{time.time()}')
+    file_props.transport_sid = file_props.sid
+    file_props.receiver = 'receiver@example.org/res'
+    file_props.size = len(data)
+    file_props.fp = io.BytesIO(data)
+    file_props.direction = '>'
+    file_props.block_size = 4096
+    file_props.seq = -1
+    file_props.received_len = 0
+    file_props.last_time = time.time()
+    file_props.connected = True
+
+    loop = GLib.MainLoop()
+    app.socks5queue = FakeSocksQueue(loop)
+
+    start = time.monotonic()
+    ibb.send_data(file_props)
+    loop.run()
+    duration = time.monotonic() - start
+
+    assert stream.received.getvalue() == data
+    FilesProp.deleteFileProp(file_props)
+    return duration
+
+
+def main() -> None:
+    data = bytes(range(256)) * (FILE_SIZE // 256)
+    for window in WINDOWS:
+        app.settings.set('ibb_send_window', window)
+
+        stream = FakeStream()
+        client = SimpleNamespace(
+            account=ACCOUNT,
+            state=SimpleNamespace(is_connected=True, is_available=True),
+            connection=SimpleNamespace(
+                get_module=lambda _name, stream=stream: stream))
+        app.connections[ACCOUNT] = client  # type: ignore
+        ibb = IBB(client)  # type: ignore
+
+        duration = _send_file(ibb, stream, data)
+        print(f'{FILE_SIZE // 1024} KiB, rtt {RTT} ms, window {window}: '
+              f'{duration:.2f} s, {FILE_SIZE / 1024 / duration:.0f} KiB/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+# Measures writing pages of archive query results, like the MAM module
+# does on catch up, with one transaction per message against passing
+# the messages of a page to one ingest. Most of the difference is the
+# cost of syncing a commit to the disk, pass a directory on the disk the
+# archive is usually stored on, /tmp may not be backed by a disk.
+#
+# Run with: python -m test.benchmarks.mam_ingest [message count] [directory]
+
+from __future__ import annotations
+
+from typing import Any
+
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from pathlib import Path
+
+from nbxmpp.protocol import JID
+
+from gajim.common import app
+from gajim.common.settings import Settings
+from gajim.common.storage.archive.const import ChatDirection
+from gajim.common.storage.archive.const import MessageState
+from gajim.common.storage.archive.const import MessageType
+from gajim.common.storage.archive.models import Message
+from gajim.common.storage.archive.storage import MessageArchiveStorage
+from gajim.common.storage.base import Ingest
+
+ACCOUNT = 'testacc1'
+MESSAGE_COUNT = 50_000
+CHAT_COUNT = 20
+
+# Default page size of archive queries
+PAGE_SIZE = 50
+
+START = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def _init_settings() -> None:
+    app.settings = Settings(in_memory=True)
+    app.settings.init()
+    app.settings.add_account(ACCOUNT)
+    app.settings.set_account_setting(ACCOUNT, 'name', 'user')
+    app.settings.set_account_setting(ACCOUNT, 'hostname', 'domain.org')
+
+
+def _make_message(prefix: str, index: int) -> Message:
+    return Message(
+        account_=ACCOUNT,
+        remote_jid_=JID.from_string(f'user{index % CHAT_COUNT}@example.org'),
+        type=MessageType.CHAT,
+        direction=ChatDirection.INCOMING,
+        timestamp=START + timedelta(seconds=index),
+        state=MessageState.ACKNOWLEDGED,
+        resource='res',
+        text=f'Message {index}',
+        id=f'{prefix}messageid{index}',
+        stanza_id=f'{prefix}stanzaid{index}',
+    )
+
+
+def _write_messages(archive: MessageArchiveStorage,
+                    prefix: str,
+                    message_count: int,
+                    ingest: Ingest | None) -> None:
+
+    for index in range(message_count):
+        message = _make_message(prefix, index)
+        # Duplicated messages are checked before they are written
+        if archive.check_if_stanza_id_exists(ACCOUNT,
+                                             message.remote_jid_,
+                                             message.stanza_id,
+                                             ingest=ingest):
+            continue
+
+        archive.insert_object(message, ingest=ingest)
+
+        if ingest is not None and index % PAGE_SIZE == PAGE_SIZE - 1:
+            # The ingest is committed at the latest after each page
+            ingest.commit()
+
+    if ingest is not None:
+        ingest.close()
+
+
+def _measure(func: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    message_count = MESSAGE_COUNT
+    if len(sys.argv) > 1:
+        message_count = int(sys.argv[1])
+
+    parent_dir = None
+    if len(sys.argv) > 2:
+        parent_dir = sys.argv[2]
+
+    _init_settings()
+
+    with tempfile.TemporaryDirectory(dir=parent_dir) as directory:
+        archive = MessageArchiveStorage(path=Path(directory) / 'archive.db')
+        archive.init()
+
+        results = {
+            'transaction per message': _measure(
+                lambda: _write_messages(archive, 'a', message_count, None)),
+            'ingest per page': _measure(
+                lambda: _write_messages(archive, 'b', message_count,
+                                        archive.begin_ingest())),
+        }
+
+        for name, duration in results.items():
+            print(f'{message_count} messages, {PAGE_SIZE} per page, '
+                  f'{name}: {duration:.2f} s, '
+                  f'{message_count / duration:.0f} messages/s')
+
+        archive.shutdown()
+
+
+if __name__ == '__main__':
+    main()
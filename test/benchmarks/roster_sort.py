@@ -0,0 +1,98 @@
+# Compares sorting a large group chat roster with the comparator which
+# was used before against sorting with precomputed sort keys.
+#
+# Run with: python -m test.benchmarks.roster_sort
+
+from __future__ import annotations
+
+import functools
+import locale
+import random
+import timeit
+
+from nbxmpp.const import PresenceShow
+
+from gajim.common import app  # Avoids circular imports from common.helpers
+from gajim.common.helpers import get_participant_sort_key
+
+PARTICIPANT_COUNT = 5000
+REPEAT = 5
+OWN_NICK = 'me'
+
+
+def _create_participants(count: int) -> dict[str, PresenceShow]:
+    rand = random.Random(0)
+    shows = list(PresenceShow)
+    participants = {OWN_NICK: PresenceShow.ONLINE}
+    while len(participants) < count:
+        length = rand.randint(3, 16)
+        nick = ''.join(rand.choice('abcdeéfghijklmnoöpqrstuüvwxyzAEOU _-')
+                       for _ in range(length))
+        participants[nick] = rand.choice(shows)
+    return participants
+
+
+def _compare(participants: dict[str, PresenceShow],
+             nick1: str,
+             nick2: str
+             ) -> int:
+
+    # Comparator as it was used by GroupchatRoster._tree_compare_iters
+    if OWN_NICK in (nick1, nick2):
+        return -1 if OWN_NICK == nick1 else 1
+
+    if not app.settings.get('sort_by_show_in_muc'):
+        return locale.strcoll(nick1.lower(), nick2.lower())
+
+    show1 = participants[nick1]
+    show2 = participants[nick2]
+    if show1 != show2:
+        return -1 if show1 > show2 else 1
+
+    return locale.strcoll(nick1.lower(), nick2.lower())
+
+
+def _sort_with_comparator(participants: dict[str, PresenceShow]) -> list[str]:
+    key = functools.cmp_to_key(functools.partial(_compare, participants))
+    return sorted(participants, key=key)
+
+
+def _sort_with_keys(participants: dict[str, PresenceShow]) -> list[str]:
+    sort_by_show = app.settings.get('sort_by_show_in_muc')
+    keys = {
+        nick: get_participant_sort_key(
+            nick, show, nick == OWN_NICK, sort_by_show)
+        for nick, show in participants.items()
+    }
+    return sorted(participants, key=keys.__getitem__)
+
+
+def main() -> None:
+    locale.setlocale(locale.LC_ALL, '')
+    participants = _create_participants(PARTICIPANT_COUNT)
+
+    for sort_by_show in (False, True):
+        app.settings.set('sort_by_show_in_muc', sort_by_show)
+
+        expected = [locale.strxfrm(nick.lower()) for nick in
+                    _sort_with_comparator(participants)]
+        result = [locale.strxfrm(nick.lower()) for nick in
+                  _sort_with_keys(participants)]
+        assert expected == result
+
+        comparator = min(timeit.repeat(
+            lambda: _sort_with_comparator(participants),
+            number=1, repeat=REPEAT))
+        keys = min(timeit.repeat(
+            lambda: _sort_with_keys(participants),
+            number=1, repeat=REPEAT))
+
+        print(f'{PARTICIPANT_COUNT} participants, '
+              f'sort_by_show_in_muc={sort_by_show}: '
+              f'comparator {comparator * 1000:.1f} ms, '
+              f'precomputed keys {keys * 1000:.1f} ms '
+              f'(including key creation)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+# Measures message styling of long messages with many spans and URIs.
+#
+# Run with: python -m test.benchmarks.styling
+
+from __future__ import annotations
+
+import timeit
+
+from gajim.common import app  # noqa: F401  (avoid circular imports)
+from gajim.common.styling import process
+from gajim.common.styling import process_uris
+
+REPEAT = 5
+
+CORPUS = {
+    'long line with many uris': ' '.join(
+        f'see https://example.org/päge/{i}?q=ü#{i}, and xmpp:user{i}@example.org'
+        for i in range(500)),
+    'long line with many spans': ' '.join(
+        f'*stärk {i}* _emphäsis {i}_ ~strike {i}~ `pre {i}` 😀'
+        for i in range(1000)),
+    'many lines with uris and spans': '\n'.join(
+        f'Zeile {i}: *wichtig* https://example.com/{i} _ende_ ✨'
+        for i in range(2000)),
+    'ascii line with many spans': ' '.join(
+        f'*strong {i}* _emphasis {i}_ https://example.net/{i}'
+        for i in range(1000)),
+}
+
+
+def main() -> None:
+    for name, text in CORPUS.items():
+        duration = min(timeit.repeat(
+            lambda: (process(text), process_uris(text)),  # noqa: B023
+            number=1, repeat=REPEAT))
+        print(f'{name} ({len(text)} chars): {duration * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
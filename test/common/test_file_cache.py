@@ -0,0 +1,115 @@
+import unittest
+
+import os
+import tempfile
+from pathlib import Path
+
+from gi.repository import GLib
+
+from gajim.common import app
+from gajim.common.file_cache import FileCache
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self._path = Path(self._dir.name) / 'files'
+        self._path.mkdir()
+        self._index_path = Path(self._dir.name) / 'files.index.json'
+        app.settings.set('preview_thumbnails_cache_size', 1000)
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def _write(self, cache: FileCache, name: str, size: int) -> Path:
+        path = self._path / name
+        path.write_bytes(b'x' * size)
+        cache.add(path)
+        return path
+
+    def _create_cache(self) -> FileCache:
+        # An empty index, so the directory is not scanned
+        self._index_path.write_text('{"version": 1, "entries": []}')
+        return self._load_cache()
+
+    def _load_cache(self) -> FileCache:
+        cache = FileCache(self._path,
+                          self._index_path,
+                          'preview_thumbnails_cache_size')
+        context = GLib.MainContext.default()
+        while context.pending():
+            context.iteration(False)
+        return cache
+
+    def test_evict_least_recently_used(self):
+        cache = self._create_cache()
+        first = self._write(cache, 'first', 400)
+        second = self._write(cache, 'second', 400)
+        cache.touch(first)
+        third = self._write(cache, 'third', 400)
+
+        cache.evict()
+
+        self.assertTrue(cache.contains(first))
+        self.assertFalse(cache.contains(second))
+        self.assertTrue(cache.contains(third))
+        self.assertFalse(second.exists())
+        self.assertEqual(cache.size, 800)
+
+    def test_index(self):
+        cache = self._create_cache()
+        first = self._write(cache, 'first', 100)
+        second = self._write(cache, 'second', 200)
+        cache.touch(first)
+        cache.shutdown()
+        self.assertEqual(sorted(os.listdir(self._path)), ['first', 'second'])
+
+        cache = self._load_cache()
+        self.assertTrue(cache.contains(first))
+        self.assertTrue(cache.contains(second))
+        self.assertEqual(cache.size, 300)
+
+        # Files are known from the index without looking at the directory
+        first.unlink()
+        self.assertTrue(cache.contains(first))
+        cache.remove(first)
+        self.assertFalse(cache.contains(first))
+        self.assertEqual(cache.size, 200)
+
+        app.settings.set('preview_thumbnails_cache_size', 150)
+        cache.evict()
+        self.assertFalse(cache.contains(second))
+        self.assertEqual(cache.size, 0)
+
+    def test_outdated_index(self):
+        cache = self._create_cache()
+        first = self._write(cache, 'first', 100)
+        second = self._write(cache, 'second', 200)
+        cache.touch(first)
+        cache.shutdown()
+
+        # Changes after the index was saved, e.g. before a crash
+        second.unlink()
+        third = self._path / 'third'
+        third.write_bytes(b'x' * 400)
+        os.utime(third, (1, 1))
+        index_mtime = self._index_path.stat().st_mtime
+        os.utime(self._path, (index_mtime + 1, index_mtime + 1))
+
+        cache = self._load_cache()
+        self.assertTrue(cache.contains(first))
+        self.assertFalse(cache.contains(second))
+        self.assertTrue(cache.contains(third))
+        self.assertEqual(cache.size, 500)
+
+        # Indexed files keep their last access, instead of the one of
+        # the file system
+        app.settings.set('preview_thumbnails_cache_size', 450)
+        cache.evict()
+        self.assertTrue(first.exists())
+        self.assertFalse(third.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+import base64
+import hashlib
+
+from gajim.common.file_props import FilesProp
+
+DATA = bytes(range(256)) * 1000
+
+
+class Test(unittest.TestCase):
+
+    def _receive(self, sid: str, algo: str, offset: int = 0):
+        file_props = FilesProp.getNewFileProp('account', sid)
+        file_props.algo = algo
+        file_props.size = len(DATA)
+        file_props.received_len = offset
+        for index in range(offset, len(DATA), 4096):
+            chunk = DATA[index:index + 4096]
+            file_props.received_len += len(chunk)
+            file_props.update_hash(chunk)
+        return file_props
+
+    def test_incremental_hash(self):
+        file_props = self._receive('1', 'sha-256')
+        digest = hashlib.sha256(DATA).digest()
+        self.assertEqual(file_props.get_hash(),
+                         base64.b64encode(digest).decode())
+
+        file_props = self._receive('2', 'blake2b-256')
+        digest = hashlib.blake2b(DATA, digest_size=32).digest()
+        self.assertEqual(file_props.get_hash(),
+                         base64.b64encode(digest).decode())
+
+    def test_incremental_hash_unavailable(self):
+        # Resumed transfer
+        file_props = self._receive('3', 'sha-256', offset=4096)
+        self.assertIsNone(file_props.get_hash())
+
+        # Unsupported algorithm
+        file_props = self._receive('4', 'md5')
+        self.assertIsNone(file_props.get_hash())
+
+        # Algorithm changed after the transfer started
+        file_props = self._receive('5', 'sha-256')
+        file_props.algo = 'sha-512'
+        self.assertIsNone(file_props.get_hash())
+
+
+if __name__ == '__main__':
+    unittest.main()
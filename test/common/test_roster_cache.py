@@ -0,0 +1,42 @@
+import unittest
+
+from nbxmpp.protocol import JID
+from nbxmpp.structs import RosterItem
+
+from gajim.common.storage.cache import CacheStorage
+
+ACCOUNT = 'testacc'
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self._cache = CacheStorage(in_memory=True)
+        self._cache.init()
+
+    def test_roster_items(self):
+        jid1 = JID.from_string('user1@example.org')
+        jid2 = JID.from_string('user2@example.org')
+        item1 = RosterItem(jid=jid1, name='User', subscription='both',
+                           groups={'Friends'})
+        item2 = RosterItem(jid=jid2, subscription='none')
+
+        self._cache.store_roster_items(ACCOUNT, [item1, item2])
+        self._cache.store_roster_items('otheracc', [item1])
+        self.assertEqual(set(self._cache.load_roster_jids(ACCOUNT)),
+                         {jid1, jid2})
+
+        item1 = RosterItem(jid=jid1, name='Renamed', subscription='both')
+        self._cache.store_roster_items(ACCOUNT, [item1])
+        self._cache.remove_roster_items(ACCOUNT, [jid2])
+
+        roster = self._cache.load_roster(ACCOUNT)
+        self.assertEqual(roster, {jid1: item1})
+
+        self._cache.remove_roster(ACCOUNT)
+        self.assertEqual(self._cache.load_roster(ACCOUNT), {})
+        self.assertEqual(len(self._cache.load_roster('otheracc')), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from nbxmpp.protocol import JID
+
+from gajim.common import configpaths
+from gajim.common.settings import CURRENT_USER_VERSION
+from gajim.common.settings import Settings
+
+ACCOUNT = 'testacc1'
+CONTACT_JID = JID.from_string('contact@domain.org')
+GROUP_CHAT_JID = JID.from_string('room@conference.domain.org')
+
+# Settings database as it was created before version 6
+V5_SQL = '''
+    CREATE TABLE settings (
+            name TEXT UNIQUE,
+            settings TEXT
+    );
+
+    CREATE TABLE account_settings (
+            account TEXT UNIQUE,
+            settings TEXT
+    );
+
+    INSERT INTO settings(name, settings) VALUES ('app', '{"debug": false}');
+    INSERT INTO settings(name, settings) VALUES ('soundevents', '{}');
+    INSERT INTO settings(name, settings) VALUES ('status_presets', '{}');
+    INSERT INTO settings(name, settings) VALUES ('proxies', '{}');
+    INSERT INTO settings(name, settings) VALUES ('plugins', '{}');
+    INSERT INTO settings(name, settings) VALUES ('workspaces', '{}');
+
+    PRAGMA user_version=5;
+    '''
+
+V5_ACCOUNT_SETTINGS = {
+    'account': {
+        'name': 'user',
+        'hostname': 'domain.org',
+        'active': True,
+    },
+    'contact': {
+        str(CONTACT_JID): {'speller_language': 'de'},
+    },
+    'group_chat': {
+        str(GROUP_CHAT_JID): {'speller_language': 'fr', 'mute_until': 'x'},
+    },
+}
+
+
+class SettingsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp_dir.cleanup)
+        self._path = Path(self._tmp_dir.name) / 'settings.sqlite'
+
+        # Other paths, like the legacy config file, do not exist
+        patcher = mock.patch.object(
+            configpaths, 'get',
+            side_effect=lambda name: (
+                self._path if name == 'SETTINGS'
+                else Path(self._tmp_dir.name) / name.lower()))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _create_v5_database(self) -> None:
+        con = sqlite3.connect(self._path)
+        con.executescript(V5_SQL)
+        con.execute('INSERT INTO account_settings VALUES(?, ?)',
+                    (ACCOUNT, json.dumps(V5_ACCOUNT_SETTINGS)))
+        con.commit()
+        con.close()
+
+    def _load(self) -> Settings:
+        settings = Settings()
+        settings.init()
+        return settings
+
+    def _reload(self, settings: Settings) -> Settings:
+        settings.close()
+        return self._load()
+
+    def _get_user_version(self) -> int:
+        con = sqlite3.connect(self._path)
+        version = con.execute('PRAGMA user_version').fetchone()[0]
+        con.close()
+        return version
+
+    def _get_account_settings_rows(self) -> set[tuple[str, str, str, str]]:
+        con = sqlite3.connect(self._path)
+        rows = con.execute(
+            'SELECT scope, jid, setting, value FROM account_settings').fetchall()
+        con.close()
+        return set(rows)
+
+    def _assert_migrated_settings(self, settings: Settings) -> None:
+        self.assertEqual(settings.get_accounts(), [ACCOUNT])
+        self.assertEqual(
+            settings.get_account_setting(ACCOUNT, 'name'), 'user')
+        self.assertEqual(
+            settings.get_account_setting(ACCOUNT, 'hostname'),
+            'domain.org')
+        self.assertTrue(settings.get_account_setting(ACCOUNT, 'active'))
+        self.assertEqual(
+            settings.get_contact_setting(
+                ACCOUNT, CONTACT_JID, 'speller_language'),
+            'de')
+        self.assertEqual(
+            settings.get_group_chat_setting(
+                ACCOUNT, GROUP_CHAT_JID, 'speller_language'),
+            'fr')
+        self.assertEqual(
+            settings.get_group_chat_setting(
+                ACCOUNT, GROUP_CHAT_JID, 'mute_until'),
+            'x')
+
+    def test_migrate_v5(self) -> None:
+        self._create_v5_database()
+
+        settings = self._load()
+        self._assert_migrated_settings(settings)
+
+        settings = self._reload(settings)
+        self._assert_migrated_settings(settings)
+        settings.close()
+        self.assertEqual(self._get_user_version(), CURRENT_USER_VERSION)
+
+    def test_change_and_reset_settings(self) -> None:
+        settings = self._load()
+        settings.add_account(ACCOUNT)
+
+        settings.set_account_setting(ACCOUNT, 'name', 'user')
+        settings.set_account_setting(ACCOUNT, 'account_label', 'Label')
+        settings.set_contact_setting(
+            ACCOUNT, CONTACT_JID, 'speller_language', 'de')
+        settings.set_contact_setting(
+            ACCOUNT, CONTACT_JID, 'mute_until', 'x')
+        settings.set_group_chat_setting(
+            ACCOUNT, GROUP_CHAT_JID, 'speller_language', 'fr')
+
+        settings = self._reload(settings)
+        self.assertEqual(settings.get_account_setting(ACCOUNT, 'name'), 'user')
+        self.assertEqual(
+            settings.get_account_setting(ACCOUNT, 'account_label'), 'Label')
+        self.assertEqual(
+            settings.get_contact_setting(
+                ACCOUNT, CONTACT_JID, 'speller_language'),
+            'de')
+        self.assertEqual(
+            settings.get_contact_setting(ACCOUNT, CONTACT_JID, 'mute_until'),
+            'x')
+        self.assertEqual(
+            settings.get_group_chat_setting(
+                ACCOUNT, GROUP_CHAT_JID, 'speller_language'),
+            'fr')
+
+        # Change a setting twice and reset others before they are written
+        settings.set_account_setting(ACCOUNT, 'name', 'other')
+        settings.set_account_setting(ACCOUNT, 'name', 'user2')
+        settings.set_account_setting(ACCOUNT, 'account_label', None)
+        settings.set_contact_setting(
+            ACCOUNT, CONTACT_JID, 'speller_language', None)
+        settings.set_group_chat_setting(
+            ACCOUNT, GROUP_CHAT_JID, 'speller_language', 'it')
+        settings.set_group_chat_setting(
+            ACCOUNT, GROUP_CHAT_JID, 'speller_language', None)
+
+        settings = self._reload(settings)
+        self.assertEqual(
+            settings.get_account_setting(ACCOUNT, 'name'), 'user2')
+        self.assertEqual(
+            settings.get_account_setting(ACCOUNT, 'account_label'), '')
+        self.assertEqual(
+            settings.get_contact_setting(
+                ACCOUNT, CONTACT_JID, 'speller_language'),
+            '')
+        self.assertEqual(
+            settings.get_contact_setting(ACCOUNT, CONTACT_JID, 'mute_until'),
+            'x')
+        settings.close()
+
+        # Getting the default of a group chat setting needs a client,
+        # check that the rows of the reset settings are removed
+        self.assertEqual(self._get_account_settings_rows(), {
+            ('account', '', 'name', '"user2"'),
+            ('contact', str(CONTACT_JID), 'mute_until', '"x"'),
+        })
+
+    def test_remove_account(self) -> None:
+        settings = self._load()
+        settings.add_account(ACCOUNT)
+        settings.set_account_setting(ACCOUNT, 'name', 'user')
+
+        # Pending changes of a removed account are not written
+        settings.remove_account(ACCOUNT)
+
+        settings = self._reload(settings)
+        self.assertEqual(settings.get_accounts(), [])
+
+        settings.add_account(ACCOUNT)
+        self.assertEqual(settings.get_account_setting(ACCOUNT, 'name'), '')
+        settings.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -516,6 +516,14 @@
 ]
 
 
+BYTE_OFFSETS = [
+    'äöü *strong* ✨ _emphasis_ ~strike~ `pre` 😀 *ß*',
+    'Ünïcödé https://example.org/ä and https://example.com/😀 *bold*\n'
+    '🎉 _zweite_ Zeile mit xmpp:user@example.org ~ende~',
+    '日本語 *強調* と https://例え.jp/パス と `コード`',
+]
+
+
 class Test(unittest.TestCase):
     @staticmethod
     def wrap(link: str) -> str:
@@ -527,6 +535,49 @@ def test_styling(self):
             result = styling.process(params['input'])
             self.assertEqual(result.blocks, params['tokens'])
 
+    def test_split_plain_lines(self):
+        for params in STYLING.values():
+            text = params['input']
+            assert isinstance(text, str)
+
+            expected: list[tuple[str, int, int]] = []
+            for block in styling.process(text).blocks:
+                if isinstance(block, PlainBlock):
+                    expected += [
+                        (span.name, span.start + block.start,
+                         span.end + block.start) for span in block.spans]
+
+            lines = styling.split_plain_lines(text)
+            self.assertEqual(''.join(line for line, _ in lines), text)
+
+            result: list[tuple[str, int, int]] = []
+            offset = 0
+            for line, is_plain in lines:
+                if is_plain:
+                    result += [
+                        (span.name, span.start + offset, span.end + offset)
+                        for span in styling.parse_line(line)]
+                offset += len(line)
+
+            self.assertEqual(result, expected, text)
+
+    def test_byte_offsets(self):
+        for text in BYTE_OFFSETS:
+            spans: list[tuple[str, int, int]] = []
+            for block in styling.process(text).blocks:
+                assert isinstance(block, PlainBlock)
+                spans += [(span.text, span.start_byte, span.end_byte)
+                          for span in block.spans]
+
+            uris = [(uri.text, uri.start_byte, uri.end_byte)
+                    for uri in process_uris(text)]
+            self.assertTrue(spans + uris, text)
+
+            text_bytes = text.encode()
+            for span_text, start_byte, end_byte in spans + uris:
+                self.assertEqual(
+                    text_bytes[start_byte:end_byte].decode(), span_text)
+
     def test_uris(self):
         for uri in URIS:
             text = self.wrap(uri)
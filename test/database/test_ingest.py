@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+from typing import Any
+
+import tempfile
+import unittest
+from datetime import datetime
+from datetime import timezone
+from pathlib import Path
+
+from nbxmpp.protocol import JID
+from sqlalchemy.exc import IntegrityError
+
+from gajim.common import app
+from gajim.common.settings import Settings
+from gajim.common.storage.archive.const import ChatDirection
+from gajim.common.storage.archive.const import MessageState
+from gajim.common.storage.archive.const import MessageType
+from gajim.common.storage.archive.models import Message
+from gajim.common.storage.archive.models import Receipt
+from gajim.common.storage.archive.storage import MessageArchiveStorage
+
+
+class IngestTest(unittest.TestCase):
+    def setUp(self) -> None:
+        # Use a file, connections to in memory databases share one
+        # transaction
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        path = Path(self._tmp_dir.name) / 'logs.db'
+        self._archive = MessageArchiveStorage(path=path)
+        self._archive.init()
+
+        self._account = 'testacc1'
+        self._remote_jid = JID.from_string('remote@jid.org')
+        self._init_settings()
+
+    def tearDown(self) -> None:
+        self._archive.shutdown()
+        self._tmp_dir.cleanup()
+
+    def _init_settings(self) -> None:
+        app.settings = Settings(in_memory=True)
+        app.settings.init()
+        app.settings.add_account('testacc1')
+        app.settings.set_account_setting('testacc1', 'name', 'user')
+        app.settings.set_account_setting('testacc1', 'hostname', 'domain.org')
+
+    def _make_message(self, stanza_id: str) -> Message:
+        return Message(
+            account_=self._account,
+            remote_jid_=self._remote_jid,
+            type=MessageType.CHAT,
+            direction=ChatDirection.INCOMING,
+            timestamp=datetime.now(timezone.utc),
+            state=MessageState.ACKNOWLEDGED,
+            resource='res',
+            text='Some Message',
+            id=stanza_id,
+            stanza_id=stanza_id,
+        )
+
+    def _stanza_id_exists(self, stanza_id: str, **kwargs: Any) -> bool:
+        return self._archive.check_if_stanza_id_exists(
+            self._account, self._remote_jid, stanza_id, **kwargs)
+
+    def _stanza_id_committed(self, stanza_id: str) -> bool:
+        # Calls on the main thread commit open ingests first, check
+        # from the writer thread what other connections see
+        future = self._archive.submit(self._stanza_id_exists, stanza_id)
+        return future.result()
+
+    def test_ingest(self) -> None:
+        ingest = self._archive.begin_ingest()
+
+        pk = self._archive.insert_object(
+            self._make_message('stanzaid1'), ingest=ingest)
+        self.assertNotEqual(pk, -1)
+
+        # Only calls which are passed the ingest see its writes
+        self.assertTrue(self._stanza_id_exists('stanzaid1', ingest=ingest))
+        self.assertFalse(self._stanza_id_committed('stanzaid1'))
+
+        # Messages of an ingest are loaded with its session
+        message = self._archive.get_message_with_pk(pk)
+        assert message is not None
+        self.assertEqual(message.stanza_id, 'stanzaid1')
+        self.assertFalse(self._stanza_id_committed('stanzaid1'))
+
+        ingest.commit()
+        self.assertTrue(self._stanza_id_committed('stanzaid1'))
+
+        # The ingest can be used again after a commit
+        self._archive.insert_object(
+            self._make_message('stanzaid2'), ingest=ingest)
+        ingest.close()
+        self.assertTrue(self._stanza_id_committed('stanzaid2'))
+
+    def test_ingest_batch(self) -> None:
+        pk = self._archive.insert_object(self._make_message('stanzaid0'))
+
+        ingest = self._archive.begin_ingest()
+        pks = [
+            self._archive.insert_object(
+                self._make_message(f'stanzaid{i}'), ingest=ingest)
+            for i in range(1, 6)
+        ]
+        self.assertEqual(pks, list(range(pk + 1, pk + 6)))
+        self.assertEqual(len(ingest.pending_rows), 5)
+
+        # Duplicates are found before the batch is written
+        self.assertTrue(self._stanza_id_exists('stanzaid3', ingest=ingest))
+        self.assertEqual(len(ingest.pending_rows), 5)
+
+        # Loading a message writes the batch, but does not commit it
+        message = self._archive.get_message_with_pk(pks[2])
+        assert message is not None
+        self.assertEqual(message.stanza_id, 'stanzaid3')
+        self.assertEqual(ingest.pending_rows, [])
+        self.assertFalse(self._stanza_id_committed('stanzaid3'))
+
+        self.assertEqual(
+            self._archive.insert_object(
+                self._make_message('stanzaid6'), ingest=ingest),
+            pk + 6)
+
+        ingest.close()
+        for i, message_pk in enumerate(pks, start=1):
+            message = self._archive.get_message_with_pk(message_pk)
+            assert message is not None
+            self.assertEqual(message.stanza_id, f'stanzaid{i}')
+        self.assertTrue(self._stanza_id_committed('stanzaid6'))
+
+    def test_other_call_commits_ingest(self) -> None:
+        ingest = self._archive.begin_ingest()
+        self._archive.insert_object(
+            self._make_message('stanzaid1'), ingest=ingest)
+
+        # Would wait for the write lock of the ingest otherwise
+        self._archive.insert_object(self._make_message('stanzaid2'))
+
+        self.assertTrue(self._stanza_id_committed('stanzaid1'))
+        self.assertTrue(self._stanza_id_committed('stanzaid2'))
+        ingest.close()
+
+    def test_ingest_conflict(self) -> None:
+        ingest = self._archive.begin_ingest()
+
+        receipt1 = Receipt(
+            account_=self._account,
+            remote_jid_=self._remote_jid,
+            id='stanzaid1',
+            timestamp=datetime.fromtimestamp(1, timezone.utc),
+        )
+        receipt2 = Receipt(
+            account_=self._account,
+            remote_jid_=self._remote_jid,
+            id='stanzaid1',
+            timestamp=datetime.fromtimestamp(3, timezone.utc),
+        )
+
+        pk = self._archive.insert_object(
+            self._make_message('stanzaid1'), ingest=ingest)
+        self._archive.insert_object(receipt1, ingest=ingest)
+        self.assertEqual(
+            self._archive.insert_object(receipt2, ingest=ingest), -1)
+
+        with self.assertRaises(IntegrityError):
+            self._archive.insert_object(
+                receipt2, ignore_on_conflict=False, ingest=ingest)
+
+        # The conflicts must not roll back the other rows of the batch
+        ingest.close()
+
+        message = self._archive.get_message_with_pk(pk)
+        assert message is not None
+        self.assertIsNotNone(message.receipt)
+
+    def test_ingest_rollback(self) -> None:
+        ingest = self._archive.begin_ingest()
+
+        pk = self._archive.insert_object(
+            self._make_message('stanzaid1'), ingest=ingest)
+        self.assertIsNotNone(self._archive.get_message_with_pk(pk))
+
+        ingest.rollback()
+        ingest.close()
+
+        self.assertIsNone(self._archive.get_message_with_pk(pk))
+        self.assertFalse(self._stanza_id_committed('stanzaid1'))
+
+    def test_concurrent_ingests(self) -> None:
+        ingest1 = self._archive.begin_ingest()
+        ingest2 = self._archive.begin_ingest()
+
+        self._archive.insert_object(
+            self._make_message('stanzaid1'), ingest=ingest1)
+        self._archive.insert_object(
+            self._make_message('stanzaid2'), ingest=ingest2)
+
+        # Only one ingest holds the write lock at a time
+        self.assertTrue(self._stanza_id_committed('stanzaid1'))
+        self.assertFalse(self._stanza_id_committed('stanzaid2'))
+
+        ingest2.rollback()
+        ingest1.close()
+        ingest2.close()
+        self.assertFalse(self._stanza_id_committed('stanzaid2'))
+
+    def test_shutdown_commits_ingest(self) -> None:
+        ingest = self._archive.begin_ingest()
+        self._archive.insert_object(
+            self._make_message('stanzaid1'), ingest=ingest)
+
+        self._archive.shutdown()
+
+        self._archive = MessageArchiveStorage(
+            path=Path(self._tmp_dir.name) / 'logs.db')
+        self._archive.init()
+        self.assertTrue(self._stanza_id_exists('stanzaid1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
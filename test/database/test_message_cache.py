@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import unittest
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+from nbxmpp.protocol import JID
+
+from gajim.common import app
+from gajim.common.settings import Settings
+from gajim.common.storage.archive.const import ChatDirection
+from gajim.common.storage.archive.const import MessageState
+from gajim.common.storage.archive.const import MessageType
+from gajim.common.storage.archive.models import Message
+from gajim.common.storage.archive.models import Receipt
+from gajim.common.storage.archive.storage import MessageArchiveStorage
+
+
+class MessageCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._archive = MessageArchiveStorage(in_memory=True)
+        self._archive.init()
+
+        self._account = 'testacc1'
+        self._remote_jid = JID.from_string('remote@jid.org')
+        self._init_settings()
+
+    def _init_settings(self) -> None:
+        app.settings = Settings(in_memory=True)
+        app.settings.init()
+        app.settings.add_account('testacc1')
+        app.settings.set_account_setting('testacc1', 'name', 'user')
+        app.settings.set_account_setting('testacc1', 'hostname', 'domain.org')
+
+    def _make_message(self,
+                      message_id: str,
+                      text: str = 'Some Message',
+                      correction_id: str | None = None) -> Message:
+        return Message(
+            account_=self._account,
+            remote_jid_=self._remote_jid,
+            type=MessageType.CHAT,
+            direction=ChatDirection.OUTGOING,
+            timestamp=datetime.now(timezone.utc),
+            state=MessageState.ACKNOWLEDGED,
+            resource='res',
+            text=text,
+            id=message_id,
+            correction_id=correction_id,
+        )
+
+    def test_cache_hit(self) -> None:
+        pk = self._archive.insert_object(self._make_message('messageid1'))
+
+        message = self._archive.get_message_with_pk(pk)
+        assert message is not None
+        self.assertIs(message, self._archive.get_message_with_pk(pk))
+
+        timestamp = datetime.now(timezone.utc) + timedelta(seconds=1)
+        messages = self._archive.get_conversation_before_after(
+            self._account, self._remote_jid, True, timestamp, 10)
+        self.assertEqual(len(messages), 1)
+        self.assertIs(messages[0], self._archive.get_message_with_pk(pk))
+
+    def test_conversation_page(self) -> None:
+        pks = [self._archive.insert_object(self._make_message(f'messageid{i}'))
+               for i in range(5)]
+
+        # Only some messages of the page are cached
+        self._archive._message_cache.clear()  # pyright: ignore
+        cached = self._archive.get_message_with_pk(pks[2])
+
+        timestamp = datetime.now(timezone.utc) + timedelta(seconds=1)
+        messages = self._archive.get_conversation_before_after(
+            self._account, self._remote_jid, True, timestamp, 10)
+        self.assertEqual([message.pk for message in messages],
+                         list(reversed(pks)))
+        self.assertIs(messages[2], cached)
+
+        messages = self._archive.get_conversation_before_after(
+            self._account, self._remote_jid, True, timestamp, 2)
+        self.assertEqual([message.pk for message in messages],
+                         [pks[4], pks[3]])
+
+    def test_invalidation(self) -> None:
+        pk = self._archive.insert_object(self._make_message('messageid1'))
+        message = self._archive.get_message_with_pk(pk)
+        assert message is not None
+        self.assertIsNone(message.receipt)
+        self.assertEqual(message.corrections, [])
+
+        receipt = Receipt(
+            account_=self._account,
+            remote_jid_=self._remote_jid,
+            id='messageid1',
+            timestamp=datetime.now(timezone.utc),
+        )
+        self._archive.insert_object(receipt)
+
+        message = self._archive.get_message_with_pk(pk)
+        assert message is not None
+        self.assertIsNotNone(message.receipt)
+
+        correction_pk = self._archive.insert_object(self._make_message(
+            'messageid2', text='Corrected', correction_id='messageid1'))
+
+        message = self._archive.get_message_with_pk(pk)
+        assert message is not None
+        self.assertEqual(len(message.corrections), 1)
+
+        self._archive.delete_message(correction_pk)
+        message = self._archive.get_message_with_pk(pk)
+        assert message is not None
+        self.assertEqual(message.corrections, [])
+
+        self._archive.delete_message(pk)
+        self.assertIsNone(self._archive.get_message_with_pk(pk))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,10 +5,12 @@
 from datetime import datetime
 from datetime import timedelta
 from datetime import timezone
+from unittest import mock
 
 import sqlalchemy.exc
 from nbxmpp.protocol import JID
 from sqlalchemy import select
+from sqlalchemy import update
 
 from gajim.common import app
 from gajim.common.helpers import get_uuid
@@ -21,6 +23,8 @@
 from gajim.common.storage.archive.models import Message
 from gajim.common.storage.archive.models import MessageError
 from gajim.common.storage.archive.models import Moderation
+from gajim.common.storage.archive.models import Occupant
+from gajim.common.storage.archive.models import Receipt
 from gajim.common.storage.archive.storage import MessageArchiveStorage
 from gajim.common.util.datetime import utc_now
 
@@ -163,19 +167,231 @@ def test_get_last_conversation_row(self) -> None:
 
         self.assertEqual(message.id, 'messageid9')
 
+    def test_get_last_conversation_rows(self) -> None:
+        remote_jid1 = JID.from_string('remote1@jid.org')
+        remote_jid2 = JID.from_string('remote2@jid.org')
+        remote_jid3 = JID.from_string('remote3@jid.org')
+        timestamp = datetime.now(timezone.utc)
+        self._insert_messages(
+            'testacc1', remote_jid=remote_jid1, timestamp=timestamp, count=10
+        )
+        self._insert_messages(
+            'testacc2', remote_jid=remote_jid1, timestamp=timestamp, count=3
+        )
+        self._insert_messages(
+            'testacc1', remote_jid=remote_jid2, timestamp=timestamp, count=5
+        )
+
+        # Corrections are not the last line of a conversation
+        self._insert_messages(
+            'testacc1',
+            remote_jid=remote_jid2,
+            timestamp=timestamp + timedelta(seconds=1),
+            count=1,
+        )
+        with self._archive.get_session() as s:
+            s.execute(
+                update(Message)
+                .where(Message.timestamp > timestamp)
+                .values(correction_id='messageid4')
+            )
+            s.commit()
+
+        messages = self._archive.get_last_conversation_rows(
+            [
+                ('testacc1', remote_jid1),
+                ('testacc2', remote_jid1),
+                ('testacc1', remote_jid2),
+                ('testacc1', remote_jid3),
+            ]
+        )
+
+        self.assertEqual(len(messages), 3)
+        self.assertEqual(messages[('testacc1', remote_jid1)].id, 'messageid9')
+        self.assertEqual(messages[('testacc2', remote_jid1)].id, 'messageid2')
+        self.assertEqual(messages[('testacc1', remote_jid2)].id, 'messageid4')
+
+        for (account, jid), message in messages.items():
+            last_message = self._archive.get_last_conversation_row(account, jid)
+            assert last_message is not None
+            self.assertEqual(message.pk, last_message.pk)
+
     def test_get_last_correctable_message(self) -> None:
         # TODO
         pass
 
     def test_search_archive(self) -> None:
-        # TODO
-        return
-        # remote_jid = JID.from_string(f'remote1@jid.org')
-        # self._insert_messages(
-        #     'testacc1', remote_jid=remote_jid, message='test', count=100)
+        remote_jid = JID.from_string('remote1@jid.org')
+        self._insert_messages(
+            'testacc1', remote_jid=remote_jid, message='test message', count=10)
+        self._insert_messages(
+            'testacc1', remote_jid=remote_jid, message='other', count=5)
 
-        # iterator = self._archive.search_archive('testacc1', remote_jid, 'test')
-        # messages = list(iterator)
+        results = list(self._archive.search_archive('testacc1', remote_jid, 'test'))
+        self.assertEqual(len(results), 10)
+        self.assertEqual(results[0].snippet, 'test message')
+
+        # Prefix search on the last word
+        results = list(self._archive.search_archive('testacc1', remote_jid, 'mess'))
+        self.assertEqual(len(results), 10)
+
+        results = list(
+            self._archive.search_archive('testacc1', remote_jid, 'test missing'))
+        self.assertEqual(len(results), 0)
+
+        results = list(self._archive.search_archive(None, None, '"'))
+        self.assertEqual(len(results), 0)
+
+    def test_search_archive_without_fts(self) -> None:
+        # Like with an SQLite which was compiled without FTS5
+        with mock.patch(
+            'gajim.common.storage.archive.storage.MESSAGE_FTS_TABLE',
+            'CREATE VIRTUAL TABLE message_fts USING missing_module(text)',
+        ), self.assertLogs('gajim.c.storage', 'ERROR'):
+            self._archive = MessageArchiveStorage(in_memory=True)
+            self._archive.init()
+
+        remote_jid = JID.from_string('remote1@jid.org')
+        self._insert_messages(
+            'testacc1', remote_jid=remote_jid, message='test message', count=10)
+        self._insert_messages(
+            'testacc1', remote_jid=remote_jid, message='other', count=5)
+
+        results = list(self._archive.search_archive('testacc1', remote_jid, 'test'))
+        self.assertEqual(len(results), 10)
+        self.assertIsNone(results[0].snippet)
+
+        results = list(self._archive.search_archive('testacc1', remote_jid, '"'))
+        self.assertEqual(len(results), 0)
+
+    def test_search_archive_corrections(self) -> None:
+        remote_jid = JID.from_string('remote1@jid.org')
+        self._insert_messages(
+            'testacc1',
+            remote_jid=remote_jid,
+            resource='res',
+            message='tset',
+            message_id='messageid1',
+            count=1,
+        )
+
+        correction = Message(
+            account_='testacc1',
+            remote_jid_=remote_jid,
+            resource='res',
+            type=MessageType.CHAT,
+            direction=ChatDirection.INCOMING,
+            timestamp=datetime.now(timezone.utc),
+            state=MessageState.ACKNOWLEDGED,
+            id='messageid2',
+            text='test',
+            correction_id='messageid1',
+        )
+        self._archive.insert_object(correction)
+
+        results = list(self._archive.search_archive('testacc1', remote_jid, 'test'))
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].message.id, 'messageid1')
+        self.assertEqual(results[0].snippet, 'test')
+
+        # Deleting the message removes it from the index
+        self._archive.delete_message(results[0].message.pk)
+        results = list(self._archive.search_archive('testacc1', remote_jid, 'tset'))
+        self.assertEqual(len(results), 0)
+
+    def test_search_archive_stale_correction(self) -> None:
+        remote_jid = JID.from_string('remote1@jid.org')
+        self._insert_messages(
+            'testacc1',
+            remote_jid=remote_jid,
+            resource='res',
+            message='test',
+            message_id='messageid1',
+            count=1,
+        )
+
+        for index, text in enumerate(('tset', 'tst'), start=2):
+            correction = Message(
+                account_='testacc1',
+                remote_jid_=remote_jid,
+                resource='res',
+                type=MessageType.CHAT,
+                direction=ChatDirection.INCOMING,
+                timestamp=datetime.now(timezone.utc),
+                state=MessageState.ACKNOWLEDGED,
+                id=f'messageid{index}',
+                text=text,
+                correction_id='messageid1',
+            )
+            self._archive.insert_object(correction)
+
+        # Only the snippet of the last correction is shown
+        results = list(self._archive.search_archive('testacc1', remote_jid, 'tset'))
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].message.id, 'messageid1')
+        self.assertIsNone(results[0].snippet)
+
+        results = list(self._archive.search_archive('testacc1', remote_jid, 'tst'))
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].snippet, 'tst')
+
+    def test_search_archive_groupchat_corrections(self) -> None:
+        remote_jid = JID.from_string('room@conference.jid.org')
+
+        def _make_occupant(occupant_id: str) -> Occupant:
+            return Occupant(
+                account_='testacc1',
+                remote_jid_=remote_jid,
+                id=occupant_id,
+                nickname=occupant_id,
+                updated_at=datetime.now(timezone.utc),
+            )
+
+        def _make_message(message_id: str,
+                          text: str,
+                          occupant_id: str,
+                          correction_id: str | None = None) -> Message:
+            return Message(
+                account_='testacc1',
+                remote_jid_=remote_jid,
+                resource=occupant_id,
+                type=MessageType.GROUPCHAT,
+                direction=ChatDirection.INCOMING,
+                timestamp=datetime.now(timezone.utc),
+                state=MessageState.ACKNOWLEDGED,
+                id=message_id,
+                text=text,
+                correction_id=correction_id,
+                occupant_=_make_occupant(occupant_id),
+            )
+
+        # Two messages of different occupants share an id
+        self._archive.insert_object(
+            _make_message('messageid1', 'first', 'occupant1'))
+        self._archive.insert_object(
+            _make_message('messageid1', 'second', 'occupant2'))
+
+        # A correction of another occupant is not applied
+        self._archive.insert_object(
+            _make_message('messageid2', 'spoofed', 'occupant2',
+                          correction_id='messageid3'))
+        self._archive.insert_object(
+            _make_message('messageid3', 'third', 'occupant1'))
+
+        results = list(self._archive.search_archive(
+            'testacc1', remote_jid, 'spoofed'))
+        self.assertEqual(results, [])
+
+        # A correction only returns the message of its occupant once
+        self._archive.insert_object(
+            _make_message('messageid4', 'corrected', 'occupant2',
+                          correction_id='messageid1'))
+
+        results = list(self._archive.search_archive(
+            'testacc1', remote_jid, 'corrected'))
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].message.text, 'second')
+        self.assertEqual(results[0].snippet, 'corrected')
 
     def test_get_days_containing_messages(self) -> None:
         localtime = datetime(2023, 12, 31, 23, 59, 59, tzinfo=timezone.utc).astimezone()
@@ -385,6 +601,82 @@ def test_remove_history(self) -> None:
             result = s.scalar(select(Message))
             self.assertIsNone(result)
 
+    def test_cleanup_chat_history(self) -> None:
+        remote_jid = JID.from_string('remote1@jid.org')
+        old = utc_now() - timedelta(days=10)
+
+        self._insert_messages(
+            'testacc1', remote_jid=remote_jid, timestamp=old, count=25)
+        self._insert_messages(
+            'testacc1',
+            remote_jid=remote_jid,
+            message_id='newmessageid',
+            count=5,
+        )
+        self._insert_messages(
+            'testacc2', remote_jid=remote_jid, timestamp=old, count=5)
+
+        receipt = Receipt(
+            account_='testacc1',
+            remote_jid_=remote_jid,
+            id='messageid1',
+            timestamp=old,
+        )
+        self._archive.insert_object(receipt)
+
+        app.settings.set_account_setting(
+            'testacc1', 'chat_history_max_age', 60 * 60 * 24)
+        app.settings.set_account_setting(
+            'testacc2', 'chat_history_max_age', -1)
+
+        with mock.patch(
+            'gajim.common.storage.archive.storage.PRUNE_CHUNK_SIZE', 10
+        ):
+            self._archive.cleanup_chat_history()
+
+        with self._archive.get_session() as s:
+            messages = s.scalars(select(Message)).unique().all()
+            self.assertEqual(len(messages), 10)
+            self.assertEqual(
+                len([m for m in messages if m.id == 'newmessageid']), 5)
+
+            result = s.scalar(select(Receipt))
+            self.assertIsNone(result)
+
+    def test_cleanup_chat_history_shared_ids(self) -> None:
+        remote_jid = JID.from_string('remote1@jid.org')
+        old = utc_now() - timedelta(days=10)
+
+        # Old and new messages share an id, only the new one is kept
+        for timestamp in (old, None):
+            self._insert_messages(
+                'testacc1',
+                remote_jid=remote_jid,
+                message_id='messageid1',
+                timestamp=timestamp,
+                count=1,
+            )
+
+        receipt = Receipt(
+            account_='testacc1',
+            remote_jid_=remote_jid,
+            id='messageid1',
+            timestamp=utc_now(),
+        )
+        self._archive.insert_object(receipt)
+
+        app.settings.set_account_setting(
+            'testacc1', 'chat_history_max_age', 60 * 60 * 24)
+        app.settings.set_account_setting(
+            'testacc2', 'chat_history_max_age', -1)
+
+        self._archive.cleanup_chat_history()
+
+        with self._archive.get_session() as s:
+            messages = s.scalars(select(Message)).unique().all()
+            self.assertEqual(len(messages), 1)
+            self.assertIsNotNone(messages[0].receipt)
+
     def test_check_if_stanza_id_exists(self) -> None:
         remote_jid = JID.from_string('remote1@jid.org')
         m = Message(
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from datetime import datetime
+from datetime import timezone
+from pathlib import Path
+
+from nbxmpp.protocol import JID
+
+from gajim.common import app
+from gajim.common.settings import Settings
+from gajim.common.storage.archive.const import ChatDirection
+from gajim.common.storage.archive.const import MessageState
+from gajim.common.storage.archive.const import MessageType
+from gajim.common.storage.archive.models import Message
+from gajim.common.storage.archive.storage import MessageArchiveStorage
+
+
+class WriterTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        path = Path(self._tmp_dir.name) / 'logs.db'
+        self._archive = MessageArchiveStorage(path=path)
+        self._archive.init()
+
+        self._account = 'testacc1'
+        self._remote_jid = JID.from_string('remote@jid.org')
+        self._init_settings()
+
+    def tearDown(self) -> None:
+        self._archive.shutdown()
+        self._tmp_dir.cleanup()
+
+    def _init_settings(self) -> None:
+        app.settings = Settings(in_memory=True)
+        app.settings.init()
+        app.settings.add_account('testacc1')
+        app.settings.set_account_setting('testacc1', 'name', 'user')
+        app.settings.set_account_setting('testacc1', 'hostname', 'domain.org')
+
+    def _make_message(self, message_id: str) -> Message:
+        return Message(
+            account_=self._account,
+            remote_jid_=self._remote_jid,
+            type=MessageType.CHAT,
+            direction=ChatDirection.INCOMING,
+            timestamp=datetime.now(timezone.utc),
+            state=MessageState.ACKNOWLEDGED,
+            resource='res',
+            text='Some Message',
+            id=message_id,
+        )
+
+    def test_submit(self) -> None:
+        futures = [
+            self._archive.submit(
+                self._archive.insert_object, self._make_message(f'id{i}'))
+            for i in range(10)
+        ]
+
+        pks = [future.result() for future in futures]
+        self.assertEqual(pks, sorted(pks))
+
+        for pk in pks:
+            self.assertIsNotNone(self._archive.get_message_with_pk(pk))
+
+        future = self._archive.submit(self._archive.delete_message, pks[0])
+        future.result()
+        self.assertIsNone(self._archive.get_message_with_pk(pks[0]))
+
+    def test_submit_during_ingest(self) -> None:
+        ingest = self._archive.begin_ingest()
+        self._archive.insert_object(self._make_message('id1'), ingest=ingest)
+
+        # Other writes are not part of the ingest, the writer waits
+        # until the ingest is committed
+        future = self._archive.submit(
+            self._archive.insert_object, self._make_message('id2'))
+        ingest.close()
+
+        self.assertIsNotNone(self._archive.get_message_with_pk(future.result()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import time
+import unittest
+from collections import OrderedDict
+from unittest.mock import MagicMock
+
+from nbxmpp.protocol import JID
+
+from gajim.common import app
+from gajim.common.settings import Settings
+
+from gajim.gtk.control import ChatControl
+
+ACCOUNT = 'testacc1'
+CURRENT_JID = JID.from_string('current@domain.org')
+CACHED_JID = JID.from_string('cached@domain.org')
+
+
+def _make_view(contact: MagicMock) -> MagicMock:
+    view = MagicMock()
+    view.contact = contact
+    view.get_row_count.return_value = 1
+    view.get_lower_complete.return_value = True
+    view.get_autoscroll.return_value = True
+    return view
+
+
+def _make_event(jid: JID) -> MagicMock:
+    event = MagicMock()
+    event.account = ACCOUNT
+    event.jid = jid
+    event.contents = ['audio']
+    return event
+
+
+class Test(unittest.TestCase):
+    def setUp(self) -> None:
+        app.settings = Settings(in_memory=True)
+        app.settings.init()
+
+        app.get_client = MagicMock()
+        app.call_manager = MagicMock()
+        app.call_manager.get_active_call_jid.return_value = None
+        app.storage.events = MagicMock()
+        app.storage.events.load.return_value = []
+
+        self._current_contact = MagicMock()
+        self._current_contact.account = ACCOUNT
+        self._current_contact.jid = CURRENT_JID
+
+        self._cached_contact = MagicMock()
+        self._cached_contact.account = ACCOUNT
+        self._cached_contact.jid = CACHED_JID
+
+        self._current_view = _make_view(self._current_contact)
+        self._cached_view = _make_view(self._cached_contact)
+
+        # Only the state needed for switching between views
+        control = ChatControl.__new__(ChatControl)
+        control._contact = self._current_contact
+        control._client = MagicMock()
+        control._ui = MagicMock()
+        control._scrolled_view = self._current_view
+        control._cached_views = OrderedDict({
+            (ACCOUNT, CACHED_JID): (self._cached_view, time.time())
+        })
+        control._jump_to_end_button = MagicMock()
+        control._groupchat_state = MagicMock()
+        control._roster = MagicMock()
+        control._message_selection = MagicMock()
+        control._register_events = MagicMock()
+        control._request_history = MagicMock()
+        self._control = control
+
+    def test_events_of_cached_view(self) -> None:
+        control = self._control
+        control._on_jingle_request_received(_make_event(CACHED_JID))
+        control._on_file_request_event(_make_event(CACHED_JID))
+        control._on_http_upload_started(_make_event(CACHED_JID))
+        control._on_encryption_info(_make_event(CACHED_JID))
+
+        self._cached_view.add_call_message.assert_called_once()
+        self._cached_view.add_jingle_file_transfer.assert_called_once()
+        self._cached_view.add_file_transfer.assert_called_once()
+        self._cached_view.add_encryption_info.assert_called_once()
+
+        self._current_view.add_call_message.assert_not_called()
+        self._current_view.add_jingle_file_transfer.assert_not_called()
+        self._current_view.add_file_transfer.assert_not_called()
+        self._current_view.add_encryption_info.assert_not_called()
+
+        # Events of chats without a view are ignored
+        control._on_file_request_event(
+            _make_event(JID.from_string('other@domain.org')))
+        self._current_view.add_jingle_file_transfer.assert_not_called()
+
+    def test_restore_view(self) -> None:
+        control = self._control
+        file_request = _make_event(CACHED_JID)
+        control._on_file_request_event(file_request)
+
+        control.switch_contact(self._cached_contact)
+
+        # The cached view with the rows added in the meantime is shown
+        # instead of loading the conversation
+        self.assertIs(control.get_conversation_view(), self._cached_view)
+        self._cached_view.add_jingle_file_transfer.assert_called_once_with(
+            file_request)
+        control._request_history.assert_not_called()
+
+        # The previous view is cached now
+        self.assertIs(
+            control._cached_views[(ACCOUNT, CURRENT_JID)][0],
+            self._current_view)
+        self.assertNotIn((ACCOUNT, CACHED_JID), control._cached_views)
+
+
+if __name__ == '__main__':
+    unittest.main()